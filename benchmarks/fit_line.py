@@ -0,0 +1,40 @@
+"""
+Compares the closed-form fit in `hubbleds.utils.fit_line` with the astropy
+fitter it replaces, on a class worth of measurements and on roughly the
+all-data set.
+
+    python benchmarks/fit_line.py
+"""
+
+from timeit import timeit
+
+from astropy.modeling import fitting, models
+from numpy.random import default_rng
+
+from hubbleds.utils import fit_line
+
+
+def _astropy_fit(x, y):
+    fit = fitting.LinearLSQFitter()
+    line_init = models.Linear1D(intercept=0, fixed={"intercept": True})
+    return fit(line_init, x, y)
+
+
+def main():
+    rng = default_rng(0)
+
+    for label, size in (("class", 5 * 30), ("all data", 5 * 30 * 400)):
+        x = rng.uniform(10, 500, size)
+        y = 70 * x + rng.normal(0, 2000, size)
+        number = 200
+        fast = timeit(lambda: fit_line(x, y), number=number) / number
+        slow = timeit(lambda: _astropy_fit(x, y), number=number) / number
+        print(
+            f"{label} ({size} points): closed form {fast * 1e6:.1f} us, "
+            f"astropy {slow * 1e6:.1f} us ({slow / fast:.0f}x), "
+            f"slopes {fit_line(x, y).slope.value:.4f} vs {_astropy_fit(x, y).slope.value:.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
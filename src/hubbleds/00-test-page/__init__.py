@@ -18,6 +18,7 @@ from hubbleds.base_component_state import (
 from hubbleds.state import (
     LOCAL_STATE, 
     GLOBAL_STATE, 
+    RESPONSE_STATE,
     mc_callback, 
     fr_callback, 
     get_free_response, 
@@ -91,9 +92,9 @@ def Page():
     
     with solara.Card():
         with solara.Div():
-            solara.Text(f"mc_scoring: {LOCAL_STATE.value.mc_scoring}")
+            solara.Text(f"mc_scoring: {RESPONSE_STATE.mc_scoring}")
         with solara.Div():
-            solara.Text(f"free_responses: {LOCAL_STATE.value.free_responses}")
+            solara.Text(f"free_responses: {RESPONSE_STATE.free_responses}")
 
     
     # convenience function
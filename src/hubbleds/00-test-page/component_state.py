@@ -6,7 +6,7 @@ from pydantic import field_validator
 from cosmicds.state import BaseState
 from hubbleds.base_marker import BaseMarker 
 from hubbleds.base_component_state import BaseComponentState
-from hubbleds.state import LOCAL_STATE
+from hubbleds.state import question_completed
 
 import enum
 from typing import Any, cast
@@ -36,11 +36,11 @@ class ComponentState(BaseState, BaseComponentState):
     
     @property
     def mark3_gate(self) -> bool:
-        return LOCAL_STATE.value.question_completed("mc-2")
+        return question_completed("mc-2")
     
     @property
     def mark4_gate(self) -> bool:
-        return LOCAL_STATE.value.question_completed("fr-1")
+        return question_completed("fr-1")
 
 
     
@@ -0,0 +1,207 @@
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Callable, Hashable, Iterable, NamedTuple, Optional
+
+import numpy as np
+
+from cosmicds.logger import setup_logger
+
+from hubbleds.state import (
+    ClassSummary,
+    ClassSummaryTable,
+    StudentMeasurement,
+    StudentMeasurementTable,
+    StudentSummaryTable,
+)
+
+logger = setup_logger("ALL DATA")
+
+# Seconds before the all-classes data is fetched again
+ALL_DATA_TTL = float(os.getenv("HUBBLEDS_ALL_DATA_TTL", 600))
+
+# Number of per-class views of the all-classes data kept per worker
+ALL_DATA_CLASS_VIEWS = int(os.getenv("HUBBLEDS_ALL_DATA_CLASS_VIEWS", 16))
+
+
+class AllDataTables(NamedTuple):
+    measurements: StudentMeasurementTable
+    student_summaries: StudentSummaryTable
+    class_summaries: ClassSummaryTable
+
+
+class AllDataSnapshot:
+    """
+    The measurements and summaries of every class in a story, as fetched at
+    one point in time. Snapshots are shared by every session in the worker,
+    so they (and their tables) are never modified; a refresh replaces the
+    whole snapshot with one that has a higher `version`.
+    """
+
+    def __init__(self, version: int, tables: AllDataTables):
+        self.version = version
+        self.tables = tables
+        self.loaded_at = time.monotonic()
+
+
+def _measurements_key(measurements: Iterable[StudentMeasurement]) -> Hashable:
+    return tuple(sorted(
+        (m.student_id, m.galaxy_id, m.measurement_number, m.est_dist_value, m.velocity_value)
+        for m in measurements
+    ))
+
+
+class SharedAllData:
+    """
+    Worker-level cache of the all-classes data shown in stage 5.
+
+    Each story has one snapshot, fetched at most once per `ttl` seconds no
+    matter how many sessions ask for it, and kept if a refresh fails.
+
+    Sessions see the snapshot with their own class's rows replaced by the
+    class's current data (the snapshot may predate it). These views are
+    shared by every session in the same class with the same class data,
+    so the worker holds one copy of the data per active class rather than
+    per session. Without a class the snapshot's tables are used as they are.
+    """
+
+    def __init__(
+        self,
+        ttl: float = ALL_DATA_TTL,
+        max_views: int = ALL_DATA_CLASS_VIEWS,
+        fetch: Optional[Callable[[str], AllDataTables]] = None,
+    ):
+        self.ttl = ttl
+        self.max_views = max_views
+        self._fetch = fetch
+        self._snapshots: dict[str, AllDataSnapshot] = {}
+        self._views: OrderedDict[Hashable, AllDataTables] = OrderedDict()
+        self._versions = itertools.count(1)
+        self._lock = threading.Lock()
+        self._load_locks: dict[str, threading.Lock] = defaultdict(threading.Lock)
+
+    def _load(self, story_id: str) -> AllDataTables:
+        if self._fetch is not None:
+            return self._fetch(story_id)
+
+        from hubbleds.remote import LOCAL_API
+
+        return LOCAL_API.fetch_all_data(story_id)
+
+    def _is_fresh(self, snapshot: Optional[AllDataSnapshot]) -> bool:
+        return snapshot is not None and time.monotonic() - snapshot.loaded_at < self.ttl
+
+    def snapshot(self, story_id: str) -> AllDataSnapshot:
+        snapshot = self._snapshots.get(story_id)
+        if self._is_fresh(snapshot):
+            return snapshot
+
+        with self._lock:
+            lock = self._load_locks[story_id]
+
+        with lock:
+            snapshot = self._snapshots.get(story_id)
+            if self._is_fresh(snapshot):
+                return snapshot
+
+            try:
+                tables = self._load(story_id)
+            except Exception:
+                if snapshot is None:
+                    raise
+                logger.exception(
+                    "Failed to refresh all data for `%s`, serving version %d.",
+                    story_id,
+                    snapshot.version,
+                )
+                return snapshot
+
+            snapshot = AllDataSnapshot(next(self._versions), tables)
+            with self._lock:
+                self._snapshots[story_id] = snapshot
+                # Views of older snapshots won't be asked for again
+                for key in [k for k in self._views if k[0] == story_id]:
+                    del self._views[key]
+
+            logger.info(
+                "Loaded version %d of all data for `%s`: %d measurements.",
+                snapshot.version,
+                story_id,
+                len(tables.measurements),
+            )
+            return snapshot
+
+    def class_view(
+        self,
+        story_id: str,
+        class_id: Optional[int] = None,
+        class_measurements: Iterable[StudentMeasurement] = (),
+        class_summary: Optional[ClassSummary] = None,
+    ) -> AllDataTables:
+        """
+        The all-classes data as seen from class `class_id`: the snapshot's
+        rows for that class, including the summaries of its students, are
+        replaced by `class_measurements` and `class_summary`.
+
+        The API can leave out a class itself, but the snapshot is shared by
+        every class, so this is done here. The class's students are those
+        with measurements in either the snapshot or `class_measurements`.
+        """
+        snapshot = self.snapshot(story_id)
+        if class_id is None:
+            return snapshot.tables
+
+        class_measurements = list(class_measurements)
+        key = (
+            story_id,
+            snapshot.version,
+            class_id,
+            _measurements_key(class_measurements),
+            None if class_summary is None else (class_summary.hubble_fit_value, class_summary.age_value),
+        )
+        with self._lock:
+            view = self._views.get(key)
+            if view is not None:
+                self._views.move_to_end(key)
+                return view
+
+        measurements, student_summaries, class_summaries = snapshot.tables
+        in_class = measurements.column("class_id") == class_id
+        # The class's students as of the snapshot and as of now, so that a
+        #  student whose measurements are no longer complete is still left out
+        class_student_ids = np.union1d(
+            measurements.column("student_id")[in_class],
+            [m.student_id for m in class_measurements],
+        )
+
+        view = AllDataTables(
+            measurements=measurements.take(~in_class).concat(class_measurements),
+            student_summaries=student_summaries.take(
+                ~np.isin(student_summaries.column("student_id"), class_student_ids)
+            ),
+            class_summaries=class_summaries.take(
+                class_summaries.column("class_id") != class_id
+            ).concat([class_summary] if class_summary is not None else []),
+        )
+
+        with self._lock:
+            self._views[key] = view
+            while len(self._views) > self.max_views:
+                self._views.popitem(last=False)
+
+        return view
+
+    def invalidate(self, story_id: Optional[str] = None):
+        with self._lock:
+            if story_id is None:
+                self._snapshots.clear()
+                self._views.clear()
+            else:
+                self._snapshots.pop(story_id, None)
+                for key in [k for k in self._views if k[0] == story_id]:
+                    del self._views[key]
+
+
+ALL_DATA = SharedAllData()
@@ -0,0 +1,232 @@
+"""
+Latency, status and payload size of the requests `LocalAPI` makes, per API
+endpoint, exported in the Prometheus text format from `/metrics` on the
+server. Requests are recorded by a response hook on the API session, so
+failures that never get a response (e.g. timeouts) aren't counted. The
+hook runs before the body is read, so response bytes are counted as the
+body is read, whether all at once or streamed, and a body that is never
+read counts as 0 bytes.
+"""
+
+import math
+import re
+import threading
+from urllib.parse import urlsplit
+
+from hubbleds.profiling import Histogram
+
+# Upper bounds of the latency histogram buckets, in seconds
+API_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, math.inf)
+
+# Templates of the API's endpoints. Requests are aggregated per template so
+#  that e.g. every student's measurements count towards the same endpoint.
+ENDPOINT_TEMPLATES = [
+    (re.compile(pattern + r"/?$"), template)
+    for pattern, template in (
+        (r"/[^/]+/galaxies", "/{story}/galaxies"),
+        (r"/[^/]+/sample-galaxy", "/{story}/sample-galaxy"),
+        (r"/[^/]+/spectra/[^/]+/[^/]+", "/{story}/spectra/{type}/{name}"),
+        (r"/[^/]+/measurements/\d+/\d+", "/{story}/measurements/{student}/{galaxy}"),
+        (r"/[^/]+/measurements/\d+", "/{story}/measurements/{student}"),
+        (r"/[^/]+/sample-measurements/\d+/[^/]+", "/{story}/sample-measurements/{student}/{number}"),
+        (r"/[^/]+/sample-measurements/\d+", "/{story}/sample-measurements/{student}"),
+        (r"/[^/]+/submit-measurement", "/{story}/submit-measurement"),
+        (r"/[^/]+/submit-measurements", "/{story}/submit-measurements"),
+        (r"/[^/]+/sample-measurement", "/{story}/sample-measurement"),
+        (r"/[^/]+/submit-sample-measurements", "/{story}/submit-sample-measurements"),
+        (r"/[^/]+/class-measurements/students-completed/\d+/\d+",
+         "/{story}/class-measurements/students-completed/{student}/{class}"),
+        (r"/[^/]+/class-measurements/\d+/\d+", "/{story}/class-measurements/{student}/{class}"),
+        (r"/[^/]+/class-measurements/\d+", "/{story}/class-measurements/{student}"),
+        (r"/[^/]+/all-data", "/{story}/all-data"),
+        (r"/stage-state/\d+/[^/]+/[^/]+", "/stage-state/{student}/{story}/{stage}"),
+        (r"/story-state/\d+/[^/]+", "/story-state/{student}/{story}"),
+        (r"/app-state/\d+/[^/]+", "/app-state/{student}/{story}"),
+    )
+]
+
+
+def endpoint_template(url: str) -> str:
+    """
+    The template of the endpoint that `url` points to. Paths that match no
+    known template have their numeric segments replaced by `{id}`.
+    """
+    path = urlsplit(url).path
+    for pattern, template in ENDPOINT_TEMPLATES:
+        if pattern.search(path):
+            return template
+    return re.sub(r"/\d+(?=/|$)", "/{id}", path)
+
+
+class _EndpointMetrics:
+    def __init__(self):
+        self.latency = Histogram(API_LATENCY_BUCKETS)
+        self.statuses: dict[int, int] = {}
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.retries = 0
+
+
+def _payload_size(body) -> int:
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    # Streamed uploads don't have a known size
+    return 0
+
+
+def _retry_count(response) -> int:
+    retries = getattr(response.raw, "retries", None)
+    history = getattr(retries, "history", None)
+    return len(history) if history else 0
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items())
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class APIMetrics:
+    """
+    Collects metrics of API requests per `(method, endpoint template)`. Call
+    `instrument` with a `requests.Session` to record every response it gets.
+    """
+
+    def __init__(self):
+        self._endpoints: dict[tuple[str, str], _EndpointMetrics] = {}
+        self._lock = threading.Lock()
+
+    def instrument(self, session):
+        hooks = getattr(session, "hooks", None)
+        if hooks is None:
+            # e.g. the stand-in server, which makes no real requests
+            return
+        if self._on_response not in hooks["response"]:
+            hooks["response"].append(self._on_response)
+
+    def _on_response(self, response, *args, **kwargs):
+        request = response.request
+        try:
+            self.record(
+                method=request.method,
+                url=request.url,
+                status=response.status_code,
+                seconds=response.elapsed.total_seconds(),
+                request_bytes=_payload_size(request.body),
+                retries=_retry_count(response),
+            )
+            self._count_response_bytes(response, request.method, request.url)
+        except Exception:
+            # Metrics must never break a request
+            pass
+        return response
+
+    def _count_response_bytes(self, response, method: str, url: str):
+        # `Response.content` reads the body through `iter_content` too
+        iter_content = response.iter_content
+
+        def counted_iter_content(*args, **kwargs):
+            size = 0
+            try:
+                for chunk in iter_content(*args, **kwargs):
+                    size += len(chunk.encode("utf-8")) if isinstance(chunk, str) else len(chunk)
+                    yield chunk
+            finally:
+                # Also reached when a streamed body is closed part way
+                self.add_response_bytes(method, url, size)
+
+        response.iter_content = counted_iter_content
+
+    def _metrics(self, method: str, url: str) -> _EndpointMetrics:
+        # Called with the lock held
+        key = (method, endpoint_template(url))
+        metrics = self._endpoints.get(key)
+        if metrics is None:
+            metrics = self._endpoints[key] = _EndpointMetrics()
+        return metrics
+
+    def record(
+        self,
+        method: str,
+        url: str,
+        status: int,
+        seconds: float,
+        request_bytes: int = 0,
+        response_bytes: int = 0,
+        retries: int = 0,
+    ):
+        with self._lock:
+            metrics = self._metrics(method, url)
+            metrics.latency.observe(seconds)
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.request_bytes += request_bytes
+            metrics.response_bytes += response_bytes
+            metrics.retries += retries
+
+    def add_response_bytes(self, method: str, url: str, size: int):
+        """Counts `size` more bytes of the body of a recorded response."""
+        with self._lock:
+            self._metrics(method, url).response_bytes += size
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def to_prometheus(self, prefix: str = "hubbleds_api") -> str:
+        """The metrics in the Prometheus text exposition format."""
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+
+            lines = [
+                f"# HELP {prefix}_request_duration_seconds Time until the API's response headers arrived.",
+                f"# TYPE {prefix}_request_duration_seconds histogram",
+            ]
+            for (method, endpoint), metrics in endpoints:
+                histogram = metrics.latency
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    labels = _labels(method=method, endpoint=endpoint, le=_number(bound))
+                    lines.append(f"{prefix}_request_duration_seconds_bucket{{{labels}}} {cumulative}")
+                labels = _labels(method=method, endpoint=endpoint)
+                lines.append(f"{prefix}_request_duration_seconds_sum{{{labels}}} {_number(histogram.total)}")
+                lines.append(f"{prefix}_request_duration_seconds_count{{{labels}}} {histogram.count}")
+
+            lines += [
+                f"# HELP {prefix}_requests_total API requests by response status.",
+                f"# TYPE {prefix}_requests_total counter",
+            ]
+            for (method, endpoint), metrics in endpoints:
+                for status, count in sorted(metrics.statuses.items()):
+                    labels = _labels(method=method, endpoint=endpoint, status=status)
+                    lines.append(f"{prefix}_requests_total{{{labels}}} {count}")
+
+            for name, attr, description in (
+                ("request_bytes_total", "request_bytes", "Bytes sent in API request bodies."),
+                ("response_bytes_total", "response_bytes", "Bytes received in API response bodies."),
+                ("retries_total", "retries", "Retries made before the API responded."),
+            ):
+                lines += [
+                    f"# HELP {prefix}_{name} {description}",
+                    f"# TYPE {prefix}_{name} counter",
+                ]
+                for (method, endpoint), metrics in endpoints:
+                    labels = _labels(method=method, endpoint=endpoint)
+                    lines.append(f"{prefix}_{name}{{{labels}}} {getattr(metrics, attr)}")
+
+        return "\n".join(lines) + "\n"
+
+
+API_METRICS = APIMetrics()
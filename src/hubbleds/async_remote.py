@@ -0,0 +1,258 @@
+import asyncio
+import os
+import time
+import weakref
+from contextlib import nullcontext
+from typing import Any, Callable
+
+import httpx
+from requests.utils import default_headers
+
+from cosmicds.logger import setup_logger
+from cosmicds.state import BaseState, GlobalState
+from solara import Reactive
+from solara.server import kernel_context
+from solara.toestand import Ref
+
+from hubbleds.api_metrics import API_METRICS
+from hubbleds.profiling import profiled_methods
+from hubbleds.remote import LOCAL_API, LocalAPI
+from hubbleds.state import LocalState, StudentMeasurement
+
+logger = setup_logger("ASYNC API")
+
+# Seconds to wait for the API to respond, and to connect to it
+API_TIMEOUT = float(os.getenv("HUBBLEDS_API_TIMEOUT", 30))
+API_CONNECT_TIMEOUT = float(os.getenv("HUBBLEDS_API_CONNECT_TIMEOUT", 5))
+
+# Connections to the API kept open per worker (per event loop)
+API_MAX_CONNECTIONS = int(os.getenv("HUBBLEDS_API_MAX_CONNECTIONS", 20))
+
+
+async def _run_in_thread(func: Callable, *args, **kwargs) -> Any:
+    # Run in the caller's kernel context so that the function can read and
+    #  set the session's reactive state
+    try:
+        context = kernel_context.get_current_context()
+    except RuntimeError:
+        context = None
+
+    def _run():
+        with context or nullcontext():
+            return func(*args, **kwargs)
+
+    return await asyncio.to_thread(_run)
+
+
+@profiled_methods("api")
+class AsyncLocalAPI:
+    """
+    Awaitable counterparts of the methods of `LocalAPI`, for async tasks
+    (e.g. `solara.lab.use_task`), so that waiting on the API doesn't hold up
+    every other session on the worker's event loop.
+
+    The methods defined here make their requests with a pooled
+    `httpx.AsyncClient`, one per event loop. Every other method of
+    `LocalAPI` is available too, as a coroutine that runs the synchronous
+    method in a worker thread, inside the calling session's kernel context.
+    """
+
+    def __init__(
+        self,
+        api: LocalAPI,
+        timeout: float = API_TIMEOUT,
+        connect_timeout: float = API_CONNECT_TIMEOUT,
+        max_connections: int = API_MAX_CONNECTIONS,
+    ):
+        self.api = api
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self._clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, httpx.AsyncClient
+        ] = weakref.WeakKeyDictionary()
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or "api" not in self.__dict__:
+            raise AttributeError(name)
+
+        attr = getattr(self.api, name)
+        if not callable(attr):
+            return attr
+
+        async def method(*args, **kwargs):
+            return await _run_in_thread(attr, *args, **kwargs)
+
+        method.__name__ = name
+        return method
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            # Same credentials as the synchronous session
+            defaults = default_headers()
+            headers = {
+                key: value
+                for key, value in self.api.request_session.headers.items()
+                if defaults.get(key) != value
+            }
+            client = httpx.AsyncClient(
+                headers=headers,
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self):
+        """Closes the connections opened from the running event loop."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def _uses_stand_in(self) -> bool:
+        # Requests to a session swapped in with `use_session` can't go over
+        #  HTTP, so they are made by the synchronous methods instead
+        return self.api._session_override is not None
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self._client().request(method, url, **kwargs)
+        API_METRICS.record(
+            method=method,
+            url=url,
+            status=response.status_code,
+            seconds=time.perf_counter() - start,
+            request_bytes=len(response.request.content),
+            response_bytes=len(response.content),
+        )
+        return response
+
+    async def fetch_students_completed_count(
+        self, story_id: str, student_id: int, class_id: int
+    ) -> int:
+        if self._uses_stand_in():
+            return await _run_in_thread(
+                self.api.fetch_students_completed_count, story_id, student_id, class_id
+            )
+
+        r = await self._request(
+            "GET", self.api._students_completed_url(story_id, student_id, class_id)
+        )
+        return self.api._parse_students_completed(r)
+
+    async def get_students_completed_measurements_count(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+    ) -> int:
+        if global_state.value.classroom.class_info is None or 'id' not in global_state.value.classroom.class_info:
+            logger.warning("No class id found in classroom info.")
+            return 0
+        return await self.fetch_students_completed_count(
+            local_state.value.story_id,
+            global_state.value.student.id,
+            global_state.value.classroom.class_info['id'],
+        )
+
+    async def get_measurements(
+        self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
+    ) -> list[StudentMeasurement]:
+        if self._uses_stand_in():
+            return await _run_in_thread(self.api.get_measurements, global_state, local_state)
+
+        if not global_state.value.update_db or self.api.is_educator:
+            Ref(local_state.fields.measurements_loaded).set(True)
+            logger.info("Skipping retrieval of measurements from database.")
+            return []
+
+        r = await self._request("GET", self.api._measurements_url(global_state, local_state))
+
+        measurements = Ref(local_state.fields.measurements)
+        parsed_measurements = self.api._parse_measurements(r, "measurements")
+        if parsed_measurements is not None:
+            measurements.set(parsed_measurements)
+
+        Ref(local_state.fields.measurements_loaded).set(True)
+
+        logger.info("Loaded measurements from database.")
+
+        return measurements.value
+
+    async def get_class_measurements(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+    ) -> list[StudentMeasurement]:
+        if self._uses_stand_in():
+            return await _run_in_thread(
+                self.api.get_class_measurements, global_state, local_state
+            )
+
+        url = self.api._class_measurements_url(global_state, local_state)
+        if url is None:
+            return []
+
+        r = await self._request("GET", url, params={"complete_only": "true"})
+
+        measurements = Ref(local_state.fields.class_measurements)
+        parsed_measurements = self.api._parse_measurements(r, "class measurements")
+        if parsed_measurements is None:
+            return measurements.value
+
+        measurements.set(parsed_measurements)
+
+        logger.info("Loaded class measurements from database.")
+
+        return measurements.value
+
+    async def put_stage_state(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+        component_state: Reactive[BaseState],
+    ) -> bool:
+        if self._uses_stand_in():
+            return await _run_in_thread(
+                self.api.put_stage_state, global_state, local_state, component_state
+            )
+
+        if self.api._skip_db_write():
+            return False
+
+        logger.info("Serializing stage state into DB.")
+
+        url, comp_state_dict = self.api._stage_state_request(
+            global_state, local_state, component_state
+        )
+        r = await self._request("PUT", url, json=comp_state_dict)
+        return self.api._check_write(r, "stage state")
+
+    async def put_story_state(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+    ) -> bool:
+        if self._uses_stand_in():
+            return await _run_in_thread(self.api.put_story_state, global_state, local_state)
+
+        if self.api._skip_db_write():
+            return False
+
+        logger.info("Serializing state into DB.")
+
+        url, state_json = self.api._story_state_request(global_state, local_state)
+        r = await self._request(
+            "PUT",
+            url,
+            headers={"Content-Type": "application/json"},
+            content=state_json,
+        )
+        return self.api._check_write(r, "story state")
+
+
+ASYNC_API = AsyncLocalAPI(LOCAL_API)
@@ -0,0 +1,111 @@
+from typing import Any, Iterable, Optional
+
+from cosmicds.logger import setup_logger
+from pydantic import BaseModel
+
+from hubbleds.state import LocalState, StudentMeasurement
+
+logger = setup_logger("CHANGES")
+
+MeasurementKey = tuple[int, Optional[str]]
+
+
+def measurement_key(measurement: StudentMeasurement) -> MeasurementKey:
+    return (measurement.galaxy_id, measurement.measurement_number)
+
+
+def _unchanged(value: Any, written: Any) -> bool:
+    return value is written or value == written
+
+
+class StateChangeTracker:
+    """
+    Remembers what was last written to the database for a session, so that
+    only the measurements and story state that changed since then need to be
+    written again.
+
+    Measurements are tracked per `kind` (e.g. "measurements" and
+    "example_measurements") and keyed by `(galaxy_id, measurement_number)`.
+    The tracker holds on to the written values themselves and compares them
+    by identity before equality. Nothing is serialized to find changes, so
+    the states must be replaced rather than mutated in place, as they are
+    everywhere else. Pass changes back to the matching `mark_*` method once
+    the write has succeeded.
+    """
+
+    # Fields that only drive the UI. Changing them alone doesn't warrant a write.
+    TRANSIENT_FIELDS = {"show_snackbar", "snackbar_message"}
+
+    def __init__(self):
+        self._measurements: dict[str, dict[MeasurementKey, StudentMeasurement]] = {}
+        self._story: Optional[dict[str, Any]] = None
+
+    def changed_measurements(
+        self, kind: str, measurements: Iterable[StudentMeasurement]
+    ) -> dict[MeasurementKey, StudentMeasurement]:
+        written = self._measurements.get(kind, {})
+        return {
+            measurement_key(measurement): measurement
+            for measurement in measurements
+            if not _unchanged(measurement, written.get(measurement_key(measurement)))
+        }
+
+    def deleted_measurements(
+        self, kind: str, measurements: Iterable[StudentMeasurement]
+    ) -> set[MeasurementKey]:
+        """The keys of written measurements that are no longer present."""
+        written = self._measurements.get(kind, {})
+        return written.keys() - {measurement_key(m) for m in measurements}
+
+    def mark_measurements_written(
+        self, kind: str, changes: dict[MeasurementKey, StudentMeasurement]
+    ):
+        self._measurements.setdefault(kind, {}).update(changes)
+
+    def mark_measurements_deleted(self, kind: str, keys: Iterable[MeasurementKey]):
+        written = self._measurements.get(kind, {})
+        for key in keys:
+            written.pop(key, None)
+
+    def mark_all_measurements_written(
+        self, kind: str, measurements: Iterable[StudentMeasurement]
+    ):
+        self._measurements[kind] = {measurement_key(m): m for m in measurements}
+
+    def _story_values(
+        self, global_state: BaseModel, local_state: LocalState
+    ) -> dict[str, Any]:
+        values = {
+            name: getattr(local_state, name)
+            for name in local_state.story_state_fields()
+            if name not in self.TRANSIENT_FIELDS
+        }
+        values["app"] = global_state
+        return values
+
+    def changed_story_fields(
+        self, global_state: BaseModel, local_state: LocalState
+    ) -> tuple[set[str], dict[str, Any]]:
+        """
+        Returns the names of the story state fields (with "app" standing in
+        for the global state) that changed since the last write, along with
+        the values to mark as written.
+        """
+        values = self._story_values(global_state, local_state)
+        if self._story is None:
+            return set(values.keys()), values
+
+        missing = object()
+        changed = {
+            key
+            for key in values.keys() | self._story.keys()
+            if not _unchanged(values.get(key, missing), self._story.get(key, missing))
+        }
+        return changed, values
+
+    def mark_story_written(self, values: dict[str, Any]):
+        self._story = values
+
+    def reset(self):
+        self._measurements.clear()
+        self._story = None
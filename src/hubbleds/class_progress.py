@@ -0,0 +1,216 @@
+import asyncio
+import os
+import threading
+from contextlib import nullcontext
+from itertools import count
+from typing import Callable, Optional
+
+from cosmicds.logger import setup_logger
+from solara.server import kernel_context
+
+from hubbleds.async_remote import ASYNC_API
+
+logger = setup_logger("CLASS PROGRESS")
+
+# Seconds between checks of a class's progress while students are waiting
+CLASS_PROGRESS_INTERVAL = float(os.getenv("HUBBLEDS_CLASS_PROGRESS_INTERVAL", 10))
+
+# Longest wait between checks when checks fail or nobody is waiting
+CLASS_PROGRESS_MAX_INTERVAL = float(
+    os.getenv("HUBBLEDS_CLASS_PROGRESS_MAX_INTERVAL", 12 * CLASS_PROGRESS_INTERVAL)
+)
+
+# A class's poller stops once nobody has waited on it for this many seconds
+CLASS_PROGRESS_IDLE_TIMEOUT = float(
+    os.getenv("HUBBLEDS_CLASS_PROGRESS_IDLE_TIMEOUT", 2 * CLASS_PROGRESS_MAX_INTERVAL)
+)
+
+ClassKey = tuple[str, int]
+
+
+class _Subscriber:
+    def __init__(self, student_id: int, callback: Callable[[int], None], context):
+        self.student_id = student_id
+        self.callback = callback
+        self.context = context
+
+
+class _ClassChannel:
+    def __init__(self, key: ClassKey):
+        self.key = key
+        self.subscribers: dict[int, _Subscriber] = {}
+        self.count: Optional[int] = None
+        self.wake: Optional[asyncio.Event] = None
+        self.future = None
+
+
+class ClassProgressBroadcaster:
+    """
+    Polls the number of students in a class that have completed their
+    measurements and fans the count out to every session waiting on that
+    class, so the API sees one request per class per interval no matter how
+    many students are waiting.
+
+    Each class is polled by one asyncio task on an event loop that runs in a
+    thread of its own. While nobody is subscribed to a class its task stops
+    polling and backs off, and once it has been idle for `idle_timeout`
+    seconds it exits. Failed checks back off too, up to `max_interval`.
+
+    Checks are made with `ASYNC_API` unless a synchronous `fetch` is given,
+    which is then run in a worker thread.
+
+    Callbacks are called from the broadcaster's thread, inside the kernel
+    context of the session that subscribed, so they can set that session's
+    reactive state.
+    """
+
+    def __init__(
+        self,
+        interval: float = CLASS_PROGRESS_INTERVAL,
+        max_interval: float = CLASS_PROGRESS_MAX_INTERVAL,
+        idle_timeout: float = CLASS_PROGRESS_IDLE_TIMEOUT,
+        fetch: Optional[Callable[[str, int, int], int]] = None,
+    ):
+        self.interval = interval
+        self.max_interval = max(max_interval, interval)
+        self.idle_timeout = idle_timeout
+        self._fetch = fetch
+        self._channels: dict[ClassKey, _ClassChannel] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ids = count()
+
+        self.requests = 0
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=self._loop.run_forever, name="class-progress", daemon=True
+            )
+            thread.start()
+        return self._loop
+
+    def subscribe(
+        self,
+        story_id: str,
+        class_id: int,
+        student_id: int,
+        callback: Callable[[int], None],
+    ) -> Callable[[], None]:
+        """
+        Calls `callback` with the class's completed count now (if it is
+        known) and whenever it is checked again. Returns a function that
+        unsubscribes, which is safe to call more than once.
+        """
+        try:
+            context = kernel_context.get_current_context()
+        except RuntimeError:
+            context = None
+
+        key = (story_id, class_id)
+        subscriber_id = next(self._ids)
+        subscriber = _Subscriber(student_id, callback, context)
+
+        with self._lock:
+            loop = self._ensure_loop()
+            channel = self._channels.get(key)
+            if channel is None:
+                channel = _ClassChannel(key)
+                self._channels[key] = channel
+            channel.subscribers[subscriber_id] = subscriber
+            last_count = channel.count
+
+            if channel.future is None or channel.future.done():
+                channel.future = asyncio.run_coroutine_threadsafe(
+                    self._poll(channel), loop
+                )
+            elif channel.wake is not None and len(channel.subscribers) == 1:
+                # The poller is backing off because nobody was waiting
+                loop.call_soon_threadsafe(channel.wake.set)
+
+        if last_count is not None:
+            self._notify(subscriber, last_count)
+
+        def _unsubscribe():
+            with self._lock:
+                channel.subscribers.pop(subscriber_id, None)
+
+        return _unsubscribe
+
+    @staticmethod
+    def _notify(subscriber: _Subscriber, value: int):
+        try:
+            with subscriber.context or nullcontext():
+                subscriber.callback(value)
+        except Exception:
+            logger.exception("Class progress subscriber failed.")
+
+    async def _poll(self, channel: _ClassChannel):
+        story_id, class_id = channel.key
+        loop = asyncio.get_running_loop()
+        channel.wake = asyncio.Event()
+        delay = self.interval
+        idle_since = None
+
+        logger.info("Started polling progress of class %s.", class_id)
+        while True:
+            with self._lock:
+                # Cleared before reading the subscribers so that a wake-up
+                #  from a later `subscribe` isn't lost
+                channel.wake.clear()
+                subscribers = list(channel.subscribers.values())
+
+                if not subscribers:
+                    now = loop.time()
+                    idle_since = idle_since or now
+                    if now - idle_since >= self.idle_timeout:
+                        self._channels.pop(channel.key, None)
+                        break
+
+            if subscribers:
+                idle_since = None
+                # Every waiting student has finished their own measurements,
+                #  so the count is the same whichever of them asks for it.
+                student_id = subscribers[0].student_id
+                try:
+                    self.requests += 1
+                    if self._fetch is None:
+                        value = await ASYNC_API.fetch_students_completed_count(
+                            story_id, student_id, class_id
+                        )
+                    else:
+                        value = await loop.run_in_executor(
+                            None, self._fetch, story_id, student_id, class_id
+                        )
+                except Exception:
+                    logger.exception("Failed to check progress of class %s.", class_id)
+                    delay = min(delay * 2, self.max_interval)
+                else:
+                    delay = self.interval
+                    channel.count = value
+                    for subscriber in subscribers:
+                        self._notify(subscriber, value)
+            else:
+                delay = min(delay * 2, self.max_interval)
+
+            try:
+                await asyncio.wait_for(channel.wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                delay = self.interval
+
+        logger.info("Stopped polling progress of class %s.", class_id)
+
+    def subscriber_count(self, story_id: Optional[str] = None, class_id: Optional[int] = None) -> int:
+        with self._lock:
+            return sum(
+                len(channel.subscribers)
+                for key, channel in self._channels.items()
+                if (story_id is None or key[0] == story_id)
+                and (class_id is None or key[1] == class_id)
+            )
+
+
+CLASS_PROGRESS = ClassProgressBroadcaster()
@@ -0,0 +1,311 @@
+import datetime
+import types
+import typing
+from array import array
+from typing import Any, ClassVar, Iterable, Iterator, Optional, Union
+
+import numpy as np
+from pydantic import BaseModel, GetCoreSchemaHandler
+from pydantic_core import PydanticUndefined, core_schema
+
+from cosmicds.utils import component_type_for_field
+from glue.core import Data
+
+
+def _strip_optional(annotation) -> tuple[Any, bool]:
+    origin = typing.get_origin(annotation)
+    if origin is Union or origin is types.UnionType:
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        optional = len(args) < len(typing.get_args(annotation))
+        if len(args) == 1:
+            return args[0], optional
+        return annotation, optional
+    return annotation, False
+
+
+def column_dtype(annotation) -> np.dtype:
+    """
+    The dtype of the column holding a field with the given annotation.
+    Optional integers are stored as floats so that missing values can be NaN.
+    Strings and anything that isn't a number are stored as objects.
+    """
+    annotation, optional = _strip_optional(annotation)
+    if annotation is bool and not optional:
+        return np.dtype(bool)
+    if annotation is int and not optional:
+        return np.dtype(np.int64)
+    if annotation in (int, float):
+        return np.dtype(np.float64)
+    return np.dtype(object)
+
+
+def _parse_datetime(value):
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value)
+    return value
+
+
+def _column(values: list, dtype: np.dtype) -> np.ndarray:
+    if dtype == object:
+        column = np.empty(len(values), dtype=object)
+        column[:] = values
+        return column
+    return np.array(values, dtype=dtype)
+
+
+class ColumnarTable:
+    """
+    An immutable table of rows of a pydantic model, stored as one NumPy
+    array per model field. Subclasses pick the model:
+
+        class StudentMeasurementTable(ColumnarTable, model=StudentMeasurement):
+            pass
+
+    Rows can be read back as model instances, but the point of the table is
+    to go from JSON records to glue `Data` without building a model per row.
+    Tables can be used as pydantic fields; lists of models or records are
+    converted when validated.
+    """
+
+    model: ClassVar[type[BaseModel]]
+    schema: ClassVar[dict[str, np.dtype]]
+    _parsers: ClassVar[dict[str, Any]] = {}
+    _optional_ints: ClassVar[frozenset[str]] = frozenset()
+
+    def __init_subclass__(cls, model: Optional[type[BaseModel]] = None, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if model is not None:
+            cls.model = model
+            cls.schema = {
+                name: column_dtype(info.annotation)
+                for name, info in model.model_fields.items()
+            }
+            # Values that JSON can only carry as strings
+            cls._parsers = {
+                name: _parse_datetime
+                for name, info in model.model_fields.items()
+                if _strip_optional(info.annotation)[0] is datetime.datetime
+            }
+            cls._optional_ints = frozenset(
+                name
+                for name, info in model.model_fields.items()
+                if _strip_optional(info.annotation) == (int, True)
+            )
+
+    def __init__(self, columns: Optional[dict[str, np.ndarray]] = None):
+        if columns is None:
+            columns = {
+                name: np.empty(0, dtype=dtype) for name, dtype in self.schema.items()
+            }
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+        self._columns = columns
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def _default(cls, name: str):
+        info = cls.model.model_fields[name]
+        if info.default is not PydanticUndefined:
+            return info.default
+        if info.default_factory is not None:
+            return info.default_factory()
+        raise ValueError(f"Missing required field `{name}` for {cls.model.__name__}")
+
+    @classmethod
+    def builder(cls) -> "TableBuilder":
+        return TableBuilder(cls)
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]):
+        """
+        Builds a table from JSON-like dicts, such as those returned by the
+        API. Keys that aren't model fields are ignored and missing fields
+        take their defaults.
+        """
+        builder = cls.builder()
+        for record in records:
+            builder.append(record)
+        return builder.build()
+
+    @classmethod
+    def from_models(cls, items: Iterable[BaseModel]):
+        return cls.from_records(
+            {name: getattr(item, name) for name in cls.schema} for item in items
+        )
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[BaseModel]:
+        for i in range(self._length):
+            yield self[i]
+
+    def __getitem__(self, index: int) -> BaseModel:
+        return self.model(**self.record(index))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ColumnarTable):
+            return NotImplemented
+        if other is self:
+            return True
+        return (
+            self.model is other.model
+            and len(self) == len(other)
+            and all(
+                np.array_equal(
+                    column, other._columns[name], equal_nan=column.dtype.kind == "f"
+                )
+                for name, column in self._columns.items()
+            )
+        )
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._length} rows)"
+
+    @property
+    def columns(self) -> dict[str, np.ndarray]:
+        return self._columns
+
+    def column(self, name: str) -> np.ndarray:
+        return self._columns[name]
+
+    def record(self, index: int) -> dict[str, Any]:
+        record = {}
+        for name, column in self._columns.items():
+            value = column[index]
+            if isinstance(value, float) and np.isnan(value):
+                value = None
+            elif isinstance(value, np.generic):
+                value = value.item()
+                if isinstance(value, float) and np.isnan(value):
+                    value = None
+            record[name] = value
+        return record
+
+    def to_models(self) -> list[BaseModel]:
+        return list(self)
+
+    def take(self, indices) -> "ColumnarTable":
+        """
+        A table with the rows at `indices`, or where a mask is True. A mask
+        that keeps every row returns this table itself.
+        """
+        indices = np.asarray(indices)
+        if indices.dtype == bool and indices.all():
+            return self
+        return type(self)({name: column[indices] for name, column in self._columns.items()})
+
+    def concat(self, other: Union["ColumnarTable", Iterable[BaseModel]]) -> "ColumnarTable":
+        """
+        A table with the rows of `other` (a table or models) appended. If
+        `other` is empty this table itself is returned.
+        """
+        if not isinstance(other, ColumnarTable):
+            other = type(self).from_models(other)
+        if not len(other):
+            return self
+        return type(self)({
+            name: np.concatenate((column, other._columns[name]))
+            for name, column in self._columns.items()
+        })
+
+    def to_glue_data(
+        self, label: Optional[str] = None, ignore_components: Optional[list[str]] = None
+    ) -> Data:
+        """
+        The `Data` that `models_to_glue_data` makes from the equivalent list
+        of models, without going through the models. Numeric components get
+        the same dtypes, except that missing optional numbers are NaN here
+        rather than None in an object array. Strings stay in object arrays.
+        """
+        data_dict = {}
+        if self._length:
+            ignore = ignore_components or []
+            for name, info in self.model.model_fields.items():
+                if name not in ignore:
+                    column = self._columns[name]
+                    # Optional integers are only floats to hold NaN
+                    if name in self._optional_ints and not np.isnan(column).any():
+                        column = column.astype(np.int64)
+                    component_type = component_type_for_field(info)
+                    data_dict[name] = component_type(column)
+        if label:
+            data_dict["label"] = label
+        return Data(**data_dict)
+
+    @classmethod
+    def _validate(cls, value):
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, ColumnarTable):
+            raise ValueError(f"Expected a {cls.__name__}, got a {type(value).__name__}")
+        rows = list(value)
+        if all(isinstance(row, BaseModel) for row in rows):
+            return cls.from_models(rows)
+        return cls.from_records(rows)
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source_type: Any, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            cls._validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda table: [table.record(i) for i in range(len(table))]
+            ),
+        )
+
+
+# Numeric columns are accumulated in compact `array.array` buffers
+_TYPECODES = {np.dtype(np.float64): "d", np.dtype(np.int64): "q"}
+
+
+class TableBuilder:
+    """
+    Builds a `ColumnarTable` one record at a time. Numbers go straight into
+    packed buffers and repeated strings are shared, so records can be
+    discarded as soon as they are appended, e.g. while streaming a response.
+    """
+
+    def __init__(self, table_type: type[ColumnarTable]):
+        self.table_type = table_type
+        self._buffers: dict[str, Union[array, list]] = {
+            name: array(_TYPECODES[dtype]) if dtype in _TYPECODES else []
+            for name, dtype in table_type.schema.items()
+        }
+        self._strings: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(next(iter(self._buffers.values()), ()))
+
+    def append(self, record: dict):
+        parsers = self.table_type._parsers
+        for name, buffer in self._buffers.items():
+            value = record.get(name, PydanticUndefined)
+            if value is PydanticUndefined:
+                value = self.table_type._default(name)
+            if name in parsers:
+                value = parsers[name](value)
+
+            if isinstance(buffer, array):
+                if buffer.typecode == "q":
+                    buffer.append(int(value))
+                else:
+                    buffer.append(np.nan if value is None else value)
+            else:
+                if isinstance(value, str):
+                    value = self._strings.setdefault(value, value)
+                buffer.append(value)
+
+    def build(self) -> ColumnarTable:
+        columns = {}
+        for name, dtype in self.table_type.schema.items():
+            buffer = self._buffers[name]
+            if isinstance(buffer, array):
+                columns[name] = np.frombuffer(buffer, dtype=dtype) if buffer else np.empty(0, dtype=dtype)
+            else:
+                columns[name] = _column(buffer, dtype)
+        return self.table_type(columns)
@@ -227,7 +227,7 @@ def SelectionTool(
         if current_layer.value is None:
             table = Table(
                 {
-                    k: [x.dict()[k] for x in LOCAL_STATE.value.galaxies.values()]
+                    k: [getattr(x, k) for x in LOCAL_STATE.value.galaxies.values()]
                     for k in ["id", "ra", "decl"]
                 }
             )
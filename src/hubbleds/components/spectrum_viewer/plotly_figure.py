@@ -4,8 +4,61 @@ TODO: This needs to be removed. We only keep this here because plotly keeps
   don't have access to it from Solara natively.
 """
 
+import numpy as np
 import solara
-from typing import Callable, Any
+from typing import Callable, Any, Optional
+
+
+def _values_equal(a, b) -> bool:
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        try:
+            return np.array_equal(np.asarray(a), np.asarray(b))
+        except (TypeError, ValueError):
+            return False
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return False
+
+
+def _cleared(old: dict) -> dict:
+    # Sets every leaf of `old` to `None`, leaving the subtrees in place
+    return {
+        key: _cleared(value) if isinstance(value, dict) else None
+        for key, value in old.items()
+    }
+
+
+def diff_properties(new: dict, old: dict, clear_missing: bool = True, keep=()) -> dict:
+    """
+    Returns the nested property updates that turn `old` into `new`, where
+    both are plotly JSON dicts as returned by `to_plotly_json`. Only changed
+    leaves are included. With `clear_missing`, leaves that `old` has and
+    `new` doesn't are set to `None`, except under top-level keys in `keep`.
+    Whole subtrees are never set to `None`, since plotly would drop them
+    along with any leaves it fills in itself.
+    """
+    diff = {}
+    for key, value in new.items():
+        old_value = old.get(key)
+        if isinstance(value, dict) and isinstance(old_value, dict):
+            nested = diff_properties(value, old_value, clear_missing)
+            if nested:
+                diff[key] = nested
+        elif key not in old or not _values_equal(value, old_value):
+            diff[key] = value
+
+    if clear_missing:
+        for key in old.keys() - new.keys() - set(keep):
+            old_value = old[key]
+            if isinstance(old_value, dict):
+                cleared = _cleared(old_value)
+                if cleared:
+                    diff[key] = cleared
+            elif old_value is not None:
+                diff[key] = None
+
+    return diff
 
 
 @solara.component
@@ -19,7 +72,22 @@ def FigurePlotly(
     on_relayout: Callable[[Any], None] = None,
     dependencies=None,
     config=None,
+    trace_updates: Optional[list[dict]] = None,
+    layout_updates: Optional[dict] = None,
+    shape_updates: Optional[dict[str, dict]] = None,
+    annotation_updates: Optional[dict[str, dict]] = None,
 ):
+    """
+    Renders `fig`, bringing the widget's figure in line with it whenever
+    `dependencies` change. Only the trace and layout properties that differ
+    from the widget's current state are sent.
+
+    The `*_updates` arguments patch the current figure in place without
+    resending it: `trace_updates` holds property updates for the traces in
+    order, and `shape_updates` and `annotation_updates` map shape and
+    annotation names to property updates. Traces are only patched when the
+    `trace_updates` object itself changes, so keep it in a memo.
+    """
     from plotly.graph_objs._figurewidget import FigureWidget
 
     def on_points_callback(data):
@@ -45,14 +113,72 @@ def FigurePlotly(
 
     def update_data():
         fig_widget: FigureWidget = solara.get_widget(fig_element)
-        fig_widget.layout = fig.layout
-
         fig_widget._config = fig._config | (config or {})
 
-        length = len(fig_widget.data)
-        fig_widget.add_traces(fig.data)
-        data = list(fig_widget.data)
-        fig_widget.data = data[length:]
+        # Traces are matched up by position. Widget traces past the first one
+        #  whose type differs from the new figure's are replaced.
+        matched = 0
+        for trace, new_trace in zip(fig_widget.data, fig.data):
+            if trace.type != new_trace.type:
+                break
+            matched += 1
+
+        if matched < len(fig_widget.data):
+            fig_widget.data = fig_widget.data[:matched]
+
+        with fig_widget.batch_update():
+            for trace, new_trace in zip(fig_widget.data, fig.data):
+                changes = diff_properties(
+                    new_trace.to_plotly_json(), trace.to_plotly_json(), keep={"uid"}
+                )
+                if changes:
+                    trace.update(changes)
+
+            # The widget's layout also holds what the user did to the plot,
+            #  such as the axis ranges they zoomed to, so layout properties
+            #  the new figure doesn't set are left alone
+            changes = diff_properties(
+                fig.layout.to_plotly_json(),
+                fig_widget.layout.to_plotly_json(),
+                clear_missing=False,
+            )
+            if changes:
+                fig_widget.layout.update(changes)
+
+        if matched < len(fig.data):
+            fig_widget.add_traces(fig.data[matched:])
+
+    dependencies = dependencies or [fig]
+    solara.use_effect(update_data, dependencies)
+
+    def update_traces():
+        if not trace_updates:
+            return
+
+        fig_widget: FigureWidget = solara.get_widget(fig_element)
+        with fig_widget.batch_update():
+            for trace, update in zip(fig_widget.data, trace_updates):
+                changes = diff_properties(
+                    update, trace.to_plotly_json(), clear_missing=False
+                )
+                if changes:
+                    trace.update(changes)
+
+    solara.use_effect(update_traces, [*dependencies, id(trace_updates)])
+
+    def update_layout():
+        fig_widget: FigureWidget = solara.get_widget(fig_element)
+        with fig_widget.batch_update():
+            if layout_updates:
+                fig_widget.update_layout(layout_updates)
+            for name, update in (shape_updates or {}).items():
+                fig_widget.update_shapes(update, selector=dict(name=name))
+            for name, update in (annotation_updates or {}).items():
+                fig_widget.update_annotations(update, selector=dict(name=name))
+
+    solara.use_effect(
+        update_layout,
+        [*dependencies, layout_updates, shape_updates, annotation_updates],
+    )
 
-    solara.use_effect(update_data, dependencies or fig)
     return fig_element
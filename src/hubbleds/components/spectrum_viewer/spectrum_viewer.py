@@ -9,6 +9,7 @@ from hubbleds.components.spectrum_viewer.plotly_figure import FigurePlotly
 from cosmicds.logger import setup_logger
 from hubbleds.viewer_marker_colors import GENERIC_COLOR, H_ALPHA_COLOR, MY_DATA_COLOR, LIGHT_GENERIC_COLOR
 from hubbleds.utils import PLOTLY_MARGINS
+from hubbleds.decimation import DISPLAY_POINTS, decimate
 
 from glue_plotly.common import DEFAULT_FONT
 
@@ -33,6 +34,7 @@ def SpectrumViewer(
     on_spectrum_bounds_changed: Callable = lambda x: None,
     max_spectrum_bounds: Optional[solara.Reactive[list[float]]] = None,
     spectrum_color: str = GENERIC_COLOR,
+    display_points: int = DISPLAY_POINTS,
 ):
     
     logger.info("Creating SpectrumViewer")
@@ -67,162 +69,63 @@ def SpectrumViewer(
             max_spectrum_bounds.set([spec["wave"].min(), spec["wave"].max()])
     
 
-    def _rest_wave_tool_toggled():
-        on_rest_wave_tool_clicked()
-
-
-
-    def _on_relayout(event):
-        if event is None:
-            return
-
-        try:
-            x_bounds.set(
-                [
-                    event["relayout_data"]["xaxis.range[0]"],
-                    event["relayout_data"]["xaxis.range[1]"],
-                ]
-            )
-            # y_bounds.set(
-            #     [
-            #         event["relayout_data"]["yaxis.range[0]"],
-            #         event["relayout_data"]["yaxis.range[1]"],
-            #     ]
-            # )
-            toggle_group_state.set([x for x in toggle_group_state.value if x != 0])
-        except:
-            x_bounds.set([])
-            y_bounds.set([])
-
-        if "relayout_data" in event:
-            if "xaxis.range[0]" in event["relayout_data"] and "xaxis.range[1]" in event["relayout_data"]:
-                if spectrum_bounds is not None:
-                    spectrum_bounds.set([
-                        event["relayout_data"]["xaxis.range[0]"],
-                        event["relayout_data"]["xaxis.range[1]"],
-                    ])
-                on_zoom()
-
-    def _on_reset_button_clicked(*args, **kwargs):
-        x_bounds.set([])
-        y_bounds.set([])
-        try:
-            if spec_data_task.value is not None and spectrum_bounds is not None:
-                spectrum_bounds.set([
-                    spec_data_task.value["wave"].min(),
-                    spec_data_task.value["wave"].max(),
-                ])
-        except Exception as e:
-            print(e)
+    # Only a display resolution copy of the visible part of the spectrum is
+    #  sent to the browser; zooming in re-decimates the visible window. The
+    #  spectrum bundle already holds the unzoomed copy of each spectrum.
+    def _full_display_spectrum():
+        spec = spec_data_task.value
+        if not isinstance(spec, DataFrame) or galaxy_data is None:
+            return None
 
-        on_reset_tool_clicked()
-    
-    solara.use_effect(_on_reset_button_clicked, dependencies=[galaxy_data])
+        display = galaxy_data.display_spectrum(display_points)
+        if display is not None:
+            return display
 
-    def _spectrum_clicked(**kwargs):
-        if spectrum_click_enabled:
-            vertical_line_visible.set(True)
-            on_obs_wave_measured(kwargs["points"]["xs"][0])
-        if marker_position is not None:
-            # vertical_line_visible.set(False)
-            value = kwargs["points"]["xs"][0]
-            marker_position.set(value)
-            on_set_marker_position(value)
+        return decimate(spec["wave"].to_numpy(), spec["flux"].to_numpy(), display_points)
 
-    def _zoom_button_clicked():
-        on_zoom_tool_clicked()
-        on_zoom_tool_toggled()  
-
-    with rv.Card():
-        with rv.Toolbar(class_="toolbar", dense=True):
-            with rv.ToolbarTitle():
-                solara.Text("SPECTRUM VIEWER")
+    full_display_spectrum = solara.use_memo(
+        _full_display_spectrum,
+        dependencies=[id(spec_data_task.value), display_points],
+    )
 
-            rv.Spacer()
+    def _display_spectrum():
+        spec = spec_data_task.value
+        if full_display_spectrum is None or not x_bounds.value:
+            return full_display_spectrum
 
-            reset_button = solara.IconButton(
-                v_on="tooltip.on",
-                flat=True,
-                tile=True,
-                icon_name="mdi-cached",
-                on_click=_on_reset_button_clicked,
-            )
-            
-            rv.Tooltip(
-                top=True,
-                v_slots = [{
-                    "name": "activator",
-                    "variable": "tooltip",
-                    "children": rv.FabTransition(children=[reset_button])
-                }],
-                children = ["Reset View"]
-            )
-            
-            
-            with rv.BtnToggle(
-                v_model=toggle_group_state.value,
-                on_v_model=toggle_group_state.set,
-                flat=True,
-                tile=True,
-                group=True,
-                multiple=True,
-            ):
-
-                zoom_button = solara.IconButton(
-                    v_on="tooltip.on",
-                    icon_name="mdi-select-search",
-                    on_click=_zoom_button_clicked,
-                )
-                
-                rv.Tooltip(
-                    top=True,
-                    v_slots = [{
-                        "name": "activator",
-                        "variable": "tooltip",
-                        "children": rv.FabTransition(children=[zoom_button])
-                    }],
-                    children = ["Zoom wavelength axis"]
-                )
+        return decimate(
+            spec["wave"].to_numpy(),
+            spec["flux"].to_numpy(),
+            display_points,
+            x_range=x_bounds.value,
+        )
 
-                rest_wave_button = solara.IconButton(
-                    v_on="tooltip.on",
-                    icon_name="mdi-lambda",
-                    on_click=_rest_wave_tool_toggled,
-                )
-                
-                rv.Tooltip(
-                    top=True,
-                    v_slots = [{
-                        "name": "activator",
-                        "variable": "tooltip",
-                        "children": rv.FabTransition(children=[rest_wave_button])
-                    }],
-                    children = ["Show rest wavelength"]
-                )
+    display_spectrum = solara.use_memo(
+        _display_spectrum,
+        dependencies=[id(full_display_spectrum), tuple(x_bounds.value)],
+    )
 
-        if spec_data_task.value is None:
-            with rv.Sheet(
-                style_="height: 360px", class_="d-flex justify-center align-center"
-            ):
-                rv.ProgressCircular(size=100, indeterminate=True, color="primary")
+    trace_updates = solara.use_memo(
+        lambda: None if display_spectrum is None else [
+            dict(x=display_spectrum[0], y=display_spectrum[1])
+        ],
+        dependencies=[id(display_spectrum)],
+    )
 
-            return
-        elif not isinstance(spec_data_task.value, DataFrame):
-            with rv.Sheet(
-                style_="height: 360px", class_="d-flex justify-center align-center"
-            ):
-                solara.Text("Select a galaxy to view its spectrum")
+    # The figure is built once per galaxy, with every shape and annotation in
+    #  place. Interactions only patch the named shapes and annotations, the
+    #  axes and (when zooming) the trace, so they don't resend the spectrum.
+    def _build_figure():
+        spec = spec_data_task.value
+        if full_display_spectrum is None or galaxy_data is None:
+            return None
 
-            return
-        
-        if galaxy_data is None:
-            logger.info('galaxy_data is None')
-            return
+        display_wave, display_flux = full_display_spectrum
 
         fig = go.Figure()
         fig.add_trace(go.Scatter(
-                        x= spec_data_task.value["wave"], 
-                        y= spec_data_task.value["flux"],
+                        x= display_wave, 
+                        y= display_flux,
                         line=dict(
                             color=spectrum_color,
                             width=2,
@@ -278,17 +181,19 @@ def SpectrumViewer(
 
         # This is the line that appears when user first makes observed wavelength measurement
         fig.add_vline(
-            x=obs_wave,
+            name="obs_wave_line",
+            x=0.0,
             line_width=2,
             line_color= MY_DATA_COLOR,
-            visible=vertical_line_visible.value and obs_wave > 0.0 and spectrum_click_enabled,
+            visible=False,
         )
 
         # Orange "Your Measurement" Marker Line & Label
         fig.add_shape(
+            name="measurement_marker",
             type='line',
-            x0=obs_wave,
-            x1=obs_wave,
+            x0=0.0,
+            x1=0.0,
             y0=0.0,
             y1=0.2,
             xref="x",
@@ -309,17 +214,17 @@ def SpectrumViewer(
                 "yanchor": "top",
                 "textangle": 0,
             },
-            visible=vertical_line_visible.value and obs_wave > 0.0  and not spectrum_click_enabled,
+            visible=False,
         )
         
         # Light gray measurement line
-        if (marker_position is not None) and (not spectrum_click_enabled):
-            fig.add_vline(
-                x = marker_position.value,
-                line_width = 2,
-                line_color = LIGHT_GENERIC_COLOR,
-                visible = True,
-            )
+        fig.add_vline(
+            name="marker_position",
+            x=0.0,
+            line_width = 2,
+            line_color = LIGHT_GENERIC_COLOR,
+            visible = False,
+        )
         
 
         # Red Observed H-alpha Marker Line
@@ -355,6 +260,7 @@ def SpectrumViewer(
 
         # Black Rest H-alpha Marker Line            
         fig.add_shape(
+            name="rest_wave_line",
             editable=False,
             type="line",
             x0=galaxy_data.rest_wave_value,
@@ -369,11 +275,12 @@ def SpectrumViewer(
                 dash="dot",
                 width=4
             ),
-            visible=1 in toggle_group_state.value,
+            visible=False,
         )
 
         # Black Rest H-alpha Marker Label
         fig.add_annotation(
+            name="rest_wave_label",
             x=galaxy_data.rest_wave_value - 7,
             y= 0.99,
             yref="paper",
@@ -387,7 +294,7 @@ def SpectrumViewer(
             ),
             xanchor="right",
             yanchor="top",
-            visible=1 in toggle_group_state.value,
+            visible=False,
         )
 
         fig.update_layout(
@@ -406,43 +313,210 @@ def SpectrumViewer(
             hovermode="x",
         )
 
-        if x_bounds.value:  # and y_bounds.value:
-            fig.update_xaxes(range=x_bounds.value)
-            # fig.update_yaxes(range=y_bounds.value)
-        # else:
         fig.update_yaxes(
             range=[
-                spec_data_task.value["flux"].min() * 0.95,
-                spec_data_task.value["flux"].max() * 1.25,
+                spec["flux"].min() * 0.95,
+                spec["flux"].max() * 1.25,
             ]
         )
 
-        fig.update_layout(dragmode="zoom" if 0 in toggle_group_state.value else False)
-        
-        
-        
-        dependencies = [
-            obs_wave,
-            spectrum_click_enabled,
-            vertical_line_visible.value,
-            toggle_group_state.value,
-            x_bounds.value,
-            y_bounds.value,
-            
-        ]
-        
+        return fig
+
+    fig = solara.use_memo(
+        _build_figure,
+        dependencies=[galaxy_data, id(full_display_spectrum), spectrum_color],
+    )
+
+    obs_wave_value = obs_wave or 0.0
+    shape_updates = {
+        "obs_wave_line": dict(
+            x0=obs_wave_value,
+            x1=obs_wave_value,
+            visible=vertical_line_visible.value and obs_wave_value > 0.0 and spectrum_click_enabled,
+        ),
+        "measurement_marker": dict(
+            x0=obs_wave_value,
+            x1=obs_wave_value,
+            visible=vertical_line_visible.value and obs_wave_value > 0.0 and not spectrum_click_enabled,
+        ),
+        "marker_position": dict(
+            x0=marker_position.value if marker_position is not None else 0.0,
+            x1=marker_position.value if marker_position is not None else 0.0,
+            visible=(marker_position is not None) and (not spectrum_click_enabled),
+        ),
+        "rest_wave_line": dict(visible=1 in toggle_group_state.value),
+    }
+    annotation_updates = {
+        "rest_wave_label": dict(visible=1 in toggle_group_state.value),
+    }
+    layout_updates = dict(
+        xaxis=dict(range=list(x_bounds.value)) if x_bounds.value else dict(autorange=True),
+        dragmode="zoom" if 0 in toggle_group_state.value else False,
+    )
+
+    def _rest_wave_tool_toggled():
+        on_rest_wave_tool_clicked()
+
+
+
+    def _on_relayout(event):
+        if event is None:
+            return
+
+        try:
+            x_bounds.set(
+                [
+                    event["relayout_data"]["xaxis.range[0]"],
+                    event["relayout_data"]["xaxis.range[1]"],
+                ]
+            )
+            # y_bounds.set(
+            #     [
+            #         event["relayout_data"]["yaxis.range[0]"],
+            #         event["relayout_data"]["yaxis.range[1]"],
+            #     ]
+            # )
+            toggle_group_state.set([x for x in toggle_group_state.value if x != 0])
+        except:
+            x_bounds.set([])
+            y_bounds.set([])
+
+        if "relayout_data" in event:
+            if "xaxis.range[0]" in event["relayout_data"] and "xaxis.range[1]" in event["relayout_data"]:
+                if spectrum_bounds is not None:
+                    spectrum_bounds.set([
+                        event["relayout_data"]["xaxis.range[0]"],
+                        event["relayout_data"]["xaxis.range[1]"],
+                    ])
+                on_zoom()
+
+    def _on_reset_button_clicked(*args, **kwargs):
+        x_bounds.set([])
+        y_bounds.set([])
+        try:
+            if spec_data_task.value is not None and spectrum_bounds is not None:
+                spectrum_bounds.set([
+                    spec_data_task.value["wave"].min(),
+                    spec_data_task.value["wave"].max(),
+                ])
+        except Exception as e:
+            print(e)
+
+        on_reset_tool_clicked()
+    
+    solara.use_effect(_on_reset_button_clicked, dependencies=[galaxy_data])
+
+    def _spectrum_clicked(**kwargs):
+        if spectrum_click_enabled:
+            vertical_line_visible.set(True)
+            on_obs_wave_measured(kwargs["points"]["xs"][0])
         if marker_position is not None:
-            dependencies.append(marker_position.value)
+            # vertical_line_visible.set(False)
+            value = kwargs["points"]["xs"][0]
+            marker_position.set(value)
+            on_set_marker_position(value)
+
+    def _zoom_button_clicked():
+        on_zoom_tool_clicked()
+        on_zoom_tool_toggled()  
+
+    with rv.Card():
+        with rv.Toolbar(class_="toolbar", dense=True):
+            with rv.ToolbarTitle():
+                solara.Text("SPECTRUM VIEWER")
+
+            rv.Spacer()
+
+            reset_button = solara.IconButton(
+                v_on="tooltip.on",
+                flat=True,
+                tile=True,
+                icon_name="mdi-cached",
+                on_click=_on_reset_button_clicked,
+            )
+            
+            rv.Tooltip(
+                top=True,
+                v_slots = [{
+                    "name": "activator",
+                    "variable": "tooltip",
+                    "children": rv.FabTransition(children=[reset_button])
+                }],
+                children = ["Reset View"]
+            )
+            
+            
+            with rv.BtnToggle(
+                v_model=toggle_group_state.value,
+                on_v_model=toggle_group_state.set,
+                flat=True,
+                tile=True,
+                group=True,
+                multiple=True,
+            ):
+
+                zoom_button = solara.IconButton(
+                    v_on="tooltip.on",
+                    icon_name="mdi-select-search",
+                    on_click=_zoom_button_clicked,
+                )
+                
+                rv.Tooltip(
+                    top=True,
+                    v_slots = [{
+                        "name": "activator",
+                        "variable": "tooltip",
+                        "children": rv.FabTransition(children=[zoom_button])
+                    }],
+                    children = ["Zoom wavelength axis"]
+                )
+
+                rest_wave_button = solara.IconButton(
+                    v_on="tooltip.on",
+                    icon_name="mdi-lambda",
+                    on_click=_rest_wave_tool_toggled,
+                )
+                
+                rv.Tooltip(
+                    top=True,
+                    v_slots = [{
+                        "name": "activator",
+                        "variable": "tooltip",
+                        "children": rv.FabTransition(children=[rest_wave_button])
+                    }],
+                    children = ["Show rest wavelength"]
+                )
+
+        if spec_data_task.value is None:
+            with rv.Sheet(
+                style_="height: 360px", class_="d-flex justify-center align-center"
+            ):
+                rv.ProgressCircular(size=100, indeterminate=True, color="primary")
+
+            return
+        elif not isinstance(spec_data_task.value, DataFrame):
+            with rv.Sheet(
+                style_="height: 360px", class_="d-flex justify-center align-center"
+            ):
+                solara.Text("Select a galaxy to view its spectrum")
+
+            return
         
+        if fig is None:
+            logger.info('galaxy_data is None')
+            return
+
         FigurePlotly(
             fig,
             on_click=lambda kwargs: _spectrum_clicked(**kwargs),
             on_relayout=_on_relayout,
-            dependencies=dependencies,
+            dependencies=[id(fig)],
+            trace_updates=trace_updates,
+            layout_updates=layout_updates,
+            shape_updates=shape_updates,
+            annotation_updates=annotation_updates,
             config={
                 "displayModeBar": False,
                 "showTips": False 
             },
         )
-
-
@@ -0,0 +1,108 @@
+import os
+from typing import Optional, Sequence
+
+import numpy as np
+
+# Number of points a spectrum is decimated to for display. A few points per
+#  pixel of the spectrum viewer's width keeps lines looking the same.
+DISPLAY_POINTS = int(os.getenv("HUBBLEDS_SPECTRUM_DISPLAY_POINTS", 1000))
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indices of a min-max decimation of `y` down to at most about `n_out`
+    points. The samples are split into `n_out // 2` equal buckets and the
+    minimum and maximum of each bucket are kept, so narrow absorption and
+    emission lines survive the decimation. The first and last samples are
+    always kept.
+    """
+    y = np.asarray(y)
+    n = len(y)
+    n_buckets = max(n_out // 2, 1)
+    if n <= n_out or n < 2:
+        return np.arange(n)
+
+    bucket_size = -(-n // n_buckets)
+    padded = np.pad(y, (0, n_buckets * bucket_size - n), mode="edge")
+    buckets = padded.reshape(n_buckets, bucket_size)
+    offsets = np.arange(n_buckets) * bucket_size
+
+    indices = np.concatenate((
+        offsets + buckets.argmin(axis=1),
+        offsets + buckets.argmax(axis=1),
+        [0, n - 1],
+    ))
+    return np.unique(np.minimum(indices, n - 1))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indices of a Largest-Triangle-Three-Buckets decimation of `(x, y)` down
+    to `n_out` points. From each bucket this keeps the point that forms the
+    largest triangle with the point kept from the previous bucket and the
+    average of the next bucket, which follows the shape of the curve more
+    smoothly than min-max at the same number of points.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    # The first and last points are buckets of their own
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    indices = np.empty(n_out, dtype=np.intp)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        prev_x, prev_y = x[indices[i]], y[indices[i]]
+        areas = np.abs(
+            (prev_x - avg_x) * (y[start:end] - prev_y)
+            - (prev_x - x[start:end]) * (avg_y - prev_y)
+        )
+        indices[i + 1] = start + areas.argmax()
+
+    return indices
+
+
+_METHODS = {
+    "minmax": lambda x, y, n_out: minmax_indices(y, n_out),
+    "lttb": lttb_indices,
+}
+
+
+def decimate(
+    x: np.ndarray,
+    y: np.ndarray,
+    n_out: int = DISPLAY_POINTS,
+    x_range: Optional[Sequence[float]] = None,
+    method: str = "minmax",
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Decimates `(x, y)` to about `n_out` points for display. If `x_range` is
+    given, only the samples inside it (plus one on either side, so the curve
+    reaches the edges of the plot) are kept and decimated, which gives a
+    zoomed-in view its full resolution back. `x` must be sorted.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+
+    if x_range is not None and len(x_range) == 2:
+        low, high = sorted(x_range)
+        start = max(np.searchsorted(x, low, side="left") - 1, 0)
+        stop = min(np.searchsorted(x, high, side="right") + 1, len(x))
+        x = x[start:stop]
+        y = y[start:stop]
+
+    indices = _METHODS[method](x, y, n_out)
+    return x[indices], y[indices]
+
+
+def minmax_decimate(x: np.ndarray, y: np.ndarray, n_out: int) -> tuple[np.ndarray, np.ndarray]:
+    return decimate(x, y, n_out, method="minmax")
@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Hashable, Iterable, Optional
+
+from cosmicds.logger import setup_logger
+
+from hubbleds.state import GalaxyData
+
+logger = setup_logger("CATALOG")
+
+# Seconds before a cached galaxy catalog is fetched again
+GALAXY_CATALOG_TTL = float(os.getenv("HUBBLEDS_GALAXY_CATALOG_TTL", 3600))
+
+
+class GalaxyCatalog:
+    """
+    A read-only snapshot of the galaxy catalog, indexed by galaxy id.
+    Instances are shared between sessions, so don't mutate them.
+    """
+
+    def __init__(self, galaxies: Iterable[GalaxyData]):
+        self.galaxies: tuple[GalaxyData, ...] = tuple(galaxies)
+        self.by_id: dict[int, GalaxyData] = {g.id: g for g in self.galaxies}
+
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.galaxies)
+
+    def get(self, galaxy_id: int) -> Optional[GalaxyData]:
+        return self.by_id.get(galaxy_id)
+
+
+class GalaxyCatalogCache:
+    """
+    Process-wide cache of galaxy catalogs. Each key is loaded at most once per
+    `ttl` seconds no matter how many sessions ask for it concurrently. If a
+    refresh fails, the stale catalog keeps being served.
+    """
+
+    def __init__(self, ttl: float = GALAXY_CATALOG_TTL):
+        self.ttl = ttl
+        self._catalogs: dict[Hashable, GalaxyCatalog] = {}
+        self._locks: dict[Hashable, threading.Lock] = defaultdict(threading.Lock)
+        self._locks_lock = threading.Lock()
+
+    def _is_fresh(self, catalog: Optional[GalaxyCatalog]) -> bool:
+        return catalog is not None and time.monotonic() - catalog.loaded_at < self.ttl
+
+    def get(
+        self, key: Hashable, load: Callable[[], Iterable[GalaxyData]]
+    ) -> GalaxyCatalog:
+        catalog = self._catalogs.get(key)
+        if self._is_fresh(catalog):
+            return catalog
+
+        with self._locks_lock:
+            lock = self._locks[key]
+
+        with lock:
+            # Another session may have loaded it while we waited
+            catalog = self._catalogs.get(key)
+            if self._is_fresh(catalog):
+                return catalog
+
+            try:
+                catalog = GalaxyCatalog(load())
+            except Exception:
+                if catalog is None:
+                    raise
+                logger.exception(
+                    "Failed to refresh galaxy catalog `%s`, serving the cached copy.",
+                    key,
+                )
+                return catalog
+
+            self._catalogs[key] = catalog
+            logger.info("Loaded %d galaxies into catalog `%s`.", len(catalog), key)
+            return catalog
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        if key is None:
+            self._catalogs.clear()
+        else:
+            self._catalogs.pop(key, None)
+
+
+GALAXY_CATALOGS = GalaxyCatalogCache()
@@ -0,0 +1,111 @@
+import codecs
+import json
+from typing import Any, Iterable, Iterator, Optional, Union
+
+_WHITESPACE = " \t\n\r"
+
+
+class _StreamReader:
+    """
+    Reads JSON values one at a time from a stream of text or byte chunks,
+    keeping only the unread part of the stream in memory.
+    """
+
+    def __init__(self, chunks: Iterable[Union[bytes, str]]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.done = False
+
+    def _fill(self) -> bool:
+        if self.done:
+            return False
+
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            text = self._decoder.decode(b"", final=True)
+            self.done = True
+        elif isinstance(chunk, bytes):
+            text = self._decoder.decode(chunk)
+        else:
+            text = chunk
+
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """The next non-whitespace character, or "" at the end of the stream."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, *chars: str) -> str:
+        char = self.peek()
+        if char not in chars:
+            raise json.JSONDecodeError(
+                f"Expected one of {chars!r}", self.buffer, self.pos
+            )
+        self.pos += 1
+        return char
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+
+            # A number at the end of the buffer may continue in the next chunk
+            if end < len(self.buffer) or self.done:
+                self.pos = end
+                return value
+            self._fill()
+
+
+def iter_json_object(
+    chunks: Iterable[Union[bytes, str]], keys: Optional[set[str]] = None
+) -> Iterator[tuple[str, Any]]:
+    """
+    Parses a JSON object incrementally from `chunks`, e.g. the output of a
+    streamed response's `iter_content`. For each member whose value is an
+    array this yields `(key, element)` once per element, so arrays don't
+    have to be held in memory in full; other members yield `(key, value)`.
+
+    If `keys` is given, the key of every member is added to it as it is
+    read, including those of empty arrays, which yield nothing.
+    """
+    reader = _StreamReader(chunks)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if keys is not None:
+            keys.add(key)
+
+        if reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.expect("]")
+            else:
+                while True:
+                    yield key, reader.value()
+                    if reader.expect(",", "]") == "]":
+                        break
+        else:
+            yield key, reader.value()
+
+        if reader.expect(",", "}") == "}":
+            return
@@ -1,24 +1,26 @@
 import solara
 from cosmicds.layout import BaseLayout, BaseSetup
 from cosmicds.logger import setup_logger
+from hubbleds.change_tracking import StateChangeTracker, measurement_key
 from hubbleds.remote import LOCAL_API
+from hubbleds.render_counts import use_render_count
 from hubbleds.utils import push_to_route
+from hubbleds.write_queue import get_write_queue
 from solara.toestand import Ref
 
-from .state import GLOBAL_STATE, LOCAL_STATE
+from .state import GLOBAL_STATE, LOCAL_STATE, UI_STATE
 
 logger = setup_logger("LAYOUT")
 
 
 @solara.component
 def Layout(children=[]):
-    BaseSetup(
-        story_name=LOCAL_STATE.value.story_id, story_title=LOCAL_STATE.value.title
-    )
+    use_render_count("layout")
+    BaseSetup(story_name=UI_STATE.story_id, story_title=UI_STATE.title)
 
     student_id = Ref(GLOBAL_STATE.fields.student.id)
     loaded_states = solara.use_reactive(False)
-    route_restored = Ref(LOCAL_STATE.fields.route_restored)
+    route_restored = UI_STATE.ref("route_restored")
 
     router = solara.use_router()
     location = solara.use_context(solara.routing._location_context)
@@ -26,16 +28,18 @@ def Layout(children=[]):
     route_current, routes_current_level = solara.use_route(peek=True)
     route_index = routes_current_level.index(route_current)
 
+    tracker = solara.use_memo(StateChangeTracker, dependencies=[])
+
     def _load_global_local_states():
         if student_id.value is None:
             logger.warning(
-                f"Failed to load measurements: ID `{GLOBAL_STATE.value.student.id}` not found."
+                f"Failed to load measurements: ID `{student_id.value}` not found."
             )
             return
 
         logger.info(
             "Loading story stage and measurements for user `%s`.",
-            GLOBAL_STATE.value.student.id,
+            student_id.value,
         )
 
         # Retrieve the student's app and local states
@@ -51,24 +55,64 @@ def Layout(children=[]):
 
         Ref(LOCAL_STATE.fields.measurements_loaded).set(True)
 
+        # What we just loaded is what the database has, so there's no need to
+        #  write it back until something changes. This runs during render, so
+        #  peek rather than subscribe the layout to the whole state.
+        _, story_values = tracker.changed_story_fields(
+            GLOBAL_STATE.peek(), LOCAL_STATE.peek()
+        )
+        tracker.mark_story_written(story_values)
+        tracker.mark_all_measurements_written("measurements", measurements)
+        tracker.mark_all_measurements_written("example_measurements", sample_measurements)
+
         loaded_states.set(True)
 
     solara.use_memo(_load_global_local_states, dependencies=[])
 
-    def _write_local_global_states():
-        if not loaded_states.value:
-            return
-
-        # Listen for changes in the states and write them to the database
-        put_state = LOCAL_API.put_story_state(GLOBAL_STATE, LOCAL_STATE)
+    def _persist_changes():
+        # Write only what changed since the last successful write
+        put_state = True
+        global_state, local_state = GLOBAL_STATE.peek(), LOCAL_STATE.peek()
+        changed_fields, story_values = tracker.changed_story_fields(
+            global_state, local_state
+        )
+        if changed_fields:
+            logger.debug("Story state fields changed: %s", sorted(changed_fields))
+            put_state = LOCAL_API.put_story_state(GLOBAL_STATE, LOCAL_STATE)
+            if put_state:
+                tracker.mark_story_written(story_values)
 
         # Be sure to write the measurement data separately since it's stored
         #  in another location in the database
-        put_meas = LOCAL_API.put_measurements(GLOBAL_STATE, LOCAL_STATE)
-        put_samp = LOCAL_API.put_sample_measurements(GLOBAL_STATE, LOCAL_STATE)
+        written = {}
+        for kind, put in (
+            ("measurements", LOCAL_API.put_measurements),
+            ("example_measurements", LOCAL_API.put_sample_measurements),
+        ):
+            all_measurements = getattr(local_state, kind)
+            changes = tracker.changed_measurements(kind, all_measurements)
+            if not changes:
+                continue
+
+            changed = [m for m in all_measurements if measurement_key(m) in changes]
+            written[kind] = put(GLOBAL_STATE, LOCAL_STATE, measurements=changed)
+            if written[kind]:
+                tracker.mark_measurements_written(kind, changes)
+
+        # There's no endpoint for deleting a single example measurement, so
+        #  only the student's own measurements are deleted
+        deleted = tracker.deleted_measurements("measurements", local_state.measurements)
+        for key in deleted:
+            if LOCAL_API.delete_measurement(GLOBAL_STATE, LOCAL_STATE, key[0]):
+                tracker.mark_measurements_deleted("measurements", [key])
+            else:
+                written["measurements"] = False
+
+        put_meas = written.get("measurements", True)
+        put_samp = written.get("example_measurements", True)
 
         if put_state and put_meas and put_samp:
-            logger.info("Wrote state to database.")
+            logger.info("Wrote changed state to database.")
         else:
             logger.info(
                 f"Did not write {'story state' if not put_state else ''} "
@@ -77,34 +121,54 @@ def Layout(children=[]):
                 f"to database."
             )
 
-    solara.lab.use_task(
-        _write_local_global_states, dependencies=[GLOBAL_STATE.value, LOCAL_STATE.value]
-    )
+    def _write_local_global_states(*args):
+        if not loaded_states.value:
+            return
+
+        # Queue a write to the database. Changes that arrive in quick
+        #  succession are written only once.
+        get_write_queue().schedule(("story-state",), _persist_changes)
+
+    def _watch_states():
+        # Listen for changes in the states instead of reading them during
+        #  render, which would re-render the layout, and every page in it,
+        #  on each change
+        unsubscribes = [
+            GLOBAL_STATE.subscribe(_write_local_global_states),
+            LOCAL_STATE.subscribe(_write_local_global_states),
+        ]
+
+        def _cleanup():
+            for unsubscribe in unsubscribes:
+                unsubscribe()
+
+        return _cleanup
+
+    solara.use_effect(_watch_states, dependencies=[])
 
     def _store_user_location():
         if not route_restored.value:
             return
 
+        # Don't hold on to writes from the stage we're leaving, but don't
+        #  wait for them on the render thread either
+        get_write_queue().flush_in_background()
+
         logger.info(f"Storing path location as `{route_current.path}`")
         # Store the current route index so that users will be returned to their
         #  previous location when they return to the app
-        Ref(LOCAL_STATE.fields.last_route).set(f"{route_current.path}")
-        Ref(LOCAL_STATE.fields.max_route_index).set(
-            max(route_index or 0, LOCAL_STATE.value.max_route_index or 0)
-        )
+        UI_STATE.ref("last_route").set(f"{route_current.path}")
+        max_route_index = UI_STATE.ref("max_route_index")
+        max_route_index.set(max(route_index or 0, max_route_index.value or 0))
 
     solara.use_effect(_store_user_location, dependencies=[route_current])
 
     def _restore_user_location():
         if not route_restored.value:
-            if (
-                LOCAL_STATE.value.last_route is not None
-                and route_current.path != LOCAL_STATE.value.last_route
-            ):
-                logger.info(
-                    f"Restoring path location to `{LOCAL_STATE.value.last_route}`"
-                )
-                push_to_route(router, location, LOCAL_STATE.value.last_route)
+            last_route = UI_STATE.last_route
+            if last_route is not None and route_current.path != last_route:
+                logger.info(f"Restoring path location to `{last_route}`")
+                push_to_route(router, location, last_route)
             else:
                 route_restored.set(True)
 
@@ -117,6 +181,6 @@ def Layout(children=[]):
         BaseLayout(
             local_state=LOCAL_STATE,
             children=children,
-            story_name=LOCAL_STATE.value.story_id,
-            story_title=LOCAL_STATE.value.title,
+            story_name=UI_STATE.story_id,
+            story_title=UI_STATE.title,
         )
@@ -1,8 +1,11 @@
 import solara
 from solara.lab import computed
-from hubbleds.state import LOCAL_STATE, GLOBAL_STATE, get_multiple_choice, mc_callback
+from hubbleds.state import LOCAL_STATE, GLOBAL_STATE, MEASUREMENT_STATE, UI_STATE, get_multiple_choice, mc_callback
+from hubbleds.render_counts import use_render_count
 from .component_state import COMPONENT_STATE, Marker
 from hubbleds.remote import LOCAL_API
+from hubbleds.profiling import profiled, profiled_callback, profiled_page
+from hubbleds.write_queue import queue_stage_state_write
 from glue_jupyter import JupyterApplication
 import asyncio
 from pathlib import Path
@@ -85,7 +88,9 @@ def nbin_func(xmin, xmax):
     return 30 + int((frac_range ** power) * (max_bins - min_bins))
 
 @solara.component
+@profiled_page
 def Page():
+    use_render_count("01-spectra-&-velocity")
     solara.Title("HubbleDS")
 
     loaded_component_state = solara.use_reactive(False)
@@ -101,13 +106,16 @@ def Page():
 
         total_galaxies = Ref(COMPONENT_STATE.fields.total_galaxies)
 
-        if len(LOCAL_STATE.value.measurements) != total_galaxies.value:
+        # Peek, since this only runs once and shouldn't subscribe the page
+        #  to the measurements
+        measurements = LOCAL_STATE.peek().measurements
+        if len(measurements) != total_galaxies.value:
             logger.error(
                 "Detected mismatch between stored measurements and current "
-                f"recorded number of galaxies. Stored: {len(LOCAL_STATE.value.measurements)}, "
+                f"recorded number of galaxies. Stored: {len(measurements)}, "
                 f"Current: {total_galaxies.value}."
             )
-            total_galaxies.set(len(LOCAL_STATE.value.measurements))
+            total_galaxies.set(len(measurements))
 
         logger.info("Finished loading component state.")
         loaded_component_state.set(True)
@@ -118,16 +126,14 @@ def Page():
         if not loaded_component_state.value:
             return
 
-        # Listen for changes in the states and write them to the database
-        res = LOCAL_API.put_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
-        if res:
-            logger.info("Wrote component state to database.")
-        else:
-            logger.info("Did not write component state to database.")
+        # Listen for changes in the states and queue a write to the database.
+        #  Changes that arrive in quick succession are written only once.
+        queue_stage_state_write(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
 
     solara.lab.use_task(_write_component_state, dependencies=[COMPONENT_STATE.value])
     
     seed_data_setup = solara.use_reactive(False)
+    @profiled("glue_setup")
     def glue_setup() -> JupyterApplication:
         gjapp = _glue_setup()
         if EXAMPLE_GALAXY_SEED_DATA not in gjapp.data_collection:
@@ -157,7 +163,7 @@ def Page():
         measurements = Ref(LOCAL_STATE.fields.measurements)
         total_galaxies = Ref(COMPONENT_STATE.fields.total_galaxies)
         measurements.subscribe_change(
-            lambda *args: total_galaxies.set(len(measurements.value))
+            profiled_callback(lambda *args: total_galaxies.set(len(measurements.value)))
         )
         
         example_measurements = Ref(LOCAL_STATE.fields.example_measurements)
@@ -172,7 +178,7 @@ def Page():
             _update_seed_data_with_examples(gjapp, meas)
             
         example_measurements.subscribe(
-            _on_example_measurement_change
+            profiled_callback(_on_example_measurement_change)
         )
         
         def _on_marker_updated(marker):
@@ -181,7 +187,7 @@ def Page():
             if COMPONENT_STATE.value.current_step_between(Marker.mee_gui1, Marker.sel_gal4):
                 selection_tool_bg_count.set(selection_tool_bg_count.value + 1)
 
-        Ref(COMPONENT_STATE.fields.current_step).subscribe(_on_marker_updated)
+        Ref(COMPONENT_STATE.fields.current_step).subscribe(profiled_callback(_on_marker_updated))
 
 
     solara.use_memo(_state_callback_setup, dependencies=[])
@@ -192,13 +198,13 @@ def Page():
 
     @computed
     def selected_example_measurement():
-        return Ref(LOCAL_STATE.fields.get_example_measurement).value(
+        return MEASUREMENT_STATE.local_state.get_example_measurement(
             Ref(COMPONENT_STATE.fields.selected_example_galaxy).value,
             measurement_number='second' if use_second_measurement.value else 'first')
 
     @computed
     def selected_measurement():
-        return Ref(LOCAL_STATE.fields.get_measurement).value(Ref(COMPONENT_STATE.fields.selected_galaxy).value)
+        return MEASUREMENT_STATE.local_state.get_measurement(Ref(COMPONENT_STATE.fields.selected_galaxy).value)
     
 
     def _init_glue_data_setup():
@@ -224,11 +230,12 @@ def Page():
         need = 5 - len(LOCAL_STATE.value.measurements)
         if need <= 0:
             return
-        galaxies: list = LOCAL_API.get_galaxies(LOCAL_STATE)
-        sample = np.random.choice(galaxies, size=need, replace=False)
+        # The shared catalog is read in place rather than copied
+        galaxies = LOCAL_API.get_galaxy_catalog(LOCAL_STATE).galaxies
+        sample = np.random.choice(len(galaxies), size=need, replace=False)
         new_measurements = [StudentMeasurement(student_id=GLOBAL_STATE.value.student.id,
-                                               galaxy=galaxy)
-                             for galaxy in sample]
+                                               galaxy=galaxies[index])
+                             for index in sample]
         measurements = LOCAL_STATE.value.measurements + new_measurements
         Ref(LOCAL_STATE.fields.measurements).set(measurements)
     
@@ -236,7 +243,7 @@ def Page():
         if len(LOCAL_STATE.value.measurements) >= 5:
             return
         need = 1
-        galaxies = LOCAL_API.get_galaxies(LOCAL_STATE)
+        galaxies = LOCAL_API.get_galaxy_catalog(LOCAL_STATE).galaxies
         rng = np.random.default_rng()
         index = rng.integers(low=0, high=len(galaxies)-1, size=need)[0]
         galaxy = galaxies[index]
@@ -277,7 +284,7 @@ def Page():
         if COMPONENT_STATE.value.current_step.value > Marker.cho_row1.value:
             COMPONENT_STATE.value.selected_example_galaxy = 1576  # id of the first example galaxy
 
-    loaded_component_state.subscribe(_initialize_state)
+    loaded_component_state.subscribe(profiled_callback(_initialize_state))
     
     def print_selected_galaxy(galaxy):
         print('selected galaxy is now:', galaxy)
@@ -327,8 +334,8 @@ def Page():
             return [v2w(v, lambda_rest) for v in value]
 
     def _reactive_subscription_setup():
-        Ref(COMPONENT_STATE.fields.selected_galaxy).subscribe(print_selected_galaxy)
-        Ref(COMPONENT_STATE.fields.selected_example_galaxy).subscribe(print_selected_example_galaxy)
+        Ref(COMPONENT_STATE.fields.selected_galaxy).subscribe(profiled_callback(print_selected_galaxy))
+        Ref(COMPONENT_STATE.fields.selected_example_galaxy).subscribe(profiled_callback(print_selected_example_galaxy))
 
         
         sync_reactives(spectrum_bounds, 
@@ -467,7 +474,7 @@ def Page():
                 if COMPONENT_STATE.value.current_step == Marker.sel_gal2:
                     if value == 1:
                         transition_to(COMPONENT_STATE, Marker.not_gal1)
-            total_galaxies.subscribe(advance_on_total_galaxies)
+            total_galaxies.subscribe(profiled_callback(advance_on_total_galaxies))
 
             def _galaxy_selected_callback(galaxy_data: dict):
                 galaxy = LOCAL_STATE.value.galaxies[int(galaxy_data['id'])]
@@ -507,7 +514,7 @@ def Page():
             ) 
             
             if show_snackbar.value:
-                solara.Info(label=LOCAL_STATE.value.snackbar_message)        
+                solara.Info(label=UI_STATE.snackbar_message)        
 
     # Measurement Table Row
 
@@ -725,16 +732,16 @@ def Page():
                 def example_galaxy_data():
                     if use_second_measurement.value:
                         return [
-                            x.dict() for x in LOCAL_STATE.value.example_measurements if x.measurement_number == 'second'
+                            x.dict() for x in MEASUREMENT_STATE.example_measurements if x.measurement_number == 'second'
                         ]
                     else:
                         return [
-                            x.dict() for x in LOCAL_STATE.value.example_measurements if x.measurement_number == 'first'
+                            x.dict() for x in MEASUREMENT_STATE.example_measurements if x.measurement_number == 'first'
                         ]
 
                 @computed
                 def selected_example_galaxy_index():
-                    index = LOCAL_STATE.value.get_example_measurement_index(
+                    index = MEASUREMENT_STATE.local_state.get_example_measurement_index(
                         selected_example_galaxy.value,
                         measurement_number='second' if use_second_measurement.value else 'first')
                     if index is None:
@@ -819,7 +826,7 @@ def Page():
 
                 @computed
                 def selected_galaxy_index():
-                    index = LOCAL_STATE.value.get_measurement_index(selected_galaxy.value)
+                    index = MEASUREMENT_STATE.local_state.get_measurement_index(selected_galaxy.value)
                     if index is None:
                         return []
                     else:
@@ -827,7 +834,7 @@ def Page():
 
                 DataTable(
                     title="My Galaxies",
-                    items=[x.dict() for x in LOCAL_STATE.value.measurements],
+                    items=[x.dict() for x in MEASUREMENT_STATE.measurements],
                     selected_indices=selected_galaxy_index.value,
                     show_select=COMPONENT_STATE.value.current_step_at_or_after(
                         Marker.cho_row1
@@ -975,7 +982,7 @@ def Page():
                 with rv.Col(cols=12, lg=8, class_="no-y-padding"):
                                             
                     if (EXAMPLE_GALAXY_MEASUREMENTS in gjapp.data_collection 
-                        and len(LOCAL_STATE.value.example_measurements) > 0
+                        and len(MEASUREMENT_STATE.example_measurements) > 0
                         and example_data_setup.value
                         ):
                         viewer_data = [
@@ -1208,8 +1215,8 @@ def Page():
                     
                     @computed
                     def obs_wav_marker_value():
-                        meas = LOCAL_STATE.value.example_measurements
-                        if LOCAL_STATE.value.measurements_loaded and len(meas) > 0:
+                        meas = MEASUREMENT_STATE.example_measurements
+                        if MEASUREMENT_STATE.measurements_loaded and len(meas) > 0:
                             step = COMPONENT_STATE.value.current_step.value
                             if step >= Marker.rem_vel1.value and meas[1].obs_wave_value is not None:
                                 return meas[1].obs_wave_value
@@ -6,6 +6,9 @@ from hubbleds.components import Stage2Slideshow, STAGE_2_SLIDESHOW_LENGTH
 from hubbleds.state import LOCAL_STATE, GLOBAL_STATE, get_multiple_choice, mc_callback 
 from .component_state import COMPONENT_STATE
 from hubbleds.remote import LOCAL_API
+from hubbleds.profiling import profiled_page
+from hubbleds.render_counts import use_render_count
+from hubbleds.write_queue import queue_stage_state_write
 from ...utils import get_image_path, DISTANCE_CONSTANT, push_to_route
 
 from cosmicds.logger import setup_logger
@@ -13,7 +16,9 @@ from cosmicds.logger import setup_logger
 logger = setup_logger("STAGE 2")
 
 @solara.component
+@profiled_page
 def Page():
+    use_render_count("02-distance-introduction")
     solara.Title("HubbleDS")
     loaded_component_state = solara.use_reactive(False)
     router = solara.use_router()
@@ -34,13 +39,9 @@ def Page():
         if not loaded_component_state.value:
             return
 
-        # Listen for changes in the states and write them to the database
-        res = LOCAL_API.put_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
-        
-        if res:
-            logger.info("Wrote component state for stage 2 to database.")
-        else:
-            logger.info("Did not write component state for stage 2 to database.")
+        # Listen for changes in the states and queue a write to the database.
+        #  Changes that arrive in quick succession are written only once.
+        queue_stage_state_write(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
 
     logger.info("Trying to write component state for stage 2.")
     solara.lab.use_task(_write_component_state, dependencies=[COMPONENT_STATE.value])
@@ -38,9 +38,13 @@ from hubbleds.components import (
 
 from hubbleds.data_management import *
 from hubbleds.remote import LOCAL_API
+from hubbleds.profiling import profiled, profiled_callback, profiled_page
+from hubbleds.render_counts import use_render_count
+from hubbleds.write_queue import queue_stage_state_write
 from hubbleds.state import (
     GLOBAL_STATE, 
     LOCAL_STATE,
+    MEASUREMENT_STATE,
     StudentMeasurement, 
     get_multiple_choice,
     mc_callback
@@ -106,7 +110,7 @@ def DistanceToolComponent(galaxy,
         if ready and (on_wwt_ready is not None):
             on_wwt_ready()
 
-    wwt_ready.subscribe(_on_wwt_ready)
+    wwt_ready.subscribe(profiled_callback(_on_wwt_ready))
 
     def set_selected_galaxy():
         widget = solara.get_widget(tool)
@@ -181,14 +185,16 @@ def DistanceToolComponent(galaxy,
             
         widget.observe(update_brightness, ["brightness"])
 
-        background_counter.subscribe(lambda _count: widget.set_background())
+        background_counter.subscribe(profiled_callback(lambda _count: widget.set_background()))
 
     solara.use_effect(_define_callbacks, [wwt_ready.value])
     
     
 
 @solara.component
+@profiled_page
 def Page():
+    use_render_count("03-distance-measurements")
     solara.Title("HubbleDS")
     
     # === Setup State Loading and Writing ===
@@ -209,16 +215,14 @@ def Page():
         if not loaded_component_state.value:
             return
 
-        # Listen for changes in the states and write them to the database
-        res = LOCAL_API.put_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
-        if res:
-            logger.info("Wrote component state for stage 3 to database.")
-        else:
-            logger.info("Did not write component state for stage 3 to database.")
+        # Listen for changes in the states and queue a write to the database.
+        #  Changes that arrive in quick succession are written only once.
+        queue_stage_state_write(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
 
     solara.lab.use_task(_write_component_state, dependencies=[COMPONENT_STATE.value])
     
     seed_data_setup = solara.use_reactive(False)
+    @profiled("glue_setup")
     def glue_setup() -> JupyterApplication:
         gjapp = _glue_setup()
         if EXAMPLE_GALAXY_SEED_DATA not in gjapp.data_collection:
@@ -271,21 +275,21 @@ def Page():
             if COMPONENT_STATE.value.is_current_step(Marker.cho_row1):
                 transition_to(COMPONENT_STATE, Marker.ang_siz2)
         selected_example_galaxy = Ref(COMPONENT_STATE.fields.selected_example_galaxy)
-        selected_example_galaxy.subscribe(_on_example_galaxy_selected)
+        selected_example_galaxy.subscribe(profiled_callback(_on_example_galaxy_selected))
 
         def _on_ruler_clicked_first_time(*args):
             if COMPONENT_STATE.value.is_current_step(Marker.ang_siz3) and COMPONENT_STATE.value.ruler_click_count == 1:
                 transition_to(COMPONENT_STATE, Marker.ang_siz4)
         
         ruler_click_count = Ref(COMPONENT_STATE.fields.ruler_click_count)
-        ruler_click_count.subscribe(_on_ruler_clicked_first_time)
+        ruler_click_count.subscribe(profiled_callback(_on_ruler_clicked_first_time))
 
         def _on_measurement_added(*args):
             if COMPONENT_STATE.value.is_current_step(Marker.ang_siz4) and COMPONENT_STATE.value.n_meas == 1:
                 transition_to(COMPONENT_STATE, Marker.ang_siz5)
         
         n_meas = Ref(COMPONENT_STATE.fields.n_meas)
-        n_meas.subscribe(_on_measurement_added)
+        n_meas.subscribe(profiled_callback(_on_measurement_added))
         
         example_measurements = Ref(LOCAL_STATE.fields.example_measurements)
         def _on_example_measurement_change(meas):
@@ -299,22 +303,23 @@ def Page():
             _update_seed_data_with_examples(gjapp, meas)
             
         example_measurements.subscribe(
-            _on_example_measurement_change
+            profiled_callback(_on_example_measurement_change)
         )
         
-        Ref(COMPONENT_STATE.fields.current_step).subscribe_change(_on_marker_updated)
+        Ref(COMPONENT_STATE.fields.current_step).subscribe_change(profiled_callback(_on_marker_updated))
         
         def show_ruler_range(marker):
             print(f"show_ruler_range: {marker}")
             COMPONENT_STATE.value.show_ruler = marker.is_between(Marker.ang_siz3, Marker.est_dis4) or \
             marker.is_between(Marker.dot_seq5, Marker.last())
         
-        Ref(COMPONENT_STATE.fields.current_step).subscribe(show_ruler_range)
+        Ref(COMPONENT_STATE.fields.current_step).subscribe(profiled_callback(show_ruler_range))
         
     solara.use_effect(_state_callback_setup, dependencies=[])
     
     def _initialize_state():
-        if (not loaded_component_state.value) or (not LOCAL_STATE.value.measurements_loaded):
+        local_state = LOCAL_STATE.peek()
+        if (not loaded_component_state.value) or (not local_state.measurements_loaded):
             return
 
         logger.info('Initializing state')
@@ -323,20 +328,20 @@ def Page():
             selected_example_galaxy = Ref(COMPONENT_STATE.fields.selected_example_galaxy)
         
         angular_sizes_total = 0
-        for measurement in LOCAL_STATE.value.measurements:
+        for measurement in local_state.measurements:
             if measurement.ang_size_value is not None:
                 angular_sizes_total += 1
         if COMPONENT_STATE.value.angular_sizes_total != angular_sizes_total:
             Ref(COMPONENT_STATE.fields.angular_sizes_total).set(angular_sizes_total)
         
         example_angular_sizes_total = 0
-        for measurement in LOCAL_STATE.value.example_measurements:
+        for measurement in local_state.example_measurements:
             if measurement.ang_size_value is not None:
                 example_angular_sizes_total += 1
         if COMPONENT_STATE.value.example_angular_sizes_total != example_angular_sizes_total:
             Ref(COMPONENT_STATE.fields.example_angular_sizes_total).set(example_angular_sizes_total)
     
-    solara.use_memo(_initialize_state, dependencies=[loaded_component_state, Ref(LOCAL_STATE.fields.measurements_loaded)])
+    solara.use_memo(_initialize_state, dependencies=[loaded_component_state.value, MEASUREMENT_STATE.measurements_loaded])
     # loaded_component_state.subscribe(_initialize_state)
     
     def _fill_data_points():
@@ -574,7 +579,7 @@ def Page():
 
             @computed
             def current_data():
-                return LOCAL_STATE.value.example_measurements if on_example_galaxy_marker.value else LOCAL_STATE.value.measurements
+                return MEASUREMENT_STATE.example_measurements if on_example_galaxy_marker.value else MEASUREMENT_STATE.measurements
 
             def _ang_size_cb(angle):
                 """
@@ -813,11 +818,11 @@ def Page():
                 def example_galaxy_data():
                     if use_second_measurement.value:
                         return [
-                            x.dict() for x in LOCAL_STATE.value.example_measurements if x.measurement_number == 'second'
+                            x.dict() for x in MEASUREMENT_STATE.example_measurements if x.measurement_number == 'second'
                         ]
                     else:
                         return [
-                            x.dict() for x in LOCAL_STATE.value.example_measurements if x.measurement_number == 'first'
+                            x.dict() for x in MEASUREMENT_STATE.example_measurements if x.measurement_number == 'first'
                         ]
                     
                 # DataTable(
@@ -849,14 +854,14 @@ def Page():
                 @computed
                 def selected_galaxy_index():
                     try:
-                        return [LOCAL_STATE.value.get_measurement_index(Ref(COMPONENT_STATE.fields.selected_galaxy).value["id"])]
+                        return [MEASUREMENT_STATE.local_state.get_measurement_index(Ref(COMPONENT_STATE.fields.selected_galaxy).value["id"])]
                     except:
                         return []
 
                 @computed
                 def table_kwargs():
                     ang_size_tot = Ref(COMPONENT_STATE.fields.angular_sizes_total).value
-                    table_data = [s.model_dump(exclude={'galaxy': {'spectrum'}, 'measurement_number':True}) for s in Ref(LOCAL_STATE.fields.measurements).value]
+                    table_data = [s.model_dump(exclude={'galaxy': {'spectrum'}, 'measurement_number':True}) for s in MEASUREMENT_STATE.measurements]
                     return {
                         "title": "My Galaxies",
                         "headers": common_headers, # + [{ "text": "Measurement Number", "value": "measurement_number" }],
@@ -11,7 +11,7 @@ from hubbleds.base_component_state import (
     transition_previous,
     transition_next
 )
-from hubbleds.state import LOCAL_STATE
+from hubbleds.state import question_completed
 
 from typing import Any, Optional
 
@@ -99,15 +99,15 @@ class ComponentState(BaseComponentState, BaseState):
 
     @property
     def dot_seq3_gate(self):
-        return LOCAL_STATE.value.question_completed("ang_meas_consensus")
+        return question_completed("ang_meas_consensus")
 
     @property
     def ang_siz5a_gate(self):
-        return LOCAL_STATE.value.question_completed("ang_meas_dist_relation")
+        return question_completed("ang_meas_dist_relation")
 
     @property
     def dot_seq7_gate(self):
-        return LOCAL_STATE.value.question_completed("ang_meas_consensus_2")
+        return question_completed("ang_meas_consensus_2")
 
     @property
     def dot_seq5_gate(self):
@@ -1,4 +1,3 @@
-import asyncio
 from cosmicds.utils import empty_data_from_model_class, DEFAULT_VIEWER_HEIGHT
 from cosmicds.viewers import CDSScatterView
 from echo import delay_callback
@@ -15,10 +14,15 @@ from typing import Dict, List, Tuple
 from cosmicds.components import ScaffoldAlert, StateEditor, ViewerLayout
 from hubbleds.viewer_marker_colors import MY_DATA_COLOR, MY_CLASS_COLOR, GENERIC_COLOR
 from hubbleds.components import DataTable, HubbleExpUniverseSlideshow, LineDrawViewer, PlotlyLayerToggle, Stage4WaitingScreen
-from hubbleds.state import LOCAL_STATE, GLOBAL_STATE, StudentMeasurement, get_multiple_choice, get_free_response, mc_callback, fr_callback
+from hubbleds.state import LOCAL_STATE, GLOBAL_STATE, CLASS_DATA_STATE, MEASUREMENT_STATE, StudentMeasurement, get_multiple_choice, get_free_response, mc_callback, fr_callback
 from hubbleds.viewers.hubble_scatter_viewer import HubbleScatterView
 from .component_state import COMPONENT_STATE, Marker
 from hubbleds.remote import LOCAL_API
+from hubbleds.async_remote import ASYNC_API
+from hubbleds.profiling import profiled, profiled_callback, profiled_page
+from hubbleds.render_counts import use_render_count
+from hubbleds.class_progress import CLASS_PROGRESS
+from hubbleds.write_queue import queue_stage_state_write
 from hubbleds.utils import AGE_CONSTANT, models_to_glue_data, PLOTLY_MARGINS, get_image_path, push_to_route
 from hubbleds.demo_helpers import set_dummy_all_measurements
 from cosmicds.logger import setup_logger
@@ -28,7 +32,9 @@ logger = setup_logger("STAGE 4")
 GUIDELINE_ROOT = Path(__file__).parent / "guidelines"
 
 @solara.component
+@profiled_page
 def Page():
+    use_render_count("04-explore-data")
     solara.Title("HubbleDS")
     loaded_component_state = solara.use_reactive(False)
     router = solara.use_router()
@@ -48,6 +54,7 @@ def Page():
 
     skip_waiting_room, set_skip_waiting_room = solara.use_state(False)
 
+    @profiled("glue_setup")
     def glue_setup() -> Tuple[JupyterApplication, Dict[str, CDSScatterView]]:
         gjapp = JupyterApplication(
             GLOBAL_STATE.value.glue_data_collection, GLOBAL_STATE.value.glue_session
@@ -93,6 +100,9 @@ def Page():
     def load_class_data():
         logger.info("Loading class data")
         class_measurements = LOCAL_API.get_class_measurements(GLOBAL_STATE, LOCAL_STATE)
+        return _on_class_measurements_loaded(class_measurements)
+
+    def _on_class_measurements_loaded(class_measurements: List[StudentMeasurement]):
         measurements = Ref(LOCAL_STATE.fields.class_measurements)
         student_ids = Ref(LOCAL_STATE.fields.stage_4_class_data_students)
         if not class_measurements:
@@ -136,24 +146,37 @@ def Page():
 
         class_plot_data.set(class_data_points)
 
-    async def keep_checking_class_data():
+    waiting_for_class = COMPONENT_STATE.value.current_step == Marker.wwt_wait
+
+    # All students waiting on the same class share a single poller, which
+    #  pushes the completed count to each of them.
+    def _subscribe_to_class_progress():
+        if not waiting_for_class:
+            return
+
+        class_info = GLOBAL_STATE.value.classroom.class_info
+        if class_info is None or "id" not in class_info:
+            logger.warning("No class id found in classroom info.")
+            return
+
         enough_students_ready = Ref(LOCAL_STATE.fields.enough_students_ready)
-        # Add a state guard in case task cancellation fails
-        while COMPONENT_STATE.value.current_step == Marker.wwt_wait:
-            count = check_completed_students_count()
+
+        def _on_completed_count(count: int):
+            logger.info(f"Count: {count}")
             if (not enough_students_ready.value) and count >= 12:
                 enough_students_ready.set(True)
             completed_count.set(count)
-            await asyncio.sleep(10)
 
-    class_ready_task = solara.lab.use_task(keep_checking_class_data, dependencies=[])
+        return CLASS_PROGRESS.subscribe(
+            LOCAL_STATE.value.story_id,
+            class_info["id"],
+            GLOBAL_STATE.value.student.id,
+            profiled_callback(_on_completed_count),
+        )
+
+    solara.use_effect(_subscribe_to_class_progress, dependencies=[waiting_for_class])
 
     def _on_waiting_room_advance():
-        if class_ready_task.pending:
-            try:
-                class_ready_task.cancel()
-            except RuntimeError:
-                pass
         load_class_data()
         transition_next(COMPONENT_STATE)
 
@@ -165,7 +188,7 @@ def Page():
         # TODO: What else to we need to do here?
         logger.info("Finished loading component state for stage 4.")
 
-        value = LOCAL_STATE.value.enough_students_ready \
+        value = LOCAL_STATE.peek().enough_students_ready \
                 or \
                 (check_completed_students_count() >= 12)
 
@@ -187,27 +210,27 @@ def Page():
         if not loaded_component_state.value:
             return
 
-        # Listen for changes in the states and write them to the database
-        res = LOCAL_API.put_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
-        if res:
-            logger.info("Wrote component state for stage 4 to database.")
-        else:
-            logger.info("Did not write component state for stage 4 to database.")
+        # Listen for changes in the states and queue a write to the database.
+        #  Changes that arrive in quick succession are written only once.
+        queue_stage_state_write(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
 
 
     solara.lab.use_task(_write_component_state, dependencies=[COMPONENT_STATE.value])
 
-    student_plot_data = solara.use_reactive(LOCAL_STATE.value.measurements)
+    student_plot_data = solara.use_reactive(MEASUREMENT_STATE.measurements)
     async def _load_student_data():
         if not LOCAL_STATE.value.measurements_loaded:
             logger.info("Loading measurements")
-            measurements = LOCAL_API.get_measurements(GLOBAL_STATE, LOCAL_STATE)
+            measurements = await ASYNC_API.get_measurements(GLOBAL_STATE, LOCAL_STATE)
             student_plot_data.set(measurements)
     solara.lab.use_task(_load_student_data)
 
     # TODO: not sure what this is supposed to do
-    if not (class_ready_task.finished or class_ready_task.pending):
-        load_class_data()
+    async def _load_class_data():
+        logger.info("Loading class data")
+        class_measurements = await ASYNC_API.get_class_measurements(GLOBAL_STATE, LOCAL_STATE)
+        _on_class_measurements_loaded(class_measurements)
+    solara.lab.use_task(_load_class_data, dependencies=[])
 
     def _jump_stage_5():
         push_to_route(router, location, "05-class-results-uncertainty")
@@ -249,16 +272,10 @@ def Page():
         if not skip_waiting_room:
             Stage4WaitingScreen(
                 completed_count=completed_count.value,
-                can_advance=LOCAL_STATE.value.enough_students_ready,
+                can_advance=CLASS_DATA_STATE.enough_students_ready,
                 on_advance_click=_on_waiting_room_advance,
             )
             return
-    else:
-        try:
-            if class_ready_task.pending:
-                class_ready_task.cancel()
-        except RuntimeError:
-            pass
     
     def _state_callback_setup():
         def _on_marker_update(marker):
@@ -271,12 +288,12 @@ def Page():
                 clear_drawn_line.set(clear_drawn_line.value + 1)
                 draw_active.set(False)
             
-        current_step.subscribe(_on_marker_update)
+        current_step.subscribe(profiled_callback(_on_marker_update))
     
     solara.use_memo(_state_callback_setup, dependencies=[])
     
-    if (len(LOCAL_STATE.value.measurements) == 0 
-        or not all(m.completed for m in LOCAL_STATE.value.measurements) # all([]) = True :/
+    if (len(MEASUREMENT_STATE.measurements) == 0 
+        or not all(m.completed for m in MEASUREMENT_STATE.measurements) # all([]) = True :/
         ):
         solara.Error(
             "You have not added any or have incomplete measurements. Please add/finish some before continuing.",
@@ -327,7 +344,7 @@ def Page():
         with rv.Col():
             DataTable(
                 title="My Galaxies",
-                items=[x.model_dump() for x in LOCAL_STATE.value.measurements],
+                items=[x.model_dump() for x in MEASUREMENT_STATE.measurements],
                 headers=[
                     {
                         "text": "Galaxy ID",
@@ -5,7 +5,7 @@ from pydantic import BaseModel, field_validator, computed_field
 from cosmicds.state import BaseState
 from hubbleds.base_marker import BaseMarker
 from hubbleds.base_component_state import BaseComponentState
-from hubbleds.state import LOCAL_STATE
+from hubbleds.state import question_completed
 
 import enum
 
@@ -70,7 +70,7 @@ class ComponentState(BaseComponentState, BaseState):
     
     @property
     def tre_dat2_gate(self) -> bool:
-        return LOCAL_STATE.value.question_completed("tre-dat-mc1")
+        return question_completed("tre-dat-mc1")
 
     @property
     def tre_dat3_gate(self) -> bool:
@@ -78,11 +78,11 @@ class ComponentState(BaseComponentState, BaseState):
     
     @property
     def rel_vel1_gate(self) -> bool:
-        return LOCAL_STATE.value.question_completed("tre-dat-mc3")
+        return question_completed("tre-dat-mc3")
     
     @property
     def hub_exp1_gate(self) -> bool:
-        return LOCAL_STATE.value.question_completed("galaxy-trend")
+        return question_completed("galaxy-trend")
 
     @property
     def tre_lin1_gate(self) -> bool:
@@ -27,6 +27,9 @@ from hubbleds.viewers.hubble_histogram_viewer import HubbleHistogramView
 from hubbleds.viewers.hubble_scatter_viewer import HubbleScatterView
 from .component_state import COMPONENT_STATE, Marker
 from hubbleds.remote import LOCAL_API
+from hubbleds.profiling import profiled, profiled_callback, profiled_page
+from hubbleds.render_counts import use_render_count
+from hubbleds.write_queue import queue_stage_state_write
 from hubbleds.viewer_marker_colors import (
     MY_DATA_COLOR,
     MY_DATA_COLOR_NAME,
@@ -47,7 +50,9 @@ logger = setup_logger("STAGE 5")
 GUIDELINE_ROOT = Path(__file__).parent / "guidelines"
 
 @solara.component
+@profiled_page
 def Page():
+    use_render_count("05-class-results-uncertainty")
     solara.Title("HubbleDS")
     loaded_component_state = solara.use_reactive(False)
     student_slider_setup, set_student_slider_setup = solara.use_state(False)
@@ -71,12 +76,9 @@ def Page():
         if not loaded_component_state.value:
             return
 
-        # Listen for changes in the states and write them to the database
-        res = LOCAL_API.put_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
-        if res:
-            logger.info("Wrote stage 5 component state to database.")
-        else:
-            logger.info("Did not write stage 5 component state to database.")
+        # Listen for changes in the states and queue a write to the database.
+        #  Changes that arrive in quick succession are written only once.
+        queue_stage_state_write(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
 
     solara.lab.use_task(_write_component_state, dependencies=[COMPONENT_STATE.value])
     
@@ -112,14 +114,18 @@ def Page():
                 viewer.state.hist_x_max = xmax
     force_memo_update = solara.use_reactive(False)
     data_ready = solara.use_reactive(False)
+    @profiled("glue_setup")
     def glue_setup() -> Tuple[JupyterApplication, Dict[str, PlotlyBaseView]]:
         # NOTE: use_memo has to be part of the main page render. Including it
         #  in a conditional will result in an error.
         gjapp = JupyterApplication(
             GLOBAL_STATE.value.glue_data_collection, GLOBAL_STATE.value.glue_session
         )
-        
-        if len(LOCAL_STATE.value.measurements) == 0:
+
+        # The local state is peeked at rather than read, since this only
+        #  reruns when `force_memo_update` changes and shouldn't subscribe
+        #  the page to the whole state
+        if len(LOCAL_STATE.peek().measurements) == 0:
             data_ready.set(False)
             return gjapp, {}
 
@@ -147,14 +153,14 @@ def Page():
 
         LOCAL_API.update_class_size(GLOBAL_STATE)
 
-        if not LOCAL_STATE.value.measurements_loaded:
+        if not LOCAL_STATE.peek().measurements_loaded:
             LOCAL_API.get_measurements(GLOBAL_STATE, LOCAL_STATE)
 
         class_measurements = LOCAL_API.get_class_measurements(GLOBAL_STATE, LOCAL_STATE)
         # if we are a teacher then our measurements were not loaded with class_measurements and only exist on the front end in LOCAL_STATE.value.measuements
         #  make sure we add these to the class_measurements
-        if (not GLOBAL_STATE.value.update_db) and len(LOCAL_STATE.value.measurements)>0:
-            class_measurements.extend(m for m in LOCAL_STATE.value.measurements)
+        if (not GLOBAL_STATE.value.update_db) and len(LOCAL_STATE.peek().measurements)>0:
+            class_measurements.extend(m for m in LOCAL_STATE.peek().measurements)
 
         measurements = Ref(LOCAL_STATE.fields.class_measurements)
         student_ids = Ref(LOCAL_STATE.fields.stage_5_class_data_students)
@@ -163,33 +169,34 @@ def Page():
             student_ids.set(ids)
         measurements.set(class_measurements)
 
-        all_measurements, student_summaries, class_summaries = LOCAL_API.get_all_data(GLOBAL_STATE, LOCAL_STATE)
+        my_class_summary = None
         if GLOBAL_STATE.value.classroom.class_info is not None:
             class_id = GLOBAL_STATE.value.classroom.class_info["id"]
             class_distances = [distance for m in class_measurements if ((distance := m.est_dist_value) is not None and m.velocity_value is not None)]
             class_velocities = [velocity for m in class_measurements if (m.est_dist_value is not None and (velocity := m.velocity_value) is not None)]
             my_class_h0, my_class_age = create_single_summary(distances=class_distances, velocities=class_velocities)
-            class_summaries.append(ClassSummary(class_id=class_id, hubble_fit_value=my_class_h0, age_value=my_class_age))
+            my_class_summary = ClassSummary(class_id=class_id, hubble_fit_value=my_class_h0, age_value=my_class_age)
             for measurement in class_measurements:
                 measurement.class_id = class_id
-            all_measurements.extend(class_measurements)
 
-        all_meas = Ref(LOCAL_STATE.fields.all_measurements)
+        # The other classes' data is shared with every session in this worker;
+        #  only our own class's rows are specific to us.
+        all_measurements, student_summaries, class_summaries = LOCAL_API.get_all_data(
+            GLOBAL_STATE, LOCAL_STATE,
+            class_measurements=class_measurements,
+            class_summary=my_class_summary,
+        )
         all_stu_summaries = Ref(LOCAL_STATE.fields.student_summaries)
-        all_cls_summaries = Ref(LOCAL_STATE.fields.class_summaries)
-        all_meas.set(all_measurements)
-        all_stu_summaries.set(student_summaries)
-        all_cls_summaries.set(class_summaries)
 
-        student_data = models_to_glue_data(LOCAL_STATE.value.measurements, label="My Data")
+        student_data = models_to_glue_data(LOCAL_STATE.peek().measurements, label="My Data")
         if not student_data.components:
             student_data = empty_data_from_model_class(StudentMeasurement, label="My Data")
         student_data = GLOBAL_STATE.value.add_or_update_data(student_data)
 
-        class_ids = LOCAL_STATE.value.stage_5_class_data_students
-        if (not GLOBAL_STATE.value.update_db) and len(LOCAL_STATE.value.measurements)>0:
-            class_ids.append([m.student_id for m in LOCAL_STATE.value.measurements][0])
-        class_data_points = [m for m in LOCAL_STATE.value.class_measurements if m.student_id in class_ids]
+        class_ids = LOCAL_STATE.peek().stage_5_class_data_students
+        if (not GLOBAL_STATE.value.update_db) and len(LOCAL_STATE.peek().measurements)>0:
+            class_ids.append([m.student_id for m in LOCAL_STATE.peek().measurements][0])
+        class_data_points = [m for m in LOCAL_STATE.peek().class_measurements if m.student_id in class_ids]
         class_data = models_to_glue_data(class_data_points, label="Class Data")
         class_data = GLOBAL_STATE.value.add_or_update_data(class_data)
 
@@ -248,11 +255,12 @@ def Page():
         else:
             my_summ_subset = class_summary_data.subsets[0]
 
-        my_measurements = LOCAL_STATE.value.measurements
+        my_measurements = LOCAL_STATE.peek().measurements
         my_distances = [distance for m in my_measurements if ((distance := m.est_dist_value) is not None and m.velocity_value is not None)]
         my_velocities = [velocity for m in my_measurements if (m.est_dist_value is not None and (velocity := m.velocity_value) is not None)]
         my_h0, my_age = create_single_summary(distances=my_distances, velocities=my_velocities)
-        student_summaries.append(StudentSummary(student_id=student_id, hubble_fit_value=my_h0, age_value=my_age))
+        student_summaries = student_summaries.concat([StudentSummary(student_id=student_id, hubble_fit_value=my_h0, age_value=my_age)])
+        all_stu_summaries.set(student_summaries)
 
         student_hist_viewer.add_data(class_summary_data)
         student_hist_viewer.state.x_att = class_summary_data.id['age_value']
@@ -261,13 +269,13 @@ def Page():
         student_hist_viewer.layers[0].state.color = MY_CLASS_COLOR
         student_hist_viewer.add_subset(my_summ_subset)
 
-        all_data = models_to_glue_data(all_measurements, label="All Measurements")
+        all_data = all_measurements.to_glue_data(label="All Measurements")
         all_data = GLOBAL_STATE.value.add_or_update_data(all_data)
 
-        student_summ_data = models_to_glue_data(student_summaries, label="All Student Summaries")
+        student_summ_data = student_summaries.to_glue_data(label="All Student Summaries")
         student_summ_data = GLOBAL_STATE.value.add_or_update_data(student_summ_data)
 
-        all_class_summ_data = models_to_glue_data(class_summaries, label="All Class Summaries")
+        all_class_summ_data = class_summaries.to_glue_data(label="All Class Summaries")
         all_class_summ_data = GLOBAL_STATE.value.add_or_update_data(all_class_summ_data)
 
         if len(all_data.subsets) == 0:
@@ -404,8 +412,8 @@ def Page():
 
     def _state_callback_setup():
         current_step = Ref(COMPONENT_STATE.fields.current_step)
-        current_step.subscribe(update_layer_viewer_visibilities)
-        current_step.subscribe(_on_marker_updated)
+        current_step.subscribe(profiled_callback(update_layer_viewer_visibilities))
+        current_step.subscribe(profiled_callback(_on_marker_updated))
         
     solara.use_memo(_state_callback_setup, dependencies=[])
 
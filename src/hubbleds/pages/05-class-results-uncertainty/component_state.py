@@ -5,7 +5,7 @@ from pydantic import BaseModel, field_validator, computed_field
 from cosmicds.state import BaseState
 from hubbleds.base_marker import BaseMarker
 from hubbleds.base_component_state import BaseComponentState
-from hubbleds.state import LOCAL_STATE
+from hubbleds.state import question_completed
 
 import enum
 
@@ -81,7 +81,7 @@ class ComponentState(BaseComponentState, BaseState):
 
     @property
     def cla_age1_gate(self) -> bool:
-        return LOCAL_STATE.value.question_completed("age-slope-trend")
+        return question_completed("age-slope-trend")
 
     @property
     def mos_lik1_gate(self) -> bool:
@@ -105,15 +105,15 @@ class ComponentState(BaseComponentState, BaseState):
 
     @property
     def two_his3_gate(self) -> bool:
-        return LOCAL_STATE.value.question_completed("histogram-range")
+        return question_completed("histogram-range")
     
     @property
     def two_his4_gate(self) -> bool:
-        return LOCAL_STATE.value.question_completed("histogram-percent-range")
+        return question_completed("histogram-percent-range")
     
     @property
     def two_his5_gate(self) -> bool:
-        return LOCAL_STATE.value.question_completed("histogram-distribution")
+        return question_completed("histogram-distribution")
 
     # @property
     # def mor_dat1_gate(self) -> bool:
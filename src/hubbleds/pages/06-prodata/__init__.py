@@ -15,6 +15,9 @@ from cosmicds.utils import show_legend, show_layer_traces_in_legend
 
 # hubbleds
 from hubbleds.remote import LOCAL_API
+from hubbleds.profiling import profiled_callback, profiled_page
+from hubbleds.render_counts import use_render_count
+from hubbleds.write_queue import queue_stage_state_write
 from hubbleds.base_component_state import (
     transition_previous,
     transition_next,
@@ -25,7 +28,8 @@ from hubbleds.state import (
     mc_callback, 
     fr_callback, 
     get_free_response, 
-    get_multiple_choice
+    get_multiple_choice,
+    question_completed,
 )
 from hubbleds.viewer_marker_colors import (
     MY_CLASS_COLOR,
@@ -72,7 +76,9 @@ def basic_viewer_setup(viewer_class, glue_session, data_collection, name, x_att,
     
 # create the Page for the current stage
 @solara.component
+@profiled_page
 def Page():
+    use_render_count("06-prodata")
     solara.Title("HubbleDS")
     # === Setup State Loading and Writing ===
     loaded_component_state = solara.use_reactive(False)
@@ -91,12 +97,9 @@ def Page():
         if not loaded_component_state.value:
             return
 
-        # Listen for changes in the states and write them to the database
-        res = LOCAL_API.put_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
-        if res:
-            logger.info("Wrote stage 6 component state to database.")
-        else:
-            logger.info("Did not write stage 6 component state to database.")
+        # Listen for changes in the states and queue a write to the database.
+        #  Changes that arrive in quick succession are written only once.
+        queue_stage_state_write(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
 
     solara.lab.use_task(_write_component_state, dependencies=[COMPONENT_STATE.value])
     
@@ -122,7 +125,9 @@ def Page():
         if HUBBLE_1929_DATA_LABEL not in gjapp.data_collection:
             gjapp.data_collection.append(load_data(data_dir / f"{HUBBLE_1929_DATA_LABEL}.csv"))
         
-        if len(LOCAL_STATE.value.class_measurements) == 0:
+        # Peek, so that setting up glue doesn't subscribe the page to the
+        #  whole local state
+        if len(LOCAL_STATE.peek().class_measurements) == 0:
             class_measurements = LOCAL_API.get_class_measurements(GLOBAL_STATE, LOCAL_STATE)
             measurements = Ref(LOCAL_STATE.fields.class_measurements)
             student_ids = Ref(LOCAL_STATE.fields.stage_5_class_data_students)
@@ -132,7 +137,7 @@ def Page():
             measurements.set(class_measurements)
         
         if 'Class Data' not in gjapp.data_collection:
-            class_data = models_to_glue_data(LOCAL_STATE.value.class_measurements, label="Class Data")
+            class_data = models_to_glue_data(LOCAL_STATE.peek().class_measurements, label="Class Data")
             class_data = GLOBAL_STATE.value.add_or_update_data(class_data)
 
         add_link(HUBBLE_1929_DATA_LABEL, 'Distance (Mpc)', HUBBLE_KEY_DATA_LABEL, 'Distance (Mpc)')
@@ -261,12 +266,12 @@ def Page():
         show_legend(viewer, show=marker >= Marker.pro_dat8)
 
     current_step = Ref(COMPONENT_STATE.fields.current_step)
-    current_step.subscribe(lambda step: add_data_by_marker(viewer, step))
+    current_step.subscribe(profiled_callback(lambda step: add_data_by_marker(viewer, step)))
     add_data_by_marker(viewer, current_step.value)
 
     show_layer_traces_in_legend(viewer)
 
-    current_step.subscribe(display_fit_legend)
+    current_step.subscribe(profiled_callback(display_fit_legend))
     display_fit_legend(COMPONENT_STATE.value.current_step)
     
     solara.use_effect(lambda : show_fit_line(True), dependencies=[])
@@ -291,7 +296,7 @@ def Page():
             slope = linear_slope(dist[indices], vel[indices])
             class_age.set(round(AGE_CONSTANT / slope, 8))     
 
-    loaded_component_state.subscribe(_on_component_state_loaded) 
+    loaded_component_state.subscribe(profiled_callback(_on_component_state_loaded))
 
     if GLOBAL_STATE.value.show_team_interface:
         StateEditor(Marker, COMPONENT_STATE, LOCAL_STATE, LOCAL_API, show_all=not GLOBAL_STATE.value.educator)
@@ -348,7 +353,7 @@ def Page():
                     'mc_score': get_multiple_choice(LOCAL_STATE, COMPONENT_STATE, 'pro-dat4'), 
                     'score_tag': 'pro-dat4',
                     'free_response': get_free_response(LOCAL_STATE, COMPONENT_STATE, 'prodata-free-4'),
-                    'mc_completed': LOCAL_STATE.value.question_completed("pro-dat4"),
+                    'mc_completed': question_completed("pro-dat4"),
                 }
             )
             ScaffoldAlert(
@@ -389,7 +394,7 @@ def Page():
                     'mc_score': get_multiple_choice(LOCAL_STATE, COMPONENT_STATE, 'pro-dat7'), 
                     'score_tag': 'pro-dat7',
                     'free_response': get_free_response(LOCAL_STATE, COMPONENT_STATE, 'prodata-free-7'),
-                    'mc_completed': LOCAL_STATE.value.question_completed("pro-dat7"),
+                    'mc_completed': question_completed("pro-dat7"),
                 }                
             )
             ScaffoldAlert(
@@ -5,9 +5,12 @@ import solara
 from solara.toestand import Ref
 
 from hubbleds.components import IntroSlideshowVue
-from hubbleds.state import LOCAL_STATE, GLOBAL_STATE
+from hubbleds.state import LOCAL_STATE, GLOBAL_STATE, UI_STATE
 
 from hubbleds.remote import LOCAL_API
+from hubbleds.profiling import profiled_page
+from hubbleds.render_counts import use_render_count
+from hubbleds.write_queue import queue_stage_state_write
 from hubbleds.widgets.exploration_tool.exploration_tool import ExplorationTool
 from ..utils import get_image_path, push_to_route
 
@@ -20,7 +23,9 @@ from .component_state import COMPONENT_STATE, Marker
 logger = setup_logger("STAGE INTRO")
 
 @solara.component
+@profiled_page
 def Page():
+    use_render_count("intro")
     solara.Title("HubbleDS")
     router = solara.use_router()
     location = solara.use_context(solara.routing._location_context)
@@ -38,12 +43,9 @@ def Page():
         if not loaded_component_state.value:
             return
 
-        # Listen for changes in the states and write them to the database
-        res = LOCAL_API.put_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
-        if res:
-            logger.info("Wrote component state to database.")
-        else:
-            logger.info("Did not write component state to database.")
+        # Listen for changes in the states and queue a write to the database.
+        #  Changes that arrive in quick succession are written only once.
+        queue_stage_state_write(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
 
     solara.lab.use_task(_write_component_state, dependencies=[COMPONENT_STATE.value])
 
@@ -83,7 +85,7 @@ def Page():
         ],
         image_location=get_image_path(router, "stage_intro"),
         event_slideshow_finished=lambda _: push_to_route(router, location, "01-spectra-&-velocity"),
-        debug=LOCAL_STATE.value.debug_mode,
+        debug=UI_STATE.debug_mode,
         exploration_tool=exploration_tool,
         exploration_tool1=exploration_tool,
         exploration_tool2=exploration_tool,
@@ -0,0 +1,216 @@
+import bisect
+import functools
+import inspect
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from cosmicds.logger import setup_logger
+from solara.server import kernel_context
+
+logger = setup_logger("PROFILING")
+
+# Profiling is opt-in; when it is off the decorators below return the
+#  functions they are given unchanged
+PROFILING_ENABLED = os.getenv("HUBBLEDS_PROFILE", "").lower() in ("1", "true", "yes", "on")
+
+# Upper bounds of the histogram buckets, in seconds
+PROFILE_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf
+)
+
+# Route that timings are filed under when no page has rendered in the session
+NO_ROUTE = "-"
+
+
+class Histogram:
+    """
+    Counts of durations in fixed buckets, along with their total and maximum.
+    Quantiles are estimated as the upper bound of the bucket they fall in.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = PROFILE_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return math.nan
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else math.nan,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": {
+                "inf" if math.isinf(bound) else str(bound): count
+                for bound, count in zip(self.buckets, self.counts)
+            },
+        }
+
+
+class Profiler:
+    """
+    Collects timings of page renders, glue setups, API calls and reactive
+    callbacks, aggregated per route into histograms. The route of a timing
+    is the page most recently rendered in the session it was taken in.
+    """
+
+    def __init__(self):
+        self._histograms: dict[tuple[str, str, str], Histogram] = {}
+        self._routes: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def set_route(self, route: str):
+        try:
+            context = kernel_context.get_current_context()
+        except RuntimeError:
+            return
+        with self._lock:
+            if context.id not in self._routes:
+                context.on_close(lambda: self._forget(context.id))
+            self._routes[context.id] = route
+
+    def _forget(self, context_id: str):
+        with self._lock:
+            self._routes.pop(context_id, None)
+
+    def current_route(self) -> str:
+        try:
+            context = kernel_context.get_current_context()
+        except RuntimeError:
+            return NO_ROUTE
+        return self._routes.get(context.id, NO_ROUTE)
+
+    def record(self, kind: str, name: str, seconds: float, route: Optional[str] = None):
+        key = (route or self.current_route(), kind, name)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, kind: str, name: str, route: Optional[str] = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(kind, name, time.perf_counter() - start, route)
+
+    def snapshot(self) -> dict[str, dict[str, dict[str, dict]]]:
+        """Histograms as nested dicts: route, then kind, then name."""
+        result = {}
+        with self._lock:
+            for (route, kind, name), histogram in sorted(self._histograms.items()):
+                result.setdefault(route, {}).setdefault(kind, {})[name] = histogram.as_dict()
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+PROFILER = Profiler()
+
+
+def _callable_name(func: Callable) -> str:
+    module = getattr(func, "__module__", None) or ""
+    name = getattr(func, "__qualname__", None) or repr(func)
+    return f"{module.rsplit('.', 1)[-1]}.{name.replace('<locals>.', '')}"
+
+
+def profiled(kind: str, name: Optional[str] = None):
+    """
+    Decorator that times each call of a function (or each run of a coroutine
+    function) under `kind` and `name`.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        if not PROFILING_ENABLED:
+            return func
+
+        label = name or _callable_name(func)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with PROFILER.timer(kind, label):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with PROFILER.timer(kind, label):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def profiled_methods(kind: str):
+    """
+    Class decorator that times every public method defined on the class
+    itself (not inherited ones), named by the method's name.
+    """
+
+    def decorator(cls: type) -> type:
+        if not PROFILING_ENABLED:
+            return cls
+
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith("_") or not inspect.isfunction(value):
+                continue
+            setattr(cls, attr, profiled(kind, attr)(value))
+        return cls
+
+    return decorator
+
+
+def profiled_page(func: Callable) -> Callable:
+    """
+    Decorator for a page's `Page` function, placed below `@solara.component`.
+    Times each render and files the session's later timings under the page.
+    """
+    if not PROFILING_ENABLED:
+        return func
+
+    route = func.__module__.rsplit(".", 1)[-1]
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        PROFILER.set_route(route)
+        with PROFILER.timer("render", "Page", route):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def profiled_callback(callback: Callable, name: Optional[str] = None) -> Callable:
+    """Wraps a reactive subscription callback so that its calls are timed."""
+    return profiled("callback", name)(callback)
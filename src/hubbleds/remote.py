@@ -1,10 +1,25 @@
 from cosmicds.utils import CDSJSONEncoder
-from hubbleds.state import ClassSummary, StudentMeasurement, StudentSummary
+from hubbleds.state import (
+    ClassSummary,
+    ClassSummaryTable,
+    StudentMeasurement,
+    StudentMeasurementTable,
+    StudentSummaryTable,
+)
 from contextlib import closing
 from io import BytesIO
 import json
 from astropy.io import fits
 from hubbleds.state import GalaxyData, SpectrumData, LocalState
+from hubbleds.galaxy_catalog import GALAXY_CATALOGS, GalaxyCatalog
+from hubbleds.spectrum_cache import SPECTRUM_CACHE, SpectrumArrays
+from hubbleds.spectrum_bundle import get_spectrum_bundle
+from hubbleds.decimation import DISPLAY_POINTS
+from hubbleds.json_stream import iter_json_object
+from hubbleds.all_data import ALL_DATA, AllDataTables
+from hubbleds.seed_data import get_seed_table
+from hubbleds.profiling import profiled_methods
+from hubbleds.api_metrics import API_METRICS
 from cosmicds.remote import BaseAPI
 from cosmicds.state import GlobalState, BaseState, GLOBAL_STATE
 from solara import Reactive
@@ -20,33 +35,71 @@ logger = setup_logger("API")
 from .data_management import DB_VELOCITY_FIELD
 from numpy.random import Generator, PCG64, SeedSequence
 from numpy import arange, asarray, ravel, column_stack
+import numpy as np
 from typing import Any
-from pandas import read_csv
 
 from .data_management import ELEMENT_REST
 DEBOUNCE_TIMEOUT = 1
 
+# Bytes read at a time when streaming large responses
+ALL_DATA_CHUNK_SIZE = 64 * 1024
 
+
+@profiled_methods("api")
 class LocalAPI(BaseAPI):
-    def get_galaxies(self, local_state: Reactive[LocalState]) -> list[GalaxyData]:
+    # Submit all of a student's measurements in a single request. A bulk
+    #  endpoint that the server doesn't know is recorded in
+    #  `_unavailable_bulk_urls` and not tried again.
+    bulk_measurement_writes: bool = True
+    _unavailable_bulk_urls: frozenset[str] = frozenset()
+    _session_override = None
+
+    @property
+    def request_session(self):
+        if self._session_override is not None:
+            return self._session_override
+        session = super().request_session
+        API_METRICS.instrument(session)
+        return session
+
+    def use_session(self, session):
+        """
+        Route all requests through `session` instead of the default API
+        session, e.g. a `hubbleds.stand_in.StandInServer` in tests. Passing
+        `None` restores the default session. Bulk endpoints found missing on
+        the previous session are tried again.
+        """
+        self._session_override = session
+        self._unavailable_bulk_urls = frozenset()
+
+    def _fetch_galaxies(self, story_id: str, types: str = "Sp") -> list[GalaxyData]:
         galaxy_data_json = self.request_session.get(
-            f"{self.API_URL}/{local_state.value.story_id}/galaxies?types=Sp"
+            f"{self.API_URL}/{story_id}/galaxies?types={types}"
         ).json()
 
         galaxy_data = [GalaxyData(**x) for x in galaxy_data_json]
 
         return galaxy_data
 
-    def load_spectrum_data(
-        self, gal_data: GalaxyData, local_state: Reactive[LocalState]
-    ) -> SpectrumData | None:
+    def get_galaxy_catalog(
+        self, local_state: Reactive[LocalState], types: str = "Sp"
+    ) -> GalaxyCatalog:
+        story_id = local_state.value.story_id
+        return GALAXY_CATALOGS.get(
+            (story_id, types), lambda: self._fetch_galaxies(story_id, types)
+        )
+
+    def get_galaxies(self, local_state: Reactive[LocalState]) -> list[GalaxyData]:
+        return list(self.get_galaxy_catalog(local_state).galaxies)
+
+    def _fetch_spectrum_arrays(
+        self, story_id: str, gal_data: GalaxyData
+    ) -> SpectrumArrays | None:
         file_name = f"{gal_data.name.replace('.fits', '')}.fits"
 
         type_folders = {"Sp": "spiral", "E": "elliptical", "Ir": "irregular"}
         folder = type_folders[gal_data.type]
-        url = (
-            f"{self.API_URL}/{local_state.value.story_id}/spectra/{folder}/{file_name}"
-        )
+        url = f"{self.API_URL}/{story_id}/spectra/{folder}/{file_name}"
         response = self.request_session.get(url)
 
         with closing(BytesIO(response.content)) as f:
@@ -55,20 +108,64 @@ class LocalAPI(BaseAPI):
             with fits.open(f) as hdulist:
                 data = hdulist["COADD"].data if "COADD" in hdulist else None
 
-        if data is None:
-            logger.error("No extension named 'COADD' in spectrum file.")
-            return
+                if data is None:
+                    logger.error("No extension named 'COADD' in spectrum file.")
+                    return None
 
-        spec_data = SpectrumData(
-            name=gal_data.name,
-            wave=10 ** data["loglam"],
-            flux=data["flux"],
-            ivar=data["ivar"],
-        )
+                arrays = {
+                    "wave": 10 ** data["loglam"],
+                    "flux": asarray(data["flux"]),
+                    "ivar": asarray(data["ivar"]),
+                }
 
         logger.info("Loaded spectrum data for galaxy `%s` from database.", gal_data.id)
 
-        return spec_data
+        return arrays
+
+    def load_spectrum_data(
+        self, gal_data: GalaxyData, local_state: Reactive[LocalState]
+    ) -> SpectrumData | None:
+        story_id = local_state.value.story_id
+
+        arrays = None
+        bundle = get_spectrum_bundle()
+        if bundle is not None and bundle.story_id == story_id:
+            arrays = bundle.get(gal_data.type, gal_data.name)
+
+        if arrays is None:
+            arrays = SPECTRUM_CACHE.get_or_load(
+                (story_id, gal_data.type, gal_data.name),
+                lambda: self._fetch_spectrum_arrays(story_id, gal_data),
+            )
+
+        if arrays is None:
+            return None
+
+        return SpectrumData(name=gal_data.name, **arrays)
+
+    def load_display_spectrum(
+        self,
+        gal_data: GalaxyData,
+        local_state: Reactive[LocalState],
+        display_points: int = DISPLAY_POINTS,
+    ) -> tuple[np.ndarray, np.ndarray] | None:
+        """
+        The display resolution wave and flux of a galaxy's spectrum that the
+        spectrum bundle was built with, or `None` if there is no bundle for
+        the story or it was built for a different number of points.
+        """
+        bundle = get_spectrum_bundle()
+        if (
+            bundle is None
+            or bundle.story_id != local_state.value.story_id
+            or bundle.display_points != display_points
+        ):
+            return None
+
+        arrays = bundle.get_display(gal_data.type, gal_data.name)
+        if arrays is None:
+            return None
+        return arrays["wave"], arrays["flux"]
 
     def get_dummy_data(self) -> List[StudentMeasurement]:
         path = (Path(__file__).parent / "data" / "dummy_student_data.csv").as_posix()
@@ -89,30 +186,112 @@ class LocalAPI(BaseAPI):
                 measurements.append(StudentMeasurement(**measurement))
         return measurements
 
-    def get_measurements(
+    # The request builders and response parsers below are shared with
+    #  `hubbleds.async_remote.AsyncLocalAPI`, which makes the same requests
+    #  with an async client. The responses can come from either client.
+
+    def _skip_db_write(self) -> bool:
+        if not GLOBAL_STATE.value.update_db or self.is_educator:
+            logger.info('Skipping DB write')
+            return True
+        return False
+
+    def _measurements_url(
         self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
-    ) -> list[StudentMeasurement]:
-        url = (
+    ) -> str:
+        return (
             f"{self.API_URL}/{local_state.value.story_id}/measurements/"
             f"{global_state.value.student.id}"
         )
+
+    def _class_measurements_url(
+        self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
+    ) -> str | None:
+        class_info = global_state.value.classroom.class_info
+        if class_info is None or 'id' not in class_info:
+            logger.warning("No class id found in classroom info.")
+            return None
+        return (
+            f"{self.API_URL}/{local_state.value.story_id}/class-measurements/"
+            f"{global_state.value.student.id}/{class_info['id']}"
+        )
+
+    def _students_completed_url(self, story_id: str, student_id: int, class_id: int) -> str:
+        return (
+            f"{self.API_URL}/{story_id}/class-measurements/students-completed/"
+            f"{student_id}/{class_id}"
+        )
+
+    def _stage_state_request(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+        component_state: Reactive[BaseState],
+    ) -> tuple[str, dict]:
+        comp_state_dict = component_state.value.dict(
+            exclude={"selected_galaxy", "selected_example_galaxy"}
+        )
+        comp_state_dict.update(
+            {"current_step": component_state.value.current_step.value}
+        )
+        url = (
+            f"{self.API_URL}/stage-state/{global_state.value.student.id}/"
+            f"{local_state.value.story_id}/{component_state.value.stage_id}"
+        )
+        return url, comp_state_dict
+
+    def _story_state_request(
+        self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
+    ) -> tuple[str, str]:
+        state = {
+            "app": global_state.value.model_dump(),
+            "story": local_state.value.as_dict(),
+        }
+        url = (
+            f"{self.API_URL}/story-state/{global_state.value.student.id}/"
+            f"{local_state.value.story_id}"
+        )
+        return url, json.dumps(state, cls=CDSJSONEncoder)
+
+    @staticmethod
+    def _parse_measurements(r, description: str) -> list[StudentMeasurement] | None:
+        if r.status_code != 200:
+            logger.error("Failed to load %s from database.", description)
+            logger.error(r.text)
+            return None
+        return [StudentMeasurement(**measurement) for measurement in r.json()["measurements"]]
+
+    @staticmethod
+    def _parse_students_completed(r) -> int:
+        # Raises rather than returning a count, so that a failed check
+        #  doesn't replace the last known count
+        if r.status_code != 200:
+            logger.error("Failed to load the number of students who completed their measurements.")
+            logger.error(r.text)
+            r.raise_for_status()
+        return r.json()["students_completed_measurements"]
+
+    @staticmethod
+    def _check_write(r, description: str) -> bool:
+        if r.status_code != 200:
+            logger.error("Failed to write %s to database.", description)
+            logger.error(r.text)
+            return False
+        return True
+
+    def get_measurements(
+        self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
+    ) -> list[StudentMeasurement]:
         if not global_state.value.update_db or self.is_educator:
             Ref(local_state.fields.measurements_loaded).set(True)
             logger.info("Skipping retrieval of measurements from database.")
             return []
-        
-        r = self.request_session.get(url)
-            
-        measurements = Ref(local_state.fields.measurements)
-        if r.status_code == 200:
-            measurement_json = r.json()
-
-            parsed_measurements = []
 
-            for measurement in measurement_json["measurements"]:
-                measurement = StudentMeasurement(**measurement)
-                parsed_measurements.append(measurement)
+        r = self.request_session.get(self._measurements_url(global_state, local_state))
 
+        measurements = Ref(local_state.fields.measurements)
+        parsed_measurements = self._parse_measurements(r, "measurements")
+        if parsed_measurements is not None:
             measurements.set(parsed_measurements)
 
         Ref(local_state.fields.measurements_loaded).set(True)
@@ -176,63 +355,127 @@ class LocalAPI(BaseAPI):
 
         return sample_measurements.value
 
-    def put_measurements(
-        self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
-    ):  
-        
-        if not GLOBAL_STATE.value.update_db or self.is_educator: 
-            logger.info('Skipping DB write')
-            return False
-        
-        url = f"{self.API_URL}/{local_state.value.story_id}/submit-measurement/"
+    def _submit_measurements(
+        self,
+        url: str,
+        bulk_url: str,
+        measurements: list[StudentMeasurement],
+        student_id: int,
+        description: str = "measurement",
+    ) -> bool:
+        if not measurements:
+            return True
+
+        payloads = [m.model_dump(exclude={"galaxy"}) for m in measurements]
+
+        if self.bulk_measurement_writes and bulk_url not in self._unavailable_bulk_urls:
+            r = self.request_session.put(bulk_url, json={"measurements": payloads})
 
-        for measurement in local_state.value.measurements:
-            r = self.request_session.put(url, json=measurement.dict(exclude={"galaxy"}))
+            if r.status_code in (404, 405):
+                logger.warning(
+                    "Bulk %s endpoint is unavailable, falling back to one "
+                    "request per measurement.",
+                    description,
+                )
+                self._unavailable_bulk_urls = self._unavailable_bulk_urls | {bulk_url}
+            elif r.status_code != 200:
+                logger.error(
+                    "Failed to store %ss for student `%s`.", description, student_id
+                )
+                logger.error(r.text)
+                return False
+            else:
+                results = r.json().get("results", [])
+                failed = [
+                    result for result in results
+                    if result.get("status", 200) != 200
+                ]
+                for result in failed:
+                    logger.warning(
+                        "Failed to add %s for galaxy `%s` by student `%s`: %s",
+                        description,
+                        result.get("galaxy_id"),
+                        student_id,
+                        result.get("error", ""),
+                    )
+                return not failed
+
+        success = True
+        for measurement, payload in zip(measurements, payloads):
+            r = self.request_session.put(url, json=payload)
 
             if r.status_code != 200:
                 logger.warning(
-                    f"Failed to add measurement for galaxy `%s` by student `%s`.",
-                    global_state.value.student.id,
+                    "Failed to add %s for galaxy `%s` by student `%s`.",
+                    description,
                     measurement.galaxy_id,
+                    student_id,
                 )
+                success = False
 
-        logger.info(
-            "Stored measurements for student `%s`.",
+        return success
+
+    def put_measurements(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+        measurements: list[StudentMeasurement] | None = None,
+    ):
+        """
+        Store the student's measurements, or only `measurements` if given.
+        """
+        
+        if not GLOBAL_STATE.value.update_db or self.is_educator: 
+            logger.info('Skipping DB write')
+            return False
+        
+        story_id = local_state.value.story_id
+        success = self._submit_measurements(
+            f"{self.API_URL}/{story_id}/submit-measurement/",
+            f"{self.API_URL}/{story_id}/submit-measurements/",
+            local_state.value.measurements if measurements is None else measurements,
             global_state.value.student.id,
         )
-        return True
+
+        if success:
+            logger.info(
+                "Stored measurements for student `%s`.",
+                global_state.value.student.id,
+            )
+        return success
 
     def put_sample_measurements(
-        self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+        measurements: list[StudentMeasurement] | None = None,
     ):
+        """
+        Store the student's example measurements, or only `measurements` if
+        given.
+        """
         if not GLOBAL_STATE.value.update_db or self.is_educator: 
             logger.info('Skipping DB write')
             return False
         
-        url = f"{self.API_URL}/{local_state.value.story_id}/sample-measurement/"
-    
-        for i, measurement in enumerate(local_state.value.example_measurements):
-            if i == 0:
-                logger.info(
-                    f"Adding example measurement for galaxy `%s` by student `%s`.",
-                    measurement.galaxy_id,
-                    global_state.value.student.id,
-                )
-
-            r = self.request_session.put(url, json=measurement.dict(exclude={"galaxy"}))
-
-            if r.status_code != 200:
-                logger.warning(
-                    f"Failed to add example measurement for galaxy `%s` by student `%s`.",
-                    measurement.galaxy_id,
-                    global_state.value.student.id,
-                )
+        story_id = local_state.value.story_id
+        success = self._submit_measurements(
+            f"{self.API_URL}/{story_id}/sample-measurement/",
+            f"{self.API_URL}/{story_id}/submit-sample-measurements/",
+            (
+                local_state.value.example_measurements
+                if measurements is None else measurements
+            ),
+            global_state.value.student.id,
+            description="example measurement",
+        )
 
+        if success:
             logger.info(
                 "Stored example measurements for student %s.",
                 global_state.value.student.id,
             )
-        return True
+        return success
 
     def get_measurement(
         self,
@@ -281,6 +524,32 @@ class LocalAPI(BaseAPI):
 
         return measurement
 
+    def delete_measurement(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+        galaxy_id: int,
+    ) -> bool:
+        if not global_state.value.update_db or self.is_educator:
+            logger.info("Skipping deletion of measurements.")
+            return False
+
+        r = self.request_session.delete(
+            f"{self.API_URL}/{local_state.value.story_id}/measurements/"
+            f"{global_state.value.student.id}/{galaxy_id}"
+        )
+
+        if r.status_code != 200:
+            logger.error(
+                "Failed to delete measurement of galaxy `%s` for student `%s`.",
+                galaxy_id,
+                global_state.value.student.id,
+            )
+            logger.error(r.text)
+            return False
+
+        return True
+
     def delete_all_measurements(
         self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
     ):
@@ -318,20 +587,16 @@ class LocalAPI(BaseAPI):
         global_state: Reactive[GlobalState],
         local_state: Reactive[LocalState],
     ) -> list[StudentMeasurement]:
-        url = (
-            f"{self.API_URL}/{local_state.value.story_id}/class-measurements/"
-            f"{global_state.value.student.id}/{global_state.value.classroom.class_info['id']}"
-            f"?complete_only=true"
-        )
-        r = self.request_session.get(url)
-        measurement_json = r.json()
+        url = self._class_measurements_url(global_state, local_state)
+        if url is None:
+            return []
 
-        measurements = Ref(local_state.fields.class_measurements)
-        parsed_measurements = []
+        r = self.request_session.get(url, params={"complete_only": "true"})
 
-        for measurement in measurement_json["measurements"]:
-            measurement = StudentMeasurement(**measurement)
-            parsed_measurements.append(measurement)
+        measurements = Ref(local_state.fields.class_measurements)
+        parsed_measurements = self._parse_measurements(r, "class measurements")
+        if parsed_measurements is None:
+            return measurements.value
 
         measurements.set(parsed_measurements)
 
@@ -347,52 +612,100 @@ class LocalAPI(BaseAPI):
         if global_state.value.classroom.class_info is None or 'id' not in global_state.value.classroom.class_info:
             logger.warning("No class id found in classroom info.")
             return 0
-        url = (
-            f"{self.API_URL}/{local_state.value.story_id}/class-measurements/students-completed/"
-            f"{global_state.value.student.id}/{global_state.value.classroom.class_info['id']}"
+        return self.fetch_students_completed_count(
+            local_state.value.story_id,
+            global_state.value.student.id,
+            global_state.value.classroom.class_info['id'],
+        )
+
+    def fetch_students_completed_count(
+        self, story_id: str, student_id: int, class_id: int
+    ) -> int:
+        """
+        Same as `get_students_completed_measurements_count`, but doesn't touch
+        any session state, so it can be called from outside a session.
+        Raises if the API answers with an error.
+        """
+        r = self.request_session.get(
+            self._students_completed_url(story_id, student_id, class_id)
+        )
+        return self._parse_students_completed(r)
+
+    def fetch_all_data(
+        self, story_id: str, class_id: int | None = None
+    ) -> AllDataTables:
+        """
+        Fetches the measurements and summaries of every class in the story,
+        leaving out class `class_id` if it's given. This doesn't touch any
+        session state, so it can be called from outside a session.
+        """
+        url = f"{self.API_URL}/{story_id}/all-data?minimal=True"
+        if class_id is not None:
+            url += f"&class_id={class_id}"
+
+        # The response is parsed as it arrives, one row at a time, straight
+        #  into the column buffers, so the whole JSON document is never held
+        #  in memory.
+        builders = {
+            "measurements": StudentMeasurementTable.builder(),
+            "studentData": StudentSummaryTable.builder(),
+            "classData": ClassSummaryTable.builder(),
+        }
+        keys = set()
+        with closing(self.request_session.get(url, stream=True)) as r:
+            r.raise_for_status()
+            for key, row in iter_json_object(
+                r.iter_content(chunk_size=ALL_DATA_CHUNK_SIZE), keys
+            ):
+                builder = builders.get(key)
+                if builder is None or not isinstance(row, dict):
+                    continue
+                if key == "measurements" and row.get("class_id") is None:
+                    continue
+                builder.append(row)
+
+        # Anything else isn't the all-data response, and an empty table
+        #  would replace the data every session sees
+        if "measurements" not in keys:
+            raise ValueError(f"The all-data response for `{story_id}` has no measurements.")
+
+        return AllDataTables(
+            measurements=builders["measurements"].build(),
+            student_summaries=builders["studentData"].build(),
+            class_summaries=builders["classData"].build(),
         )
-        r = self.request_session.get(url)
-        # TODO: Handle non-200 status codes
-        return r.json()["students_completed_measurements"]
 
     def get_all_data(
         self,
         global_state: Reactive[GlobalState],
         local_state: Reactive[LocalState],
-    ) -> tuple[list[StudentMeasurement], list[StudentSummary], list[ClassSummary]]:
-        url = f"{self.API_URL}/{local_state.value.story_id}/all-data?minimal=True"
-        if global_state.value.classroom.class_info is not None:
-            url += f"&class_id={global_state.value.classroom.class_info['id']}"
-        r = self.request_session.get(url)
-        res_json = r.json()
+        class_measurements: list[StudentMeasurement] | None = None,
+        class_summary: ClassSummary | None = None,
+    ) -> tuple[StudentMeasurementTable, StudentSummaryTable, ClassSummaryTable]:
+        """
+        Loads the all-classes data from the worker's shared snapshot. The
+        rows of the student's own class are replaced by `class_measurements`
+        and `class_summary`, and that class's student summaries are left out.
+        """
+        class_info = global_state.value.classroom.class_info
+        class_id = class_info["id"] if class_info is not None else None
+        tables = ALL_DATA.class_view(
+            local_state.value.story_id,
+            class_id,
+            class_measurements or [],
+            class_summary,
+        )
 
         measurements = Ref(local_state.fields.all_measurements)
-        parsed_measurements = []
-        for measurement in res_json["measurements"]:
-            if measurement["class_id"] is None:
-                continue
-            measurement = StudentMeasurement(**measurement)
-            parsed_measurements.append(measurement)
-
-        measurements.set(parsed_measurements)
+        measurements.set(tables.measurements)
 
         student_summaries = Ref(local_state.fields.student_summaries)
-        parsed_student_summaries = []
-        for summary in res_json["studentData"]:
-            summary = StudentSummary(**summary)
-            parsed_student_summaries.append(summary)
-
-        student_summaries.set(parsed_student_summaries)
+        student_summaries.set(tables.student_summaries)
 
         class_summaries = Ref(local_state.fields.class_summaries)
-        parsed_class_summaries = []
-        for summary in res_json["classData"]:
-            summary = ClassSummary(**summary)
-            parsed_class_summaries.append(summary)
-
-        class_summaries.set(parsed_class_summaries)
+        class_summaries.set(tables.class_summaries)
 
-        logger.info("Loaded all measurements and summary data from database.")
+        logger.info("Loaded all measurements and summary data.")
 
         return measurements.value, student_summaries.value, class_summaries.value
 
@@ -402,61 +715,34 @@ class LocalAPI(BaseAPI):
         local_state: Reactive[LocalState],
         component_state: Reactive[BaseState],
     ):
-        if not GLOBAL_STATE.value.update_db or self.is_educator: 
-            logger.info('Skipping DB write')
+        if self._skip_db_write():
             return False
-        
-        logger.info("Serializing stage state into DB.")
 
-        comp_state_dict = component_state.value.dict(
-            exclude={"selected_galaxy", "selected_example_galaxy"}
-        )
-        comp_state_dict.update(
-            {"current_step": component_state.value.current_step.value}
-        )
+        logger.info("Serializing stage state into DB.")
 
-        r = self.request_session.put(
-            f"{self.API_URL}/stage-state/{global_state.value.student.id}/"
-            f"{local_state.value.story_id}/{component_state.value.stage_id}",
-            json=comp_state_dict,
+        url, comp_state_dict = self._stage_state_request(
+            global_state, local_state, component_state
         )
-
-        if r.status_code != 200:
-            logger.error("Failed to write story state to database.")
-            logger.error(r.text)
-            return False
-        
-        return True
+        r = self.request_session.put(url, json=comp_state_dict)
+        return self._check_write(r, "stage state")
 
     def put_story_state(
         self,
         global_state: Reactive[GlobalState],
         local_state: Reactive[LocalState],
     ):
-        if not GLOBAL_STATE.value.update_db or self.is_educator: 
-            logger.info('Skipping DB write')
+        if self._skip_db_write():
             return False
-        
-        logger.info("Serializing state into DB.")
 
-        state = {
-            "app": global_state.value.model_dump(),
-            "story": local_state.value.as_dict(),
-        }
+        logger.info("Serializing state into DB.")
 
-        state_json = json.dumps(state, cls=CDSJSONEncoder)
+        url, state_json = self._story_state_request(global_state, local_state)
         r = self.request_session.put(
-            f"{self.API_URL}/story-state/{global_state.value.student.id}/{local_state.value.story_id}",
+            url,
             headers={"Content-Type": "application/json"},
             data=state_json,
         )
-
-        if r.status_code != 200:
-            logger.error("Failed to write story state to database.")
-            logger.error(r.text)
-            return False
-        
-        return True
+        return self._check_write(r, "story state")
     
     import json
 
@@ -468,23 +754,6 @@ class LocalAPI(BaseAPI):
         # url = f"{self.API_URL}/{local_state.value.story_id}/sample-measurements"
         # r = self.request_session.get(url)
         # res_json = r.json()
-        path = (Path(__file__).parent / "data" / "ExampleGalaxyDataFromStudents.csv").as_posix()
-        # with open(path, 'r') as f:
-        #     res_json = json.load(f)
-        res_json = read_csv(path).to_dict(orient='records')
-
-        random_subset = range(len(res_json))
-        measurements = []
-
-        _filter_func = lambda x: res_json[x]['measurement_number'] == which
-        filtered = filter(_filter_func, random_subset) if which != 'both' else random_subset
-        
-        classes_to_ignore = [209] # list of class id's to ignore
-        _class_id_filter = lambda x: res_json[x]['class_id'] not in classes_to_ignore
-        filtered = filter(_class_id_filter, filtered)
-        for i in filtered:
-            measurements.append(res_json[i])
-
-        return measurements
+        return get_seed_table().records(which)
 
 LOCAL_API = LocalAPI()
@@ -0,0 +1,48 @@
+import threading
+from collections import Counter
+
+from hubbleds.profiling import PROFILING_ENABLED
+
+_COUNTS: Counter[str] = Counter()
+_LOCK = threading.Lock()
+
+
+def use_render_count(name: str) -> int:
+    """
+    Counts a render of the calling component under `name` and returns the
+    number of renders so far. Counts are shared by every session in the
+    worker; read them with `render_counts`. Like profiling, counting is
+    opt-in (`HUBBLEDS_PROFILE`); when it is off this returns 0.
+    """
+    if not PROFILING_ENABLED:
+        return 0
+    with _LOCK:
+        _COUNTS[name] += 1
+        return _COUNTS[name]
+
+
+def render_counts() -> dict[str, int]:
+    with _LOCK:
+        return dict(_COUNTS)
+
+
+def reset_render_counts():
+    with _LOCK:
+        _COUNTS.clear()
+
+
+def render_counts_to_prometheus(prefix: str = "hubbleds") -> str:
+    """
+    The render counts in the Prometheus text exposition format, or nothing
+    if they aren't being counted.
+    """
+    if not PROFILING_ENABLED:
+        return ""
+    lines = [
+        f"# HELP {prefix}_renders_total Renders of each component counted with use_render_count.",
+        f"# TYPE {prefix}_renders_total counter",
+    ]
+    for name, count in sorted(render_counts().items()):
+        label = name.replace("\\", "\\\\").replace('"', '\\"')
+        lines.append(f'{prefix}_renders_total{{component="{label}"}} {count}')
+    return "\n".join(lines) + "\n"
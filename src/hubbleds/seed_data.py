@@ -0,0 +1,104 @@
+import threading
+from pathlib import Path
+from typing import Any, Optional, Union
+
+import numpy as np
+from pandas import read_csv
+
+from glue.core import Data
+
+from hubbleds.data_management import DB_MEASNUM_FIELD, DB_VELOCITY_FIELD
+
+SEED_DATA_PATH = Path(__file__).parent / "data" / "ExampleGalaxyDataFromStudents.csv"
+
+# Classes whose measurements are left out of the seed data
+SEED_IGNORED_CLASSES = (209,)
+
+SEED_PARTITIONS = ("both", "first", "second", "tutorial")
+
+
+# Seed of the draws that pick the tutorial subset, so every session and
+#  every worker shows the same tutorial data
+SEED_TUTORIAL_SEED = 42
+
+
+def tutorial_mask(velocities: np.ndarray, seed: int = SEED_TUTORIAL_SEED) -> np.ndarray:
+    """
+    Picks ~70% of the measurements for the tutorial, keeping only ~75% of
+    those with correct velocities so that they don't crowd the others.
+    """
+    rng = np.random.default_rng(seed)
+    kept, thinned = rng.random((2, len(velocities)))
+    correct = (velocities >= 11_130) & (velocities <= 11_220)
+    return (kept <= 0.7) & (~correct | (thinned <= 0.75))
+
+
+class SeedTable:
+    """
+    The example measurements from past students that the example galaxy
+    viewers are seeded with, read once per process. Each partition (all
+    measurements, first or second measurements, or the tutorial subset)
+    is held as read-only column arrays that every session shares.
+    """
+
+    def __init__(self, columns: dict[str, np.ndarray]):
+        both = {name: np.asarray(column) for name, column in columns.items()}
+        numbers = both[DB_MEASNUM_FIELD]
+        self._partitions = {
+            "both": both,
+            "first": self._take(both, numbers == "first"),
+            "second": self._take(both, numbers == "second"),
+            "tutorial": self._take(both, tutorial_mask(both[DB_VELOCITY_FIELD])),
+        }
+        for partition in self._partitions.values():
+            for column in partition.values():
+                column.flags.writeable = False
+
+    @staticmethod
+    def _take(columns: dict[str, np.ndarray], mask: np.ndarray) -> dict[str, np.ndarray]:
+        return {name: column[mask] for name, column in columns.items()}
+
+    @classmethod
+    def from_csv(cls, path: Union[str, Path], ignore_classes=SEED_IGNORED_CLASSES) -> "SeedTable":
+        frame = read_csv(path)
+        frame = frame[~frame["class_id"].isin(ignore_classes)]
+        return cls({name: frame[name].to_numpy() for name in frame.columns})
+
+    def __len__(self) -> int:
+        return len(self.columns("both")[DB_MEASNUM_FIELD])
+
+    def columns(self, which: str = "both") -> dict[str, np.ndarray]:
+        try:
+            return self._partitions[which]
+        except KeyError:
+            raise ValueError(
+                f"Unknown seed partition `{which}`, expected one of {SEED_PARTITIONS}"
+            ) from None
+
+    def records(self, which: str = "both") -> list[dict[str, Any]]:
+        """The rows of a partition as new dicts of plain Python values."""
+        columns = self.columns(which)
+        names = list(columns)
+        return [
+            dict(zip(names, row))
+            for row in zip(*(columns[name].tolist() for name in names))
+        ]
+
+    def to_glue_data(self, which: str = "both", label: Optional[str] = None) -> Data:
+        return Data(label=label or "", **self.columns(which))
+
+
+_SEED_TABLES: dict[Path, SeedTable] = {}
+_SEED_TABLES_LOCK = threading.Lock()
+
+
+def get_seed_table(path: Union[str, Path] = SEED_DATA_PATH) -> SeedTable:
+    path = Path(path)
+    table = _SEED_TABLES.get(path)
+    if table is None:
+        with _SEED_TABLES_LOCK:
+            table = _SEED_TABLES.get(path)
+            if table is None:
+                table = SeedTable.from_csv(path)
+                _SEED_TABLES[path] = table
+    return table
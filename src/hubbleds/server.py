@@ -1,18 +1,45 @@
 from starlette.applications import Starlette
 from starlette.requests import Request
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, PlainTextResponse
 from starlette.routing import Mount, Route
 from solara.server import settings
 
 import solara.server.starlette
 
+from hubbleds.api_metrics import API_METRICS
+from hubbleds.profiling import PROFILER, PROFILING_ENABLED
+from hubbleds.render_counts import render_counts_to_prometheus
+
 
 def root(request: Request):
     return JSONResponse({"Error Message": "Go back whence ye came."})
 
 
+def profile(request: Request):
+    if not PROFILING_ENABLED:
+        return JSONResponse(
+            {"Error Message": "Profiling is off, set HUBBLEDS_PROFILE=1 to turn it on."},
+            status_code=404,
+        )
+
+    # Timings per route, then per kind (render, glue_setup, api, callback)
+    snapshot = PROFILER.snapshot()
+    if request.query_params.get("reset"):
+        PROFILER.reset()
+    return JSONResponse(snapshot)
+
+
+def metrics(request: Request):
+    return PlainTextResponse(
+        API_METRICS.to_prometheus() + render_counts_to_prometheus(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
 routes = [
     Route("/", endpoint=root),
+    Route("/profile", endpoint=profile),
+    Route("/metrics", endpoint=metrics),
     # Mount("/hubbles-law/", solara.server.starlette.app),
     Mount("/hubbles-law/", routes=solara.server.starlette.routes),
 ]
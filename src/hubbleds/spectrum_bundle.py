@@ -0,0 +1,255 @@
+"""
+Packs the spectra of the whole galaxy catalog into a single file that the
+app memory-maps, so that opening a spectrum doesn't need a network request.
+
+Build a bundle with
+
+    hubbleds-build-spectra --story-id hubbles_law spectra.bundle
+
+and point the app at it with the `HUBBLEDS_SPECTRUM_BUNDLE` environment
+variable.
+
+The file starts with an 8 byte magic string and the little-endian uint64
+length of a JSON header. The header maps each `"{type}/{name}"` key to the
+offsets (in float32 elements, from the start of the data section) and
+lengths of that galaxy's full resolution wave, flux and ivar arrays and of
+its decimated display resolution wave and flux arrays. The data section
+starts at the next 64 byte boundary after the header and holds the arrays
+back to back as little-endian float32.
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+from cosmicds.logger import setup_logger
+
+from hubbleds.decimation import DISPLAY_POINTS, minmax_decimate
+from hubbleds.spectrum_cache import SPECTRUM_COLUMNS, SpectrumArrays
+from hubbleds.state import GalaxyData
+
+logger = setup_logger("SPECTRUM BUNDLE")
+
+BUNDLE_MAGIC = b"HDSSPEC1"
+BUNDLE_VERSION = 1
+BUNDLE_DTYPE = np.dtype("<f4")
+DISPLAY_COLUMNS = ("wave", "flux")
+
+_ALIGNMENT = 64
+_HEADER_PREFIX = struct.Struct("<8sQ")
+
+
+def bundle_key(galaxy_type: str, name: str) -> str:
+    return f"{galaxy_type}/{name}"
+
+
+class SpectrumBundle:
+    """
+    Read-only view of a spectrum bundle. The arrays it returns are views into
+    a memory map of the file, so they are shared by every session in the
+    process and are only paged in when read.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            magic, header_length = _HEADER_PREFIX.unpack(f.read(_HEADER_PREFIX.size))
+            if magic != BUNDLE_MAGIC:
+                raise ValueError(f"{self.path} is not a spectrum bundle")
+            header = json.loads(f.read(header_length))
+
+        if header["version"] != BUNDLE_VERSION:
+            raise ValueError(
+                f"{self.path} has bundle version {header['version']}, expected {BUNDLE_VERSION}"
+            )
+
+        self.story_id: str = header["story_id"]
+        self.display_points: int = header["display_points"]
+        self._index: dict[str, dict] = header["spectra"]
+        self._data = np.memmap(
+            self.path, dtype=BUNDLE_DTYPE, mode="r", offset=header["data_offset"]
+        )
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def _arrays(self, entry: dict, columns: Iterable[str]) -> SpectrumArrays:
+        return {
+            column: self._data[offset:offset + length]
+            for column, (offset, length) in zip(columns, entry)
+        }
+
+    def get(self, galaxy_type: str, name: str) -> Optional[SpectrumArrays]:
+        entry = self._index.get(bundle_key(galaxy_type, name))
+        if entry is None:
+            return None
+        return self._arrays(entry["full"], SPECTRUM_COLUMNS)
+
+    def get_display(self, galaxy_type: str, name: str) -> Optional[SpectrumArrays]:
+        entry = self._index.get(bundle_key(galaxy_type, name))
+        if entry is None:
+            return None
+        return self._arrays(entry["display"], DISPLAY_COLUMNS)
+
+
+def build_spectrum_bundle(
+    path: Path,
+    story_id: str,
+    galaxies: Iterable[GalaxyData],
+    fetch: Callable[[GalaxyData], Optional[SpectrumArrays]],
+    display_points: int = DISPLAY_POINTS,
+) -> int:
+    """
+    Fetches the spectrum of each galaxy with `fetch` and writes them all to a
+    bundle at `path`. Galaxies whose spectrum can't be fetched are skipped.
+    Returns the number of spectra written.
+    """
+    path = Path(path)
+    index = {}
+    chunks = []
+    offset = 0
+
+    def _append(array: np.ndarray) -> list[int]:
+        nonlocal offset
+        array = np.ascontiguousarray(array, dtype=BUNDLE_DTYPE)
+        chunks.append(array)
+        location = [offset, len(array)]
+        offset += len(array)
+        return location
+
+    for galaxy in galaxies:
+        key = bundle_key(galaxy.type, galaxy.name)
+        if key in index:
+            continue
+
+        try:
+            arrays = fetch(galaxy)
+        except Exception:
+            logger.exception("Failed to fetch the spectrum of galaxy `%s`.", galaxy.name)
+            arrays = None
+        if arrays is None:
+            logger.warning("Leaving galaxy `%s` out of the bundle.", galaxy.name)
+            continue
+
+        display = minmax_decimate(arrays["wave"], arrays["flux"], display_points)
+        index[key] = {
+            "id": galaxy.id,
+            "full": [_append(arrays[column]) for column in SPECTRUM_COLUMNS],
+            "display": [_append(array) for array in display],
+        }
+
+    header = {
+        "version": BUNDLE_VERSION,
+        "story_id": story_id,
+        "display_points": display_points,
+        "spectra": index,
+    }
+
+    # The data offset is part of the header, so grow it until it's stable
+    data_offset = 0
+    while True:
+        header["data_offset"] = data_offset
+        header_bytes = json.dumps(header, separators=(",", ":")).encode()
+        header_end = _HEADER_PREFIX.size + len(header_bytes)
+        needed = -(-header_end // _ALIGNMENT) * _ALIGNMENT
+        if needed == data_offset:
+            break
+        data_offset = needed
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER_PREFIX.pack(BUNDLE_MAGIC, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (data_offset - header_end))
+        for chunk in chunks:
+            f.write(chunk.tobytes())
+    os.replace(tmp_path, path)
+
+    logger.info("Wrote %d spectra to bundle %s.", len(index), path)
+    return len(index)
+
+
+_BUNDLE: Optional[SpectrumBundle] = None
+_BUNDLE_LOCK = threading.Lock()
+_BUNDLE_LOADED = False
+
+
+def get_spectrum_bundle() -> Optional[SpectrumBundle]:
+    """
+    Returns the bundle named by the `HUBBLEDS_SPECTRUM_BUNDLE` environment
+    variable, opening it on first use, or `None` if there isn't one.
+    """
+    global _BUNDLE, _BUNDLE_LOADED
+    if _BUNDLE_LOADED:
+        return _BUNDLE
+
+    with _BUNDLE_LOCK:
+        if not _BUNDLE_LOADED:
+            path = os.getenv("HUBBLEDS_SPECTRUM_BUNDLE")
+            if path:
+                try:
+                    _BUNDLE = SpectrumBundle(Path(path))
+                    logger.info("Serving %d spectra from bundle %s.", len(_BUNDLE), path)
+                except (OSError, ValueError):
+                    logger.exception("Could not open spectrum bundle %s.", path)
+            _BUNDLE_LOADED = True
+
+    return _BUNDLE
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(
+        description="Pack the spectra of the galaxy catalog into a single bundle file."
+    )
+    parser.add_argument("output", type=Path, help="path of the bundle to write")
+    parser.add_argument(
+        "--story-id", default="hubbles_law", help="story whose galaxies to bundle"
+    )
+    parser.add_argument(
+        "--types", default="Sp", help="galaxy types to bundle, as accepted by the API"
+    )
+    parser.add_argument(
+        "--display-points",
+        type=int,
+        default=DISPLAY_POINTS,
+        help="number of points in the display resolution copy of each spectrum",
+    )
+    return parser.parse_args(args)
+
+
+def main(args):
+    args = parse_args(args)
+
+    # Imported here so that reading a bundle doesn't depend on the API client
+    from hubbleds.remote import LOCAL_API
+
+    galaxies = LOCAL_API._fetch_galaxies(args.story_id, args.types)
+    logger.info("Bundling spectra of %d galaxies.", len(galaxies))
+    count = build_spectrum_bundle(
+        args.output,
+        args.story_id,
+        galaxies,
+        lambda galaxy: LOCAL_API._fetch_spectrum_arrays(args.story_id, galaxy),
+        display_points=args.display_points,
+    )
+    if count < len(galaxies):
+        logger.warning("%d galaxies have no spectrum in the bundle.", len(galaxies) - count)
+
+
+def run():
+    main(sys.argv[1:])
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,195 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Hashable, Optional
+
+import numpy as np
+
+from cosmicds.logger import setup_logger
+
+logger = setup_logger("SPECTRUM CACHE")
+
+SPECTRUM_COLUMNS = ("wave", "flux", "ivar")
+
+# Bump this when the on-disk layout changes so that old files are ignored
+_FORMAT_VERSION = 1
+
+SPECTRUM_CACHE_DIR = Path(
+    os.getenv(
+        "HUBBLEDS_SPECTRUM_CACHE_DIR",
+        Path(tempfile.gettempdir()) / "hubbleds-spectra",
+    )
+)
+SPECTRUM_CACHE_BYTES = int(os.getenv("HUBBLEDS_SPECTRUM_CACHE_BYTES", 64 * 2**20))
+
+SpectrumArrays = dict[str, np.ndarray]
+
+
+def _native_arrays(arrays: SpectrumArrays) -> SpectrumArrays:
+    # Decoded FITS columns are big-endian views into the whole HDU buffer.
+    #  Cache native-endian copies instead, so the buffer can be freed and
+    #  the cache's byte count is what it actually holds.
+    return {
+        column: np.ascontiguousarray(arrays[column], dtype=np.float64)
+        for column in SPECTRUM_COLUMNS
+    }
+
+
+class _Load:
+    __slots__ = ("lock", "waiting")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waiting = 0
+
+
+class SpectrumCache:
+    """
+    Two-tier cache of decoded spectra.
+
+    The first tier is an in-memory LRU of native-endian float64 arrays that
+    evicts the least recently used spectra once they exceed `max_bytes`. The second tier is a
+    directory of `.npy` files, one per spectrum, each holding a `(3, N)`
+    float64 array of the wave, flux and ivar columns. The file name is a hash
+    of the spectrum's key, and files are memory-mapped when read back.
+
+    Pass `directory=None` to keep the cache in memory only.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Path] = SPECTRUM_CACHE_DIR,
+        max_bytes: int = SPECTRUM_CACHE_BYTES,
+    ):
+        self.directory = Path(directory) if directory is not None else None
+        self.max_bytes = max_bytes
+        self._memory: OrderedDict[Hashable, SpectrumArrays] = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.RLock()
+        # Loads in progress, so that concurrent misses share one
+        self._loads: dict[Hashable, _Load] = {}
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _nbytes(arrays: SpectrumArrays) -> int:
+        return sum(a.nbytes for a in arrays.values())
+
+    def _path(self, key: Hashable) -> Optional[Path]:
+        if self.directory is None:
+            return None
+        digest = hashlib.sha256(f"{_FORMAT_VERSION}:{key!r}".encode()).hexdigest()
+        return self.directory / f"{digest}.npy"
+
+    def _remember(self, key: Hashable, arrays: SpectrumArrays):
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= self._nbytes(old)
+
+            self._memory[key] = arrays
+            self._memory_bytes += self._nbytes(arrays)
+
+            while self._memory_bytes > self.max_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= self._nbytes(evicted)
+
+    def _read_disk(self, key: Hashable) -> Optional[SpectrumArrays]:
+        path = self._path(key)
+        if path is None or not path.exists():
+            return None
+        try:
+            stacked = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            logger.warning("Ignoring unreadable cached spectrum at %s.", path)
+            return None
+        return dict(zip(SPECTRUM_COLUMNS, stacked))
+
+    def _write_disk(self, key: Hashable, arrays: SpectrumArrays):
+        path = self._path(key)
+        if path is None:
+            return
+        stacked = np.vstack([np.asarray(arrays[c], dtype=np.float64) for c in SPECTRUM_COLUMNS])
+        tmp_name = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so readers never see a partial file
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, stacked)
+            os.replace(tmp_name, path)
+        except OSError:
+            logger.warning("Failed to write spectrum cache file %s.", path)
+            if tmp_name is not None:
+                try:
+                    os.unlink(tmp_name)
+                except OSError:
+                    pass
+
+    def get(self, key: Hashable) -> Optional[SpectrumArrays]:
+        with self._lock:
+            arrays = self._memory.get(key)
+            if arrays is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return arrays
+
+        arrays = self._read_disk(key)
+        if arrays is not None:
+            self.disk_hits += 1
+            self._remember(key, arrays)
+        return arrays
+
+    def put(self, key: Hashable, arrays: SpectrumArrays):
+        arrays = _native_arrays(arrays)
+        self._write_disk(key, arrays)
+        self._remember(key, arrays)
+        return arrays
+
+    def get_or_load(
+        self, key: Hashable, load: Callable[[], Optional[SpectrumArrays]]
+    ) -> Optional[SpectrumArrays]:
+        """
+        Returns the cached spectrum for `key`, calling `load` to produce it if
+        neither tier has it. Concurrent requests for the same key share one
+        call to `load`. `None` results are not cached.
+        """
+        arrays = self.get(key)
+        if arrays is not None:
+            return arrays
+
+        with self._lock:
+            pending = self._loads.get(key)
+            if pending is None:
+                pending = self._loads[key] = _Load()
+            pending.waiting += 1
+
+        try:
+            with pending.lock:
+                arrays = self.get(key)
+                if arrays is not None:
+                    return arrays
+
+                self.misses += 1
+                arrays = load()
+                if arrays is not None:
+                    arrays = self.put(key, arrays)
+                return arrays
+        finally:
+            with self._lock:
+                pending.waiting -= 1
+                if not pending.waiting:
+                    del self._loads[key]
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+
+SPECTRUM_CACHE = SpectrumCache()
@@ -1,6 +1,8 @@
 from solara.toestand import Ref, Reactive
 from glue_jupyter import JupyterApplication
 from glue.core.data import Data
+import numpy as np
+from numbers import Real
 from .state import GLOBAL_STATE, LOCAL_STATE
 from .data_management import (
     EXAMPLE_GALAXY_SEED_DATA,
@@ -74,34 +76,101 @@ def _glue_setup() -> JupyterApplication:
 
 
 
+# Key in the `_first` seed data's metadata holding the index of the row
+#  reserved for the current student's measurement
+SEED_STUDENT_SLOT = "student_slot"
+
+
+def _seed_row_for_examples(data: Data, example_data) -> dict | None:
+    # The student's row only shows once they have both example measurements
+    if len(example_data) < 2:
+        return None
+
+    numbers = ("first", "second")
+    measurement = \
+        sorted(example_data,
+                key=lambda v: numbers.index(v.measurement_number) if v.measurement_number in numbers else len(numbers)
+        )[1]
+
+    row = {}
+    for component in data.main_components:
+        value = getattr(measurement, component.label, None)
+        if value is None:
+            value = float('nan')
+        row[component.label] = value
+    return row
+
+
+def _patch_seed_student_slot(data: Data, row: dict | None) -> bool:
+    """
+    Writes `row` into the student's reserved row of `data`, updating only
+    the components that changed. Returns False if that isn't possible and
+    the data needs rebuilding.
+    """
+    if SEED_STUDENT_SLOT not in data.meta:
+        return False
+
+    # The slot is None once the data has been rebuilt without a row for the
+    #  student, which is all there is to do while they have no row
+    slot = data.meta[SEED_STUDENT_SLOT]
+    if row is None or slot is None:
+        return row is None and slot is None
+    if slot >= data.size:
+        return False
+
+    changed = {}
+    for component_id in data.main_components:
+        component = data.get_component(component_id)
+        value = row[component_id.label]
+        current = data[component_id][slot]
+        if current == value or (_is_nan(current) and _is_nan(value)):
+            continue
+        if not component.numeric or not isinstance(value, Real):
+            return False
+        # Integer columns can't hold NaN or fractions
+        if component.data.dtype.kind != "f" and not float(value).is_integer():
+            return False
+        # Glue marks component arrays read-only, so the row is patched into
+        #  a copy
+        values = component.data.copy()
+        values[slot] = value
+        changed[component_id] = values
+
+    if changed:
+        # One NumericalDataChangedMessage for all of the changed components
+        data.update_components(changed)
+    return True
+
+
+def _is_nan(value) -> bool:
+    return isinstance(value, float) and np.isnan(value)
+
+
 def _update_seed_data_with_examples(gjapp, example_data):
     label = EXAMPLE_GALAXY_SEED_DATA + "_first"
     if label not in gjapp.data_collection:
         return 
 
-    student = Ref(GLOBAL_STATE.fields.student)
     data = gjapp.data_collection[label]
+    row = _seed_row_for_examples(data, example_data)
+    if _patch_seed_student_slot(data, row):
+        return
+
+    # Drop the student's own seed rows, along with any row reserved for
+    #  them before (which has no student id until it is filled in), and
+    #  reserve the last row for their example measurement, which later
+    #  updates patch in place
+    student = Ref(GLOBAL_STATE.fields.student)
     keep = data[STUDENT_ID_COMPONENT] != student.value.id
-    update = {
-        c.label: list(data[c][keep])
-        for c in data.main_components
-    }
-
-    examples_count = len(example_data)
-    if examples_count == 1:
-        measurement = example_data[0]
-    elif examples_count >= 2:
-        numbers = ("first", "second")
-        measurement = \
-            sorted(example_data,
-                    key=lambda v: numbers.index(v.measurement_number) if v.measurement_number in numbers else len(numbers)
-            )[1]
-
-        for component in data.main_components:
-            value = getattr(measurement, component.label, None)
-            if value is None:
-                value = float('nan')
-            update[component.label].append(value)
+    slot = data.meta.get(SEED_STUDENT_SLOT)
+    if slot is not None and slot < data.size:
+        keep[slot] = False
+
+    update = {c.label: list(data[c][keep]) for c in data.main_components}
+    if row is not None:
+        for label, values in update.items():
+            values.append(row[label])
 
     new_data = Data(label=data.label, **update)
     data.update_values_from_data(new_data)
+    data.meta[SEED_STUDENT_SLOT] = data.size - 1 if row is not None else None
@@ -0,0 +1,196 @@
+"""
+An in-memory stand-in for the parts of the CosmicDS API that `LocalAPI`
+writes to. It quacks like a `requests.Session`, so it can be swapped in with
+`LOCAL_API.use_session(StandInServer())` to exercise the persistence code
+without a database.
+"""
+
+import json
+import re
+from collections import defaultdict
+from typing import Any, Callable, Optional
+from urllib.parse import urlsplit
+
+from requests import HTTPError
+
+
+class StandInResponse:
+    def __init__(self, status_code: int = 200, body: Any = None):
+        self.status_code = status_code
+        self._body = body if body is not None else {}
+        self.content = json.dumps(self._body).encode("utf-8")
+        self.text = self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPError(f"{self.status_code} Error: {self.text}", response=self)
+
+    def close(self):
+        pass
+
+    def iter_content(self, chunk_size: int = 1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+
+class StandInServer:
+    """
+    Stores measurements and states in dictionaries and records every request
+    it receives in `requests` as `(method, path)` tuples.
+
+    Set `bulk_enabled` to `False` to emulate a server that predates the bulk
+    measurement endpoints, or `sample_bulk_enabled` to `False` for one that
+    only lacks the bulk sample measurement endpoint. The missing endpoints
+    answer with `missing_status`.
+    """
+
+    def __init__(
+        self,
+        bulk_enabled: bool = True,
+        sample_bulk_enabled: Optional[bool] = None,
+        missing_status: int = 404,
+    ):
+        self.bulk_enabled = bulk_enabled
+        self.sample_bulk_enabled = bulk_enabled if sample_bulk_enabled is None else sample_bulk_enabled
+        self.missing_status = missing_status
+        self.requests: list[tuple[str, str]] = []
+        # (story_id, student_id) -> {(galaxy_id, measurement_number): measurement}
+        self.measurements: dict[tuple[str, int], dict] = defaultdict(dict)
+        self.sample_measurements: dict[tuple[str, int], dict] = defaultdict(dict)
+        self.stage_states: dict[tuple[int, str, str], dict] = {}
+        self.story_states: dict[tuple[int, str], dict] = {}
+        # story_id -> the body of the all-data response
+        self.all_data: dict[str, dict] = {}
+        # (story_id, class_id) -> the number of students who completed their measurements
+        self.students_completed: dict[tuple[str, int], int] = {}
+
+        self._routes: list[tuple[str, str, Callable[..., StandInResponse]]] = [
+            ("PUT", r"/(?P<story>[^/]+)/submit-measurement/$", self._put_measurement),
+            ("PUT", r"/(?P<story>[^/]+)/submit-measurements/$", self._put_measurements),
+            ("PUT", r"/(?P<story>[^/]+)/sample-measurement/$", self._put_sample_measurement),
+            ("PUT", r"/(?P<story>[^/]+)/submit-sample-measurements/$", self._put_sample_measurements),
+            ("GET", r"/(?P<story>[^/]+)/measurements/(?P<student>\d+)$", self._get_measurements),
+            ("DELETE", r"/(?P<story>[^/]+)/measurements/(?P<student>\d+)/(?P<galaxy>\d+)$", self._delete_measurement),
+            ("GET", r"/(?P<story>[^/]+)/sample-measurements/(?P<student>\d+)$", self._get_sample_measurements),
+            ("PUT", r"/stage-state/(?P<student>\d+)/(?P<story>[^/]+)/(?P<stage>[^/]+)$", self._put_stage_state),
+            ("GET", r"/stage-state/(?P<student>\d+)/(?P<story>[^/]+)/(?P<stage>[^/]+)$", self._get_stage_state),
+            ("PUT", r"/story-state/(?P<student>\d+)/(?P<story>[^/]+)$", self._put_story_state),
+            ("GET", r"/story-state/(?P<student>\d+)/(?P<story>[^/]+)$", self._get_story_state),
+            ("GET", r"/(?P<story>[^/]+)/all-data$", self._get_all_data),
+            ("GET", r"/(?P<story>[^/]+)/class-measurements/students-completed/(?P<student>\d+)/(?P<class_id>\d+)$",
+             self._get_students_completed),
+        ]
+
+    def request_count(self, method: Optional[str] = None) -> int:
+        return sum(1 for m, _ in self.requests if method is None or m == method)
+
+    def _dispatch(self, method: str, url: str, json_body: Any = None, data: Any = None):
+        path = urlsplit(url).path
+        self.requests.append((method, path))
+
+        if json_body is None and data is not None:
+            json_body = json.loads(data)
+
+        for route_method, pattern, handler in self._routes:
+            if route_method != method:
+                continue
+            match = re.search(pattern, path)
+            if match is not None:
+                return handler(body=json_body, **match.groupdict())
+
+        return StandInResponse(404, {"error": f"No route for {method} {path}"})
+
+    def get(self, url: str, **kwargs):
+        return self._dispatch("GET", url)
+
+    def put(self, url: str, json: Any = None, data: Any = None, **kwargs):
+        return self._dispatch("PUT", url, json_body=json, data=data)
+
+    def delete(self, url: str, **kwargs):
+        return self._dispatch("DELETE", url)
+
+    @staticmethod
+    def _store(store: dict, story: str, measurement: dict) -> dict:
+        if "student_id" not in measurement:
+            return {"status": 400, "error": "Missing student_id"}
+        key = (measurement.get("galaxy_id"), measurement.get("measurement_number"))
+        store[(story, int(measurement["student_id"]))][key] = measurement
+        return {
+            "galaxy_id": key[0],
+            "measurement_number": key[1],
+            "status": 200,
+        }
+
+    def _put_one(self, store: dict, story: str, body: dict):
+        result = self._store(store, story, body)
+        return StandInResponse(result["status"], result)
+
+    def _put_many(self, store: dict, story: str, body: dict, enabled: bool):
+        if not enabled:
+            return StandInResponse(self.missing_status, {"error": "Not found"})
+        results = [self._store(store, story, m) for m in body.get("measurements", [])]
+        return StandInResponse(200, {"results": results})
+
+    def _put_measurement(self, story, body):
+        return self._put_one(self.measurements, story, body)
+
+    def _put_measurements(self, story, body):
+        return self._put_many(self.measurements, story, body, self.bulk_enabled)
+
+    def _put_sample_measurement(self, story, body):
+        return self._put_one(self.sample_measurements, story, body)
+
+    def _put_sample_measurements(self, story, body):
+        return self._put_many(self.sample_measurements, story, body, self.sample_bulk_enabled)
+
+    def _get_measurements(self, story, student, body):
+        stored = self.measurements.get((story, int(student)), {})
+        return StandInResponse(200, {"measurements": list(stored.values())})
+
+    def _delete_measurement(self, story, student, galaxy, body):
+        stored = self.measurements.get((story, int(student)), {})
+        keys = [key for key in stored if key[0] == int(galaxy)]
+        if not keys:
+            return StandInResponse(404, {"error": "No such measurement"})
+        for key in keys:
+            del stored[key]
+        return StandInResponse(200, {"success": True})
+
+    def _get_sample_measurements(self, story, student, body):
+        stored = self.sample_measurements.get((story, int(student)), {})
+        return StandInResponse(200, {"measurements": list(stored.values())})
+
+    def _put_stage_state(self, student, story, stage, body):
+        self.stage_states[(int(student), story, stage)] = body
+        return StandInResponse(200, {"success": True})
+
+    def _get_stage_state(self, student, story, stage, body):
+        state = self.stage_states.get((int(student), story, stage))
+        if state is None:
+            return StandInResponse(404, {"error": "No stage state"})
+        return StandInResponse(200, {"state": state})
+
+    def _put_story_state(self, student, story, body):
+        self.story_states[(int(student), story)] = body
+        return StandInResponse(200, {"success": True})
+
+    def _get_story_state(self, student, story, body):
+        state = self.story_states.get((int(student), story))
+        if state is None:
+            return StandInResponse(404, {"error": "No story state"})
+        return StandInResponse(200, {"state": state})
+
+    def _get_all_data(self, story, body):
+        all_data = self.all_data.get(story)
+        if all_data is None:
+            return StandInResponse(404, {"error": "No such story"})
+        return StandInResponse(200, all_data)
+
+    def _get_students_completed(self, story, student, class_id, body):
+        count = self.students_completed.get((story, int(class_id)))
+        if count is None:
+            return StandInResponse(404, {"error": "No such class"})
+        return StandInResponse(200, {"students_completed_measurements": count})
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, computed_field, field_validator, Field
+from pydantic import BaseModel, ConfigDict, computed_field, field_validator, Field
 from solara import Reactive
 from cosmicds.state import BaseState, GLOBAL_STATE, BaseLocalState
 from hubbleds.base_component_state import BaseComponentState
@@ -6,15 +6,17 @@ from typing import Optional
 import solara
 import datetime
 from functools import cached_property
-from astropy.table import Table
+import numpy as np
+from pandas import DataFrame
 from pydantic import Field
 
 from solara.toestand import Ref
 
 
-from typing import Callable, Tuple
+from typing import Any, Callable, ClassVar, Hashable, Iterable, Tuple
 
 from .data_management import ELEMENT_REST
+from .columnar import ColumnarTable
 
 from cosmicds.logger import setup_logger
 
@@ -22,10 +24,41 @@ logger = setup_logger("HUBBLEDS-STATE")
 
 
 class SpectrumData(BaseModel):
+    """
+    A spectrum held as NumPy arrays. Native-endian float arrays (e.g. the
+    memory-mapped arrays from the spectrum cache) are used without copying;
+    anything else is converted to native-endian floats once.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     name: str
-    wave: list[float]
-    flux: list[float]
-    ivar: list[float]
+    wave: np.ndarray
+    flux: np.ndarray
+    ivar: np.ndarray
+
+    @field_validator("wave", "flux", "ivar", mode="before")
+    @classmethod
+    def _as_float_array(cls, value) -> np.ndarray:
+        array = np.asarray(value)
+        if array.dtype.kind != "f":
+            return array.astype(np.float64)
+        if not array.dtype.isnative:
+            return array.astype(array.dtype.newbyteorder("="))
+        return array
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, SpectrumData):
+            return NotImplemented
+        return self.name == other.name and all(
+            np.array_equal(getattr(self, c), getattr(other, c), equal_nan=True)
+            for c in ("wave", "flux", "ivar")
+        )
+
+    def __len__(self) -> int:
+        return len(self.wave)
+
+    def as_data_frame(self) -> DataFrame:
+        return DataFrame({"wave": self.wave, "flux": self.flux}, copy=False)
 
 
 class GalaxyData(BaseModel):
@@ -37,19 +70,28 @@ class GalaxyData(BaseModel):
     type: str
     element: str
 
-    @cached_property
-    def spectrum(self):
+    # Galaxies are shared by every session in the worker (see
+    #  `hubbleds.galaxy_catalog`), so spectra aren't kept on them. The
+    #  spectrum cache and bundle hold on to the arrays instead.
+    @property
+    def spectrum(self) -> SpectrumData | None:
         from hubbleds.remote import LOCAL_API
 
         return LOCAL_API.load_spectrum_data(self, LOCAL_STATE)
 
-    @cached_property
-    def spectrum_as_data_frame(self):
+    @property
+    def spectrum_as_data_frame(self) -> DataFrame | None:
+        spectrum = self.spectrum
+        return None if spectrum is None else spectrum.as_data_frame()
+
+    def display_spectrum(self, display_points: int) -> tuple[np.ndarray, np.ndarray] | None:
+        """
+        The precomputed display resolution copy of the spectrum, if the
+        spectrum bundle has one of `display_points` points.
+        """
         from hubbleds.remote import LOCAL_API
 
-        spec_data = LOCAL_API.load_spectrum_data(self, LOCAL_STATE)
-
-        return Table({"wave": spec_data.wave, "flux": spec_data.flux}).to_pandas()
+        return LOCAL_API.load_display_spectrum(self, LOCAL_STATE, display_points)
 
     @property
     def rest_wave_value(self) -> float:
@@ -119,6 +161,44 @@ class ClassSummary(BaseSummary):
     class_id: int
 
 
+class StudentMeasurementTable(ColumnarTable, model=StudentMeasurement):
+    pass
+
+
+class StudentSummaryTable(ColumnarTable, model=StudentSummary):
+    pass
+
+
+class ClassSummaryTable(ColumnarTable, model=ClassSummary):
+    pass
+
+
+
+def _galaxy_key(measurement: StudentMeasurement) -> int:
+    return measurement.galaxy_id
+
+
+def _example_galaxy_key(measurement: StudentMeasurement) -> tuple[int, str | None]:
+    return measurement.galaxy_id, measurement.measurement_number
+
+
+class _ListLookup:
+    """
+    Positions of the items of a list by key, keeping the first position of
+    each key. Valid for as long as the list isn't modified; `is_for` catches
+    the list being replaced or resized.
+    """
+
+    def __init__(self, items: list, key: Callable):
+        self.items = items
+        self.length = len(items)
+        self.positions: dict[Hashable, int] = {}
+        for i, item in enumerate(items):
+            self.positions.setdefault(key(item), i)
+
+    def is_for(self, items: list) -> bool:
+        return items is self.items and len(items) == self.length
+
 
 class LocalState(BaseLocalState):
     title: str = "Hubble's Law"
@@ -126,9 +206,9 @@ class LocalState(BaseLocalState):
     measurements: list[StudentMeasurement] = []
     example_measurements: list[StudentMeasurement] = []
     class_measurements: list[StudentMeasurement] = []
-    all_measurements: list[StudentMeasurement] = []
-    student_summaries: list[StudentSummary] = []
-    class_summaries: list[ClassSummary] = []
+    all_measurements: StudentMeasurementTable = Field(default_factory=StudentMeasurementTable)
+    student_summaries: StudentSummaryTable = Field(default_factory=StudentSummaryTable)
+    class_summaries: ClassSummaryTable = Field(default_factory=ClassSummaryTable)
     measurements_loaded: bool = False
     calculations: dict = {}
     validation_failure_counts: dict = {}
@@ -146,52 +226,69 @@ class LocalState(BaseLocalState):
     last_route: Optional[str] = None
     route_restored: bool = Field(False, exclude=True)
 
-    @cached_property
+    # Fields that aren't part of the story state document
+    STORY_STATE_EXCLUDE: ClassVar[frozenset[str]] = frozenset({
+        "example_measurements",
+        "measurements",
+        "measurements_loaded",
+        "class_measurements",
+        "all_measurements",
+        "student_summaries",
+        "class_summaries",
+    })
+
+    @property
     def galaxies(self) -> dict[int, GalaxyData]:
         from hubbleds.remote import LOCAL_API
 
-        gal_data = LOCAL_API.get_galaxies(LOCAL_STATE)
-        return { galaxy.id: galaxy for galaxy in gal_data }
+        return LOCAL_API.get_galaxy_catalog(LOCAL_STATE).by_id
 
     def as_dict(self):
-        return self.model_dump(exclude={
-            "example_measurements",
-            "measurements",
-            "measurements_loaded",
-            "class_measurements",
-            "all_measurements",
-            "student_summaries",
-            "class_summaries",
-        })
+        return self.model_dump(exclude=self.STORY_STATE_EXCLUDE)
+
+    @classmethod
+    def story_state_fields(cls) -> tuple[str, ...]:
+        """The names of the fields that `as_dict` includes."""
+        return tuple(
+            name for name, info in cls.model_fields.items()
+            if name not in cls.STORY_STATE_EXCLUDE and not info.exclude
+        )
+
+    @cached_property
+    def _lookups(self) -> dict[str, "_ListLookup"]:
+        # Shared with copies of this state, which is fine since each
+        #  lookup is only used for the list it was built from
+        return {}
+
+    def _lookup(self, field: str, key: Callable[[StudentMeasurement], Hashable], value: Hashable) -> int | None:
+        items = getattr(self, field)
+        lookup = self._lookups.get(field)
+        if lookup is not None and lookup.is_for(items):
+            index = lookup.positions.get(value)
+            if index is not None and key(items[index]) == value:
+                return index
+
+        # A miss, or a stale hit, may be down to an item being replaced
+        #  without replacing the list (the stage 3 pages do this), so the
+        #  lookup is rebuilt before giving up
+        lookup = _ListLookup(items, key)
+        self._lookups[field] = lookup
+        return lookup.positions.get(value)
 
     def get_measurement(self, galaxy_id: int) -> StudentMeasurement | None:
-        return next((x for x in self.measurements if x.galaxy_id == galaxy_id), None)
+        index = self.get_measurement_index(galaxy_id)
+        return None if index is None else self.measurements[index]
 
     def get_example_measurement(self, galaxy_id: int, measurement_number = 'first') -> StudentMeasurement | None:
-        def check_example_galaxy(x: StudentMeasurement):
-            return x.galaxy_id == galaxy_id and x.measurement_number == measurement_number
-        
-        return next(
-            (x for x in self.example_measurements if check_example_galaxy(x)), None
-        )
+        index = self.get_example_measurement_index(galaxy_id, measurement_number)
+        return None if index is None else self.example_measurements[index]
 
     def get_measurement_index(self, galaxy_id: int) -> int | None:
-        return next(
-            (i for i, x in enumerate(self.measurements) if x.galaxy_id == galaxy_id),
-            None,
-        )
+        return self._lookup("measurements", _galaxy_key, galaxy_id)
 
     def get_example_measurement_index(self, galaxy_id: int, measurement_number = 'first') -> int | None:
-        def check_example_galaxy(x: StudentMeasurement):
-            return x.galaxy_id == galaxy_id and x.measurement_number == measurement_number
-        
-        return next(
-            (
-                i
-                for i, x in enumerate(self.example_measurements)
-                if check_example_galaxy(x)
-            ),
-            None,
+        return self._lookup(
+            "example_measurements", _example_galaxy_key, (galaxy_id, measurement_number)
         )
 
     def question_completed(self, tag: str) -> bool:
@@ -205,47 +302,176 @@ class LocalState(BaseLocalState):
 
 LOCAL_STATE = solara.reactive(LocalState())
 
+
+class LocalStateSlice:
+    """
+    A group of `LocalState` fields that can be read on its own. Reading a
+    field of the slice during render (`MEASUREMENT_STATE.measurements`)
+    subscribes only to that field, so the component doesn't re-render when
+    unrelated parts of the local state change, as it would after reading
+    `LOCAL_STATE.value`. The fields still live in `LOCAL_STATE`, which stays
+    the one state that is loaded and persisted.
+    """
+
+    def __init__(self, local_state: Reactive[LocalState], fields: Iterable[str]):
+        self._local_state = local_state
+        self._refs = {name: Ref(getattr(local_state.fields, name)) for name in fields}
+
+    @property
+    def fields(self) -> tuple[str, ...]:
+        return tuple(self._refs)
+
+    def ref(self, name: str) -> Ref:
+        return self._refs[name]
+
+    def __getattr__(self, name: str):
+        refs = self.__dict__.get("_refs", {})
+        if name not in refs:
+            raise AttributeError(f"`{name}` is not in this slice of the local state")
+        return refs[name].value
+
+    @property
+    def value(self) -> dict[str, Any]:
+        return {name: ref.value for name, ref in self._refs.items()}
+
+    @property
+    def local_state(self) -> LocalState:
+        """
+        The whole local state, for its helper methods, subscribing only to
+        the fields of this slice.
+        """
+        for ref in self._refs.values():
+            ref.value
+        return self._local_state.peek()
+
+
+MEASUREMENT_STATE = LocalStateSlice(
+    LOCAL_STATE, ("measurements", "example_measurements", "measurements_loaded")
+)
+
+RESPONSE_STATE = LocalStateSlice(
+    LOCAL_STATE, ("mc_scoring", "free_responses", "piggybank_total")
+)
+
+CLASS_DATA_STATE = LocalStateSlice(
+    LOCAL_STATE,
+    (
+        "class_measurements",
+        "all_measurements",
+        "student_summaries",
+        "class_summaries",
+        "class_data_students",
+        "class_data_info",
+        "stage_4_class_data_students",
+        "stage_5_class_data_students",
+        "enough_students_ready",
+    ),
+)
+
+UI_STATE = LocalStateSlice(
+    LOCAL_STATE,
+    (
+        "story_id",
+        "title",
+        "debug_mode",
+        "show_snackbar",
+        "snackbar_message",
+        "last_route",
+        "max_route_index",
+        "route_restored",
+    ),
+)
+
 from typing import TypeVar
 BaseComponentStateT = TypeVar('BaseComponentStateT', bound='BaseComponentState')
 
+# Where each kind of response is kept in `LocalState`: (field, key)
+RESPONSE_FIELDS = {
+    "mc": ("mc_scoring", "scores"),
+    "fr": ("free_responses", "responses"),
+}
+
+
+def response_ref(local_state: Reactive[LocalState], kind: str, tag: str) -> Ref:
+    """
+    A reactive for the response to one question. Components that read it
+    only re-render when that response changes, not when any other part of
+    the local state does.
+    """
+    field, key = RESPONSE_FIELDS[kind]
+    return Ref(getattr(local_state.fields, field)[key][tag])
+
+
+def question_completed(tag: str, local_state: Reactive[LocalState] = LOCAL_STATE) -> bool:
+    """
+    Like `LocalState.question_completed`, but subscribes only to the
+    response for `tag` (or to the responses, until there is one), so that
+    a gate reading it doesn't re-render its page on every state change.
+    """
+    for kind, completed in (
+        ("fr", lambda response: response['response'] != ""),
+        ("mc", lambda response: response['score'] is not None),
+    ):
+        if tag in _responses(local_state, kind):
+            return completed(response_ref(local_state, kind, tag).value)
+
+    for field, _ in RESPONSE_FIELDS.values():
+        Ref(getattr(local_state.fields, field)).value
+    return False
+
+
+def _responses(local_state: Reactive[LocalState], kind: str) -> dict[str, dict]:
+    # Peek so that looking up a response doesn't subscribe to all of them
+    field, key = RESPONSE_FIELDS[kind]
+    return getattr(local_state.peek(), field)[key]
+
+
+def _set_response(local_state: Reactive[LocalState], kind: str, tag: str, response: dict):
+    """
+    Replaces the response for `tag`. Responses are never modified in place,
+    and the new state shares every other response with the previous one.
+    """
+    responses = _responses(local_state, kind)
+    if responses.get(tag) == response:
+        return
+    field, key = RESPONSE_FIELDS[kind]
+    Ref(getattr(local_state.fields, field)).set({key: {**responses, tag: response}})
+
+
+def _new_free_response(tag: str, component_state: Reactive[BaseComponentStateT]) -> dict:
+    return dict(tag=tag, response="", initialized=True, stage=component_state.value.stage_id)
+
+
+def _new_multiple_choice(tag: str, component_state: Reactive[BaseComponentStateT]) -> dict:
+    return dict(tag=tag, score=None, choice=None, tries=0, wrong_attempts=0, stage=component_state.value.stage_id)
+
+
 def get_free_response(local_state: Reactive[LocalState], component_state: Reactive[BaseComponentStateT], tag: str):
     logger.debug(f"Getting Free Response for tag: {tag}")
-    # check if the question present
-    if tag in local_state.value.free_responses['responses']:
-        
-        return local_state.value.free_responses['responses'][tag]
-    
-    # Create question on Ref
-    free_responses = Ref(local_state.fields.free_responses).value.copy()['responses']
-    new = dict(tag=tag, response="", initialized=True, stage=component_state.value.stage_id)
-    free_responses = {**free_responses, tag: new }
-    Ref(local_state.fields.free_responses).set({'responses': free_responses})
-    return free_responses[tag]
+    # Create the question if it isn't present
+    if tag not in _responses(local_state, "fr"):
+        _set_response(local_state, "fr", tag, _new_free_response(tag, component_state))
+
+    return response_ref(local_state, "fr", tag).value
 
 
 def fix_free_responses_stage_missing(tag, local_state: Reactive[LocalState], component_state: Reactive[BaseComponentStateT]):
     # just add the state if it's missing
-    free_responses = Ref(local_state.fields.free_responses).value.copy()['responses']
-    if tag not in free_responses.keys():
-        new = dict(tag=tag, response="", initialized=True, stage=component_state.value.stage_id)
-        free_responses = {**free_responses, tag: new }
-        Ref(local_state.fields.free_responses).set({'responses': free_responses})
+    if tag not in _responses(local_state, "fr"):
+        _set_response(local_state, "fr", tag, _new_free_response(tag, component_state))
         
         
 def get_multiple_choice(local_state: Reactive[LocalState], component_state: Reactive[BaseComponentStateT], tag: str):
     logger.debug(f"Getting MC Score for tag: {tag}")
-    if tag in local_state.value.mc_scoring['scores']:
-        if 'stage' not in local_state.value.mc_scoring['scores'][tag]:
-            new = local_state.value.mc_scoring['scores'][tag]
-            new['stage'] = component_state.value.stage_id
-            mc_scoring = {**local_state.value.mc_scoring['scores'], tag: new }
-        return local_state.value.mc_scoring['scores'][tag]
-    
-    mc_scoring = Ref(local_state.fields.mc_scoring).value.copy()['scores']
-    new = dict(tag=tag, score=None, choice=None, tries=0, wrong_attempts=0, stage=component_state.value.stage_id)
-    mc_scoring = {**mc_scoring, tag: new }
-    Ref(local_state.fields.mc_scoring).set({'scores': mc_scoring})
-    return mc_scoring[tag]
+    scores = _responses(local_state, "mc")
+    if tag not in scores:
+        _set_response(local_state, "mc", tag, _new_multiple_choice(tag, component_state))
+    elif 'stage' not in scores[tag]:
+        _set_response(
+            local_state, "mc", tag, {**scores[tag], 'stage': component_state.value.stage_id}
+        )
+
+    return response_ref(local_state, "mc", tag).value
 
 
 def mc_callback(
@@ -258,33 +484,22 @@ def mc_callback(
     Multiple Choice callback function
     """
 
-    mc_scoring = Ref(local_state.fields.mc_scoring).value.copy()['scores']
+    scores = _responses(local_state, "mc")
     piggybank_total = Ref(local_state.fields.piggybank_total)
 
     # mc-initialize-callback returns data which is a string
     if event[0] == "mc-initialize-response":
         # check for a missing tag
-        if event[1] not in mc_scoring.keys():
+        if event[1] not in scores:
             logger.debug(f"Initializing MC Score for tag: {event[1]}")
-            new_score = dict(
-                tag=event[1], 
-                score=None, 
-                choice=None, 
-                tries=0, 
-                wrong_attempts=0,
-                stage=component_state.value.stage_id
-                )
-            mc_scoring = {**mc_scoring, event[1]: new_score}
-            Ref(local_state.fields.mc_scoring).set({'scores': mc_scoring})
+            _set_response(local_state, "mc", event[1], _new_multiple_choice(event[1], component_state))
 
     # mc-score event returns a data which is an mc-score dictionary (includes tag)
     elif event[0] == "mc-score":
-        new_score = mc_scoring[event[1]["tag"]].copy() # make a copy of the current score
-        if 'stage' not in new_score:
-            new_score['stage'] = component_state.value.stage_id
-        new_score.update(event[1]) # update with new score, choice, tries, and wrong_attempts, but keeps the stage
-        mc_scoring = {**mc_scoring, event[1]["tag"]: new_score} # update the score
-        Ref(local_state.fields.mc_scoring).set({'scores': mc_scoring})
+        tag = event[1]["tag"]
+        new_score = {'stage': component_state.value.stage_id, **scores[tag]} # keeps the stage if there is one
+        new_score.update(event[1]) # update with new score, choice, tries, and wrong_attempts
+        _set_response(local_state, "mc", tag, new_score)
 
         # update piggybank_total
         try:
@@ -318,25 +533,21 @@ def fr_callback(
     Free Response callback function
     """
     
-    free_responses = Ref(local_state.fields.free_responses).value.copy()['responses']
+    free_responses = _responses(local_state, "fr")
     
     if event[0] == "fr-initialize":
-        if event[1]["tag"] not in free_responses.keys():
-            logger.debug(f"Initializing Free Response for tag: {event[1]['tag']}")
-            new = dict(tag=event[1]["tag"], response="", initialized=True, stage=component_state.value.stage_id)
-            free_responses = {**free_responses, event[1]["tag"]: new }
-            Ref(local_state.fields.free_responses).set({'responses': free_responses})
+        tag = event[1]["tag"]
+        if tag not in free_responses:
+            logger.debug(f"Initializing Free Response for tag: {tag}")
+            _set_response(local_state, "fr", tag, _new_free_response(tag, component_state))
             if callback is not None:
                 callback()
     elif event[0] == "fr-update":
-        new = free_responses[event[1]["tag"]]
-        new['response'] = event[1]["response"]
-        free_responses = {**free_responses, event[1]["tag"]: new }
-        if 'stage' not in free_responses[event[1]["tag"]]:
-            new = free_responses[event[1]["tag"]]
-            new['stage'] = component_state.value.stage_id
-            free_responses = {**free_responses, event[1]["tag"]: new }
-        Ref(local_state.fields.free_responses).set({'responses': free_responses})
+        tag = event[1]["tag"]
+        # A new response rather than an update in place, so that the change
+        #  is seen by anything holding the previous state
+        new = {'stage': component_state.value.stage_id, **free_responses[tag], 'response': event[1]["response"]}
+        _set_response(local_state, "fr", tag, new)
         if callback is not None:
                 callback()
     else:
@@ -1,7 +1,6 @@
-from collections import defaultdict
 from astropy import units as u
 from astropy.modeling import models, fitting
-from numpy import argsort, array, pi
+from numpy import add, argsort, array, errstate, float64, isfinite, nan, pi, unique, where
 
 from cosmicds.utils import component_type_for_field, mode, percent_around_center_indices
 from pydantic import BaseModel
@@ -9,7 +8,7 @@ from pydantic import BaseModel
 from glue.core import Data
 from glue_jupyter.app import JupyterApplication
 from numbers import Number
-from typing import List, Set, Tuple, TypeVar, Optional, cast, Any
+from typing import List, NamedTuple, Tuple, TypeVar, Optional, cast, Any
 from collections.abc import Callable
 import solara
 from solara.routing import Router
@@ -103,13 +102,62 @@ def age_in_gyr_simple(H0):
     return round(inv * mpc_to_km * s_to_gyr, 3)
 
 
-def fit_line(x, y):
+class _FitParameter(NamedTuple):
+    value: float64
+
+
+class OriginLine:
+    """
+    A line through the origin, with the `slope` and `intercept` attributes
+    of an astropy `Linear1D` that callers of `fit_line` use.
+    """
+
+    def __init__(self, slope: float):
+        # Kept as a numpy float, so that dividing by a zero slope gives inf
+        #  (with a warning) as it did for the astropy fit, not an exception
+        self.slope = _FitParameter(float64(slope))
+        self.intercept = _FitParameter(0.0)
+
+    def __call__(self, x):
+        return self.slope.value * asarray(x, dtype=float)
+
+    def __repr__(self):
+        return f"OriginLine(slope={self.slope.value})"
+
+
+def _fit_line_through_origin(x, y) -> OriginLine | None:
+    x = asarray(x, dtype=float)
+    y = asarray(y, dtype=float)
+    valid = isfinite(x) & isfinite(y)
+    x = x[valid]
+    y = y[valid]
+    sum_xx = (x * x).sum()
+    if sum_xx == 0:
+        return None
+    return OriginLine((x * y).sum() / sum_xx)
+
+
+def fit_line(x, y, through_origin: bool = True):
+    """
+    Least-squares line fit to `(x, y)`, ignoring points where either value
+    is NaN or None. Lines through the origin are fit in closed form; a line
+    with a free intercept is fit with astropy. Returns `None` if there is
+    nothing to fit.
+    """
     try:
+        if through_origin:
+            return _fit_line_through_origin(x, y)
+
+        x = asarray(x, dtype=float)
+        y = asarray(y, dtype=float)
+        valid = isfinite(x) & isfinite(y)
+        if valid.sum() < 2:
+            return None
         fit = fitting.LinearLSQFitter()
-        line_init = models.Linear1D(intercept=0, fixed={"intercept": True})
-        fitted_line = fit(line_init, x, y)
+        line_init = models.Linear1D()
+        fitted_line = fit(line_init, x[valid], y[valid])
         return fitted_line
-    except ValueError as e:
+    except (TypeError, ValueError) as e:
         print(e)
         return None
 
@@ -186,41 +234,58 @@ def models_to_glue_data(items: List[M],
 
 def create_single_summary(distances: List[Number], velocities: List[Number]) -> Tuple[float, float]:
     line = fit_line(distances, velocities)
+    if line is None:
+        return nan, nan
     h0 = line.slope.value
-    age = age_in_gyr_simple(h0)
+    with errstate(divide="ignore"):
+        age = age_in_gyr_simple(h0)
     return h0, age
 
 
+def grouped_slopes_through_origin(ids, x, y) -> Tuple[Any, Any]:
+    """
+    Least-squares slopes of lines through the origin fit to `(x, y)`,
+    separately for each distinct value of `ids`. All groups are fit at once
+    using the closed form `sum(x * y) / sum(x ** 2)`. Points where `x` or `y`
+    is NaN or None are ignored; groups with no usable points get a NaN slope.
+
+    Returns the sorted distinct ids and the slope for each.
+    """
+    ids = asarray(ids)
+    x = asarray(x, dtype=float)
+    y = asarray(y, dtype=float)
+    if ids.size == 0:
+        return ids, asarray([], dtype=float)
+
+    order = argsort(ids, kind="stable")
+    ids, x, y = ids[order], x[order], y[order]
+    unique_ids, starts = unique(ids, return_index=True)
+
+    valid = isfinite(x) & isfinite(y)
+    with errstate(invalid="ignore", divide="ignore"):
+        sum_xy = add.reduceat(where(valid, x * y, 0.0), starts)
+        sum_xx = add.reduceat(where(valid, x * x, 0.0), starts)
+        slopes = where(sum_xx > 0, sum_xy / sum_xx, nan)
+
+    return unique_ids, slopes
+
+
 def make_summary_data(measurement_data: Data,
                       input_id_field: str="id",
                       output_id_field: str | None=None,
                       label: str | None=None
 ) -> Data:
-    dists = defaultdict(list)
-    vels = defaultdict(list)
-    d = measurement_data["est_dist_value"]
-    v = measurement_data["velocity_value"]
-    ids: Set[int] = set()
-
-    for i in range(measurement_data.size):
-        id_num = measurement_data[input_id_field][i]
-        ids.add(id_num)
-        dist = d[i]
-        vel = v[i]
-        if dist is not None and vel is not None:
-            dists[id_num].append(dist)
-            vels[id_num].append(vel)
-
-    hubbles: List[float] = []
-    ages: List[float] = []
-    for id_num in ids:
-        h0, age = create_single_summary(dists[id_num], vels[id_num])
-        hubbles.append(h0)
-        ages.append(age)
+    ids, hubbles = grouped_slopes_through_origin(
+        measurement_data[input_id_field],
+        measurement_data["est_dist_value"],
+        measurement_data["velocity_value"],
+    )
+    with errstate(divide="ignore", invalid="ignore"):
+        ages = age_in_gyr_simple(hubbles)
 
     data_kwargs: dict = { "hubble_fit_value": hubbles, "age_value": ages }
     output_id_field = output_id_field or input_id_field
-    data_kwargs[output_id_field] = list(ids)
+    data_kwargs[output_id_field] = ids
 
     if label:
         data_kwargs["label"] = label
@@ -332,4 +397,5 @@ def push_to_route(router: Router, location, route: str):
         path = Path(f"{router.root_path}/{route}")
         router.push(str(path))
     else:
-        location.pathname = settings.main.base_url
\ No newline at end of file
+        location.pathname = settings.main.base_url
+
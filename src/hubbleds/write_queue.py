@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, Hashable, Optional
+
+from cosmicds.logger import setup_logger
+from solara import Reactive
+from solara.server import kernel_context
+
+from hubbleds.remote import DEBOUNCE_TIMEOUT, LOCAL_API
+
+logger = setup_logger("WRITE QUEUE")
+
+# Seconds to wait for further changes to the same state before writing it
+WRITE_DELAY = float(os.getenv("HUBBLEDS_WRITE_DELAY", DEBOUNCE_TIMEOUT))
+
+# A state that keeps changing is still written at least this often
+MAX_WRITE_DELAY = float(os.getenv("HUBBLEDS_MAX_WRITE_DELAY", 5 * WRITE_DELAY))
+
+
+class WriteBehindQueue:
+    """
+    Defers database writes and coalesces repeated writes for the same key.
+
+    Each call to `schedule` replaces any pending write for its key and
+    restarts that key's timer, so a burst of changes within `delay` seconds
+    results in a single write of the latest state. A key that keeps changing
+    is still written once it has been pending for `max_delay` seconds.
+
+    Writes for the same key never overlap. A write that comes due while the
+    previous one for its key is still running is run by that thread right
+    after it, so the writes land in order. Writes run inside the kernel
+    context the queue was created in, so they can read the session's
+    reactive state.
+    """
+
+    def __init__(
+        self,
+        delay: float = WRITE_DELAY,
+        max_delay: float = MAX_WRITE_DELAY,
+        context: Optional[kernel_context.VirtualKernelContext] = None,
+    ):
+        self.delay = delay
+        self.max_delay = max(max_delay, delay)
+        self._context = context
+        self._lock = threading.RLock()
+        self._idle = threading.Condition(self._lock)
+        self._pending: dict[Hashable, Callable[[], Any]] = {}
+        self._first_scheduled: dict[Hashable, float] = {}
+        self._timers: dict[Hashable, threading.Timer] = {}
+        # Keys with a write in progress, and those due to be written again
+        #  as soon as it finishes
+        self._running: set[Hashable] = set()
+        self._due: set[Hashable] = set()
+
+        self.requested = 0
+        self.written = 0
+        self.failed = 0
+
+    def schedule(self, key: Hashable, write: Callable[[], Any]):
+        with self._lock:
+            self.requested += 1
+            self._pending[key] = write
+
+            now = time.monotonic()
+            first = self._first_scheduled.setdefault(key, now)
+            delay = max(0.0, min(self.delay, first + self.max_delay - now))
+
+            timer = self._timers.pop(key, None)
+            if timer is not None:
+                timer.cancel()
+
+            if delay <= 0:
+                run_now = True
+            else:
+                run_now = False
+                timer = threading.Timer(delay, self._flush_key, args=(key,))
+                timer.daemon = True
+                self._timers[key] = timer
+                timer.start()
+
+        if run_now:
+            self._flush_key(key)
+
+    def _take(self, key: Hashable) -> Optional[Callable[[], Any]]:
+        # Must hold the lock
+        self._first_scheduled.pop(key, None)
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        return self._pending.pop(key, None)
+
+    def _flush_key(self, key: Hashable):
+        with self._lock:
+            if key in self._running:
+                self._due.add(key)
+                return
+            write = self._take(key)
+            if write is None:
+                return
+            self._running.add(key)
+
+        while write is not None:
+            try:
+                with self._context or nullcontext():
+                    write()
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+                logger.exception("Deferred write for `%s` failed.", key)
+            else:
+                with self._lock:
+                    self.written += 1
+
+            with self._lock:
+                write = None
+                if key in self._due:
+                    self._due.discard(key)
+                    write = self._take(key)
+                if write is None:
+                    self._running.discard(key)
+                    self._idle.notify_all()
+
+    def flush(self, wait: bool = False):
+        """
+        Run every pending write now. Writes for keys that are already being
+        written run right after them, in their threads; pass `wait=True` to
+        block until those are done too.
+        """
+        with self._lock:
+            keys = list(self._pending.keys())
+        for key in keys:
+            self._flush_key(key)
+
+        if wait:
+            with self._lock:
+                self._idle.wait_for(lambda: not self._running)
+
+    def flush_in_background(self) -> threading.Thread:
+        """Run every pending write now, on a thread of its own."""
+        thread = threading.Thread(target=self.flush, name="write-queue-flush", daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def metrics(self) -> dict[str, int]:
+        pending = self.pending
+        return {
+            "requested": self.requested,
+            "written": self.written,
+            "failed": self.failed,
+            "pending": pending,
+            "saved": self.requested - self.written - self.failed - pending,
+        }
+
+
+_QUEUES: dict[str, WriteBehindQueue] = {}
+_QUEUES_LOCK = threading.Lock()
+
+# Metrics of sessions that have already closed
+_CLOSED_TOTALS: dict[str, int] = {}
+
+
+def get_write_queue() -> WriteBehindQueue:
+    """
+    Returns the write queue of the current session, creating it on first use.
+    Pending writes are flushed when the session's kernel closes.
+    """
+    context = kernel_context.get_current_context()
+    with _QUEUES_LOCK:
+        queue = _QUEUES.get(context.id)
+        if queue is not None:
+            return queue
+
+        queue = WriteBehindQueue(context=context)
+        _QUEUES[context.id] = queue
+
+    def _on_close():
+        queue.flush(wait=True)
+        logger.info("Write queue metrics for closed session: %s", queue.metrics())
+        with _QUEUES_LOCK:
+            _QUEUES.pop(context.id, None)
+            for name, value in queue.metrics().items():
+                _CLOSED_TOTALS[name] = _CLOSED_TOTALS.get(name, 0) + value
+
+    context.on_close(_on_close)
+    return queue
+
+
+def write_queue_metrics() -> dict[str, int]:
+    """Write queue metrics summed over all sessions this process has served."""
+    with _QUEUES_LOCK:
+        totals = dict(_CLOSED_TOTALS)
+        queues = list(_QUEUES.values())
+    for queue in queues:
+        for name, value in queue.metrics().items():
+            totals[name] = totals.get(name, 0) + value
+    return totals
+
+
+def queue_stage_state_write(
+    global_state: Reactive, local_state: Reactive, component_state: Reactive
+):
+    stage_id = component_state.value.stage_id
+
+    def _write():
+        if LOCAL_API.put_stage_state(global_state, local_state, component_state):
+            logger.info("Wrote component state for stage `%s` to database.", stage_id)
+        else:
+            logger.info(
+                "Did not write component state for stage `%s` to database.", stage_id
+            )
+
+    get_write_queue().schedule(("stage-state", stage_id), _write)
@@ -0,0 +1,113 @@
+import pytest
+
+from hubbleds.all_data import AllDataTables, SharedAllData
+from hubbleds.state import (
+    ClassSummary,
+    ClassSummaryTable,
+    StudentMeasurement,
+    StudentMeasurementTable,
+    StudentSummaryTable,
+)
+
+STORY_ID = "hubbles_law"
+
+
+def _tables(version=0):
+    return AllDataTables(
+        measurements=StudentMeasurementTable.from_records([
+            {"student_id": 1, "class_id": 10, "velocity_value": 100.0 + version},
+            {"student_id": 2, "class_id": 10, "velocity_value": 200.0},
+            {"student_id": 3, "class_id": 20, "velocity_value": 300.0},
+        ]),
+        student_summaries=StudentSummaryTable.from_records([
+            {"student_id": student_id, "hubble_fit_value": 70.0, "age_value": 14.0}
+            for student_id in (1, 2, 3)
+        ]),
+        class_summaries=ClassSummaryTable.from_records([
+            {"class_id": class_id, "hubble_fit_value": 70.0, "age_value": 14.0}
+            for class_id in (10, 20)
+        ]),
+    )
+
+
+class _Fetch:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self, story_id):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("API is down")
+        return _tables(self.calls)
+
+
+def test_snapshot_is_shared_until_it_expires():
+    fetch = _Fetch()
+    all_data = SharedAllData(ttl=60, fetch=fetch)
+
+    first = all_data.snapshot(STORY_ID)
+    assert all_data.snapshot(STORY_ID) is first
+    assert fetch.calls == 1
+
+    all_data.ttl = 0
+    second = all_data.snapshot(STORY_ID)
+    assert second.version > first.version
+    assert fetch.calls == 2
+
+
+def test_failed_refresh_keeps_the_snapshot():
+    fetch = _Fetch()
+    all_data = SharedAllData(ttl=0, fetch=fetch)
+    snapshot = all_data.snapshot(STORY_ID)
+
+    fetch.fail = True
+    assert all_data.snapshot(STORY_ID) is snapshot
+
+    # There is nothing to fall back on for a story that never loaded
+    with pytest.raises(RuntimeError):
+        all_data.snapshot("other_story")
+
+    fetch.fail = False
+    assert all_data.snapshot(STORY_ID) is not snapshot
+
+
+def test_class_view():
+    all_data = SharedAllData(fetch=_Fetch())
+    tables = all_data.snapshot(STORY_ID).tables
+    assert all_data.class_view(STORY_ID) is tables
+
+    # Student 2 no longer has complete measurements
+    class_measurements = [StudentMeasurement(student_id=1, class_id=10, velocity_value=150.0)]
+    class_summary = ClassSummary(class_id=10, hubble_fit_value=75.0, age_value=13.0)
+    view = all_data.class_view(STORY_ID, 10, class_measurements, class_summary)
+
+    assert [(m.student_id, m.velocity_value) for m in view.measurements] == [
+        (3, 300.0), (1, 150.0)
+    ]
+    assert view.student_summaries.column("student_id").tolist() == [3]
+    assert [(s.class_id, s.hubble_fit_value) for s in view.class_summaries] == [
+        (20, 70.0), (10, 75.0)
+    ]
+
+    # Sessions of the same class with the same data share a view
+    assert all_data.class_view(STORY_ID, 10, list(class_measurements), class_summary) is view
+    assert all_data.class_view(STORY_ID, 10, [], class_summary) is not view
+
+
+def test_class_views_are_bounded():
+    all_data = SharedAllData(max_views=2, fetch=_Fetch())
+    views = [all_data.class_view(STORY_ID, class_id) for class_id in (10, 20, 30)]
+
+    assert all_data.class_view(STORY_ID, 30) is views[2]
+    assert all_data.class_view(STORY_ID, 10) is not views[0]
+
+
+def test_invalidate():
+    fetch = _Fetch()
+    all_data = SharedAllData(fetch=fetch)
+    all_data.class_view(STORY_ID, 10)
+
+    all_data.invalidate(STORY_ID)
+    all_data.class_view(STORY_ID, 10)
+    assert fetch.calls == 2
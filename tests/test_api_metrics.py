@@ -0,0 +1,120 @@
+import io
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from hubbleds.api_metrics import APIMetrics, endpoint_template
+
+API_URL = "https://api.example"
+
+
+class _ChunkedAdapter(BaseAdapter):
+    """Answers every request with `body` and no Content-Length header."""
+
+    def __init__(self, body: bytes, status: int = 200):
+        super().__init__()
+        self.body = body
+        self.status = status
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = self.status
+        response.headers["Transfer-Encoding"] = "chunked"
+        response.raw = io.BytesIO(self.body)
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def session():
+    def _session(metrics, body, status=200):
+        session = requests.Session()
+        session.mount(API_URL, _ChunkedAdapter(body, status))
+        metrics.instrument(session)
+        return session
+
+    return _session
+
+
+def _lines(metrics, name):
+    return [
+        line for line in metrics.to_prometheus().splitlines()
+        if line.startswith(f"hubbleds_api_{name}")
+    ]
+
+
+@pytest.mark.parametrize("url, template", [
+    (f"{API_URL}/hubbles_law/measurements/7", "/{story}/measurements/{student}"),
+    (f"{API_URL}/hubbles_law/measurements/7/12", "/{story}/measurements/{student}/{galaxy}"),
+    (f"{API_URL}/hubbles_law/submit-measurements/", "/{story}/submit-measurements"),
+    (f"{API_URL}/hubbles_law/class-measurements/students-completed/7/3",
+     "/{story}/class-measurements/students-completed/{student}/{class}"),
+    (f"{API_URL}/hubbles_law/class-measurements/7/3?complete_only=true",
+     "/{story}/class-measurements/{student}/{class}"),
+    (f"{API_URL}/hubbles_law/all-data?minimal=True", "/{story}/all-data"),
+    (f"{API_URL}/stage-state/7/hubbles_law/spectra_&_velocity",
+     "/stage-state/{student}/{story}/{stage}"),
+    (f"{API_URL}/classes/12/students/7", "/classes/{id}/students/{id}"),
+])
+def test_endpoint_template(url, template):
+    assert endpoint_template(url) == template
+
+
+def test_to_prometheus():
+    metrics = APIMetrics()
+    url = f"{API_URL}/hubbles_law/measurements/7"
+    metrics.record("GET", url, 200, 0.02, response_bytes=100)
+    metrics.record("GET", f"{API_URL}/hubbles_law/measurements/8", 500, 3.0, response_bytes=10)
+    metrics.record("PUT", f"{API_URL}/story-state/7/hubbles_law", 200, 0.2, request_bytes=50, retries=2)
+
+    get = 'method="GET",endpoint="/{story}/measurements/{student}"'
+    put = 'method="PUT",endpoint="/story-state/{student}/{story}"'
+    buckets = _lines(metrics, "request_duration_seconds_bucket")
+    assert f'hubbleds_api_request_duration_seconds_bucket{{{get},le="0.01"}} 0' in buckets
+    assert f'hubbleds_api_request_duration_seconds_bucket{{{get},le="0.025"}} 1' in buckets
+    assert f'hubbleds_api_request_duration_seconds_bucket{{{get},le="+Inf"}} 2' in buckets
+    assert _lines(metrics, "request_duration_seconds_count") == [
+        f"hubbleds_api_request_duration_seconds_count{{{get}}} 2",
+        f"hubbleds_api_request_duration_seconds_count{{{put}}} 1",
+    ]
+    assert _lines(metrics, "requests_total") == [
+        f'hubbleds_api_requests_total{{{get},status="200"}} 1',
+        f'hubbleds_api_requests_total{{{get},status="500"}} 1',
+        f'hubbleds_api_requests_total{{{put},status="200"}} 1',
+    ]
+    assert _lines(metrics, "response_bytes_total") == [
+        f"hubbleds_api_response_bytes_total{{{get}}} 110",
+        f"hubbleds_api_response_bytes_total{{{put}}} 0",
+    ]
+    assert f"hubbleds_api_request_bytes_total{{{put}}} 50" in _lines(metrics, "request_bytes_total")
+    assert f"hubbleds_api_retries_total{{{put}}} 2" in _lines(metrics, "retries_total")
+
+    metrics.reset()
+    assert _lines(metrics, "requests_total") == []
+
+
+def test_response_bytes_are_counted_as_the_body_is_read(session):
+    metrics = APIMetrics()
+    endpoint = 'method="GET",endpoint="/{story}/all-data"'
+    url = f"{API_URL}/hubbles_law/all-data"
+
+    # A chunked response has no Content-Length to go by
+    response = session(metrics, b"x" * 2000).get(url)
+    assert len(response.content) == 2000
+    assert _lines(metrics, "response_bytes_total") == [
+        f"hubbleds_api_response_bytes_total{{{endpoint}}} 2000"
+    ]
+
+    with session(metrics, b"y" * 3000).get(url, stream=True) as response:
+        assert sum(len(chunk) for chunk in response.iter_content(chunk_size=512)) == 3000
+    assert _lines(metrics, "response_bytes_total") == [
+        f"hubbleds_api_response_bytes_total{{{endpoint}}} 5000"
+    ]
+    assert _lines(metrics, "request_duration_seconds_count") == [
+        f"hubbleds_api_request_duration_seconds_count{{{endpoint}}} 2"
+    ]
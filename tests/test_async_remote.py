@@ -0,0 +1,137 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from requests import HTTPError
+
+from hubbleds import remote
+from hubbleds.async_remote import AsyncLocalAPI
+from hubbleds.remote import LOCAL_API, LocalAPI
+from hubbleds.stand_in import StandInServer
+from hubbleds.state import LOCAL_STATE, LocalState
+
+STORY_ID = "hubbles_law"
+STUDENT_ID = 7
+CLASS_ID = 3
+
+MEASUREMENT = {
+    "student_id": STUDENT_ID,
+    "galaxy": {
+        "id": 1, "name": "galaxy 1", "ra": 0, "decl": 0, "z": 0.01, "type": "Sp", "element": "H-α"
+    },
+    "velocity_value": 1000.0,
+}
+
+
+def _global_state(class_info):
+    return SimpleNamespace(
+        value=SimpleNamespace(
+            update_db=True,
+            student=SimpleNamespace(id=STUDENT_ID),
+            classroom=SimpleNamespace(class_info=class_info),
+            model_dump=lambda: {},
+        )
+    )
+
+
+@pytest.fixture
+def states(monkeypatch):
+    global_state = _global_state({"id": CLASS_ID})
+    LOCAL_STATE.set(LocalState(story_id=STORY_ID))
+    monkeypatch.setattr(remote, "GLOBAL_STATE", global_state)
+    monkeypatch.setattr(LocalAPI, "is_educator", False)
+    yield global_state, LOCAL_STATE
+    LOCAL_STATE.set(LocalState())
+
+
+@pytest.fixture
+def stand_in():
+    server = StandInServer()
+    LOCAL_API.use_session(server)
+    yield server
+    LOCAL_API.use_session(None)
+
+
+@pytest.fixture
+def responses(monkeypatch):
+    """Answers the async client's requests with `responses.routes[path]`."""
+    responses = SimpleNamespace(routes={}, requests=[])
+
+    def _handle(request):
+        responses.requests.append(request)
+        status, body = responses.routes.get(request.url.path, (404, {"error": "Not found"}))
+        return httpx.Response(status, json=body)
+
+    monkeypatch.setattr(
+        AsyncLocalAPI,
+        "_client",
+        lambda self: httpx.AsyncClient(transport=httpx.MockTransport(_handle)),
+    )
+    return responses
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_class_measurements_need_a_class_id(states, stand_in):
+    global_state, local_state = states
+    for class_info in (None, {}):
+        no_class = _global_state(class_info)
+        assert LOCAL_API.get_class_measurements(no_class, local_state) == []
+        assert _run(AsyncLocalAPI(LOCAL_API).get_class_measurements(no_class, local_state)) == []
+    assert stand_in.requests == []
+
+
+def test_students_completed_count(states, stand_in):
+    stand_in.students_completed[(STORY_ID, CLASS_ID)] = 4
+    assert LOCAL_API.fetch_students_completed_count(STORY_ID, STUDENT_ID, CLASS_ID) == 4
+    assert stand_in.requests == [
+        ("GET", f"/{STORY_ID}/class-measurements/students-completed/{STUDENT_ID}/{CLASS_ID}")
+    ]
+
+    # An error isn't mistaken for nobody having completed their measurements
+    del stand_in.students_completed[(STORY_ID, CLASS_ID)]
+    with pytest.raises(HTTPError):
+        LOCAL_API.fetch_students_completed_count(STORY_ID, STUDENT_ID, CLASS_ID)
+
+
+def test_async_students_completed_count(states, responses):
+    api = AsyncLocalAPI(LOCAL_API)
+    path = f"/{STORY_ID}/class-measurements/students-completed/{STUDENT_ID}/{CLASS_ID}"
+
+    with pytest.raises(httpx.HTTPStatusError):
+        _run(api.fetch_students_completed_count(STORY_ID, STUDENT_ID, CLASS_ID))
+
+    responses.routes[path] = (200, {"students_completed_measurements": 12})
+    assert _run(api.get_students_completed_measurements_count(*states)) == 12
+
+
+def test_async_class_measurements(states, responses):
+    api = AsyncLocalAPI(LOCAL_API)
+    path = f"/{STORY_ID}/class-measurements/{STUDENT_ID}/{CLASS_ID}"
+
+    # A failed request leaves the class measurements as they were
+    assert _run(api.get_class_measurements(*states)) == []
+
+    responses.routes[path] = (200, {"measurements": [MEASUREMENT]})
+    measurements = _run(api.get_class_measurements(*states))
+    assert [m.galaxy_id for m in measurements] == [1]
+    assert LOCAL_STATE.value.class_measurements == measurements
+    assert responses.requests[-1].url.params["complete_only"] == "true"
+
+
+def test_async_story_state_matches_sync(states, responses, stand_in):
+    LOCAL_API.put_story_state(*states)
+    _, stored = stand_in.story_states.popitem()
+
+    api = AsyncLocalAPI(LOCAL_API)
+    LOCAL_API.use_session(None)
+    path = f"/story-state/{STUDENT_ID}/{STORY_ID}"
+    assert not _run(api.put_story_state(*states))
+
+    responses.routes[path] = (200, {})
+    assert _run(api.put_story_state(*states))
+    assert json.loads(responses.requests[-1].content) == stored
@@ -0,0 +1,86 @@
+from cosmicds.state import GLOBAL_STATE
+
+from hubbleds.change_tracking import StateChangeTracker
+from hubbleds.state import GalaxyData, LocalState, StudentMeasurement
+
+
+def _measurement(galaxy_id, measurement_number=None, **values):
+    galaxy = GalaxyData(
+        id=galaxy_id, name=f"galaxy {galaxy_id}", ra=0, decl=0, z=0.01, type="Sp", element="H-α"
+    )
+    return StudentMeasurement(
+        student_id=1, galaxy=galaxy, measurement_number=measurement_number, **values
+    )
+
+
+def test_changed_measurements():
+    tracker = StateChangeTracker()
+    measurements = [_measurement(1), _measurement(2)]
+    tracker.mark_all_measurements_written("measurements", measurements)
+
+    assert tracker.changed_measurements("measurements", measurements) == {}
+
+    # An equal copy isn't a change, a new value is
+    updated = [
+        measurements[0].model_copy(),
+        measurements[1].model_copy(update={"velocity_value": 1234.0}),
+        _measurement(3),
+    ]
+    changes = tracker.changed_measurements("measurements", updated)
+    assert set(changes) == {(2, None), (3, None)}
+
+    tracker.mark_measurements_written("measurements", changes)
+    assert tracker.changed_measurements("measurements", updated) == {}
+
+
+def test_measurement_kinds_are_tracked_separately():
+    tracker = StateChangeTracker()
+    examples = [_measurement(1, "first"), _measurement(1, "second")]
+    tracker.mark_all_measurements_written("example_measurements", examples)
+
+    assert tracker.changed_measurements("example_measurements", examples) == {}
+    assert set(tracker.changed_measurements("measurements", examples)) == {
+        (1, "first"), (1, "second")
+    }
+
+
+def test_deleted_measurements():
+    tracker = StateChangeTracker()
+    measurements = [_measurement(1), _measurement(2), _measurement(3)]
+    tracker.mark_all_measurements_written("measurements", measurements)
+
+    remaining = [measurements[0], measurements[2]]
+    assert tracker.deleted_measurements("measurements", remaining) == {(2, None)}
+
+    tracker.mark_measurements_deleted("measurements", [(2, None)])
+    assert tracker.deleted_measurements("measurements", remaining) == set()
+    assert tracker.changed_measurements("measurements", remaining) == {}
+
+
+def test_changed_story_fields():
+    tracker = StateChangeTracker()
+    global_state = GLOBAL_STATE.value
+    local_state = LocalState()
+
+    changed, values = tracker.changed_story_fields(global_state, local_state)
+    assert "app" in changed
+    assert "measurements" not in changed
+    tracker.mark_story_written(values)
+
+    assert tracker.changed_story_fields(global_state, local_state)[0] == set()
+
+    # Snackbar changes alone don't need a write
+    local_state = local_state.model_copy(update={"show_snackbar": True})
+    assert tracker.changed_story_fields(global_state, local_state)[0] == set()
+
+    # Neither do changes to the measurements, which are written separately
+    local_state = local_state.model_copy(update={"measurements": [_measurement(1)]})
+    assert tracker.changed_story_fields(global_state, local_state)[0] == set()
+
+    local_state = local_state.model_copy(update={"free_responses": {"responses": {"q": {}}}})
+    assert tracker.changed_story_fields(global_state, local_state)[0] == {"free_responses"}
+
+
+def test_story_fields_match_as_dict():
+    local_state = LocalState()
+    assert set(local_state.story_state_fields()) == set(local_state.as_dict())
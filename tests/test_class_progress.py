@@ -0,0 +1,179 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from hubbleds.class_progress import ClassProgressBroadcaster
+from hubbleds.remote import LOCAL_API
+from hubbleds.stand_in import StandInServer
+
+STORY_ID = "hubbles_law"
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+class _Fetch:
+    def __init__(self, value=3):
+        self.value = value
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, story_id, student_id, class_id):
+        with self.lock:
+            self.calls.append((story_id, student_id, class_id, time.monotonic()))
+        if isinstance(self.value, Exception):
+            raise self.value
+        return self.value
+
+    def classes(self):
+        with self.lock:
+            return [call[2] for call in self.calls]
+
+
+@pytest.fixture
+def make_broadcaster():
+    broadcasters = []
+
+    def _make(fetch, **kwargs):
+        broadcaster = ClassProgressBroadcaster(fetch=fetch, **kwargs)
+        broadcasters.append(broadcaster)
+        return broadcaster
+
+    yield _make
+    for broadcaster in broadcasters:
+        loop = broadcaster._loop
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(_cancel_pollers(), loop).result(2)
+            loop.call_soon_threadsafe(loop.stop)
+
+
+async def _cancel_pollers():
+    tasks = asyncio.all_tasks() - {asyncio.current_task()}
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def test_one_fetch_per_class(make_broadcaster):
+    fetch = _Fetch()
+    broadcaster = make_broadcaster(fetch, interval=10)
+    received = {}
+
+    for student_id in range(5):
+        broadcaster.subscribe(STORY_ID, 1, student_id, lambda value, s=student_id: received.setdefault(s, value))
+    broadcaster.subscribe(STORY_ID, 2, 10, lambda value: received.setdefault(10, value))
+
+    _wait_for(lambda: len(received) == 6)
+    assert sorted(fetch.classes()) == [1, 2]
+    assert broadcaster.requests == 2
+    assert broadcaster.subscriber_count(STORY_ID, 1) == 5
+    assert broadcaster.subscriber_count() == 6
+
+
+def test_counts_fan_out_to_every_subscriber(make_broadcaster):
+    fetch = _Fetch(value=1)
+    broadcaster = make_broadcaster(fetch, interval=0.02)
+    received = {student_id: [] for student_id in range(3)}
+
+    for student_id, values in received.items():
+        broadcaster.subscribe(STORY_ID, 1, student_id, values.append)
+
+    _wait_for(lambda: all(values for values in received.values()))
+    fetch.value = 4
+    _wait_for(lambda: all(values[-1] == 4 for values in received.values()))
+
+    # Late subscribers get the last count straight away
+    late = []
+    broadcaster.subscribe(STORY_ID, 1, 9, late.append)
+    assert late[:1] == [4]
+
+
+def test_idle_poller_exits(make_broadcaster):
+    fetch = _Fetch()
+    broadcaster = make_broadcaster(fetch, interval=0.01, max_interval=0.02, idle_timeout=0.05)
+    received = []
+
+    unsubscribe = broadcaster.subscribe(STORY_ID, 1, 1, received.append)
+    _wait_for(lambda: received)
+    channel = broadcaster._channels[(STORY_ID, 1)]
+
+    unsubscribe()
+    unsubscribe()
+    assert broadcaster.subscriber_count() == 0
+
+    _wait_for(lambda: channel.future.done())
+    assert (STORY_ID, 1) not in broadcaster._channels
+
+    # Nothing is checked without subscribers
+    calls = len(fetch.calls)
+    time.sleep(0.05)
+    assert len(fetch.calls) == calls
+
+
+def test_failed_checks_back_off(make_broadcaster):
+    fetch = _Fetch(value=5)
+    broadcaster = make_broadcaster(fetch, interval=0.01, max_interval=0.08)
+    received = []
+
+    broadcaster.subscribe(STORY_ID, 1, 1, received.append)
+    _wait_for(lambda: received)
+
+    fetch.value = ConnectionError("API is down")
+    failed_from = len(fetch.calls)
+    _wait_for(lambda: len(fetch.calls) >= failed_from + 4)
+
+    times = [call[3] for call in fetch.calls[failed_from:]]
+    gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+    assert gaps[-1] > 2 * gaps[0]
+    assert gaps[-1] >= 0.04
+
+    # The last good count is kept
+    assert set(received) == {5}
+
+
+def test_new_subscriber_wakes_the_poller(make_broadcaster):
+    fetch = _Fetch()
+    broadcaster = make_broadcaster(fetch, interval=0.05, max_interval=10, idle_timeout=10)
+    received = []
+
+    unsubscribe = broadcaster.subscribe(STORY_ID, 1, 1, received.append)
+    _wait_for(lambda: received)
+    unsubscribe()
+
+    # Long enough for the poller to back off well past the interval
+    time.sleep(0.8)
+    calls = len(fetch.calls)
+
+    woken = []
+    broadcaster.subscribe(STORY_ID, 1, 2, woken.append)
+    _wait_for(lambda: len(fetch.calls) > calls, timeout=0.4)
+    _wait_for(lambda: len(woken) == 2)
+
+
+def test_error_responses_keep_the_last_count(make_broadcaster):
+    server = StandInServer()
+    server.students_completed[(STORY_ID, 1)] = 7
+    LOCAL_API.use_session(server)
+    try:
+        # Checks go through ASYNC_API, which uses the stand-in's session
+        broadcaster = make_broadcaster(None, interval=0.01, max_interval=0.04)
+        received = []
+        broadcaster.subscribe(STORY_ID, 1, 1, received.append)
+        _wait_for(lambda: received)
+
+        del server.students_completed[(STORY_ID, 1)]
+        failed_from = server.request_count()
+        _wait_for(lambda: server.request_count() >= failed_from + 3)
+        assert set(received) == {7}
+        assert broadcaster._channels[(STORY_ID, 1)].count == 7
+
+        server.students_completed[(STORY_ID, 1)] = 9
+        _wait_for(lambda: received[-1] == 9)
+    finally:
+        LOCAL_API.use_session(None)
@@ -0,0 +1,141 @@
+import datetime
+from typing import Optional
+
+import numpy as np
+import pytest
+from pydantic import BaseModel
+
+from hubbleds.columnar import ColumnarTable, column_dtype
+from hubbleds.utils import models_to_glue_data
+
+
+class Row(BaseModel):
+    id: int
+    name: str
+    value: Optional[float] = None
+    count: Optional[int] = None
+    flag: bool = False
+    created: Optional[datetime.datetime] = None
+
+
+class RowTable(ColumnarTable, model=Row):
+    pass
+
+
+class Holder(BaseModel):
+    rows: RowTable = RowTable()
+
+
+RECORDS = [
+    {"id": 1, "name": "a", "value": 1.5, "count": 3, "flag": True,
+     "created": "2024-05-01T12:00:00", "extra": "ignored"},
+    {"id": 2, "name": "b"},
+    {"id": 3, "name": "a", "value": None, "count": None},
+]
+
+
+def test_column_dtypes():
+    assert RowTable.schema == {
+        "id": np.dtype(np.int64),
+        "name": np.dtype(object),
+        "value": np.dtype(np.float64),
+        "count": np.dtype(np.float64),
+        "flag": np.dtype(bool),
+        "created": np.dtype(object),
+    }
+    assert column_dtype(Optional[bool]) == np.dtype(object)
+
+
+def test_from_records():
+    table = RowTable.from_records(RECORDS)
+
+    assert len(table) == 3
+    np.testing.assert_array_equal(table.column("id"), [1, 2, 3])
+    np.testing.assert_array_equal(table.column("value"), [1.5, np.nan, np.nan])
+    # Repeated strings are shared
+    assert table.column("name")[0] is table.column("name")[2]
+    assert table.column("created")[0] == datetime.datetime(2024, 5, 1, 12)
+
+    assert table.record(1) == {
+        "id": 2, "name": "b", "value": None, "count": None, "flag": False, "created": None
+    }
+    assert table[0] == Row(**RECORDS[0])
+    assert table.to_models() == [Row(**record) for record in RECORDS]
+
+
+def test_missing_required_field():
+    with pytest.raises(ValueError, match="`name`"):
+        RowTable.from_records([{"id": 1}])
+
+
+def test_models_round_trip():
+    models = [Row(**record) for record in RECORDS]
+    table = RowTable.from_models(models)
+
+    assert table == RowTable.from_records(RECORDS)
+    assert table.to_models() == models
+    assert RowTable.from_records([]) == RowTable()
+
+
+def test_builder_appends_one_record_at_a_time():
+    builder = RowTable.builder()
+    for record in RECORDS[:2]:
+        builder.append(record)
+    assert len(builder) == 2
+
+    table = builder.build()
+    assert table == RowTable.from_records(RECORDS[:2])
+
+
+def test_take_and_concat():
+    table = RowTable.from_records(RECORDS)
+
+    assert table.take(np.ones(3, dtype=bool)) is table
+    assert table.take([2, 0]).to_models() == [Row(**RECORDS[2]), Row(**RECORDS[0])]
+    assert [row.id for row in table.take(table.column("name") == "a")] == [1, 3]
+
+    assert table.concat([]) is table
+    combined = table.take([0]).concat([Row(id=4, name="c")])
+    assert [row.id for row in combined] == [1, 4]
+
+
+def test_columns_must_have_the_same_length():
+    with pytest.raises(ValueError):
+        RowTable({"id": np.arange(2), "name": np.array(["a"], dtype=object)})
+
+
+def test_pydantic_field():
+    holder = Holder(rows=[Row(id=1, name="a")])
+    assert isinstance(holder.rows, RowTable)
+    assert len(Holder(rows=RECORDS).rows) == 3
+
+    assert holder.model_dump() == {
+        "rows": [{"id": 1, "name": "a", "value": None, "count": None, "flag": False, "created": None}]
+    }
+    assert holder.model_copy(update={"rows": holder.rows}).rows is holder.rows
+
+
+def test_to_glue_data():
+    data = RowTable.from_records(RECORDS).to_glue_data(label="rows", ignore_components=["created"])
+
+    assert data.label == "rows"
+    np.testing.assert_array_equal(data["id"], [1, 2, 3])
+    assert "created" not in [component.label for component in data.components]
+
+
+def test_to_glue_data_matches_models_to_glue_data():
+    rows = [Row(id=1, name="a", value=1.5, count=3), Row(id=2, name="b", value=2.5, count=4)]
+    data = RowTable.from_models(rows).to_glue_data(ignore_components=["created"])
+    expected = models_to_glue_data(rows, ignore_components=["created"])
+
+    labels = [component.label for component in expected.main_components]
+    assert [component.label for component in data.main_components] == labels
+    for label in labels:
+        np.testing.assert_array_equal(data[label], expected[label])
+        if expected[label].dtype.kind != "U":
+            assert data[label].dtype == expected[label].dtype, label
+
+    # A missing optional integer keeps the column as floats
+    rows.append(Row(id=3, name="c"))
+    data = RowTable.from_models(rows).to_glue_data()
+    np.testing.assert_array_equal(data["count"], [3, 4, np.nan])
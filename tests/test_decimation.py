@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from hubbleds.decimation import decimate, lttb_indices, minmax_indices
+
+
+def _spectrum(n=4000):
+    x = np.linspace(3800, 9200, n)
+    y = np.ones(n)
+    # A narrow absorption line and a narrow emission line
+    y[n * 3 // 10] = -5
+    y[n * 6 // 10] = 7
+    return x, y
+
+
+def test_short_input_is_unchanged():
+    x, y = _spectrum(100)
+    wave, flux = decimate(x, y, 1000)
+    np.testing.assert_array_equal(wave, x)
+    np.testing.assert_array_equal(flux, y)
+
+
+@pytest.mark.parametrize("n_out", [10, 101, 1000])
+def test_minmax_keeps_extremes_and_ends(n_out):
+    x, y = _spectrum()
+    indices = minmax_indices(y, n_out)
+
+    assert len(indices) <= n_out + 2
+    assert np.all(np.diff(indices) > 0)
+    assert {0, len(y) - 1, 1200, 2400} <= set(indices.tolist())
+
+
+def test_lttb_keeps_requested_points():
+    x, y = _spectrum()
+    indices = lttb_indices(x, y, 500)
+
+    assert len(indices) == 500
+    assert indices[0] == 0 and indices[-1] == len(y) - 1
+    assert np.all(np.diff(indices) > 0)
+    assert {1200, 2400} <= set(indices.tolist())
+
+
+def test_x_range_keeps_the_window_and_its_neighbours():
+    x, y = _spectrum()
+    low, high = x[1000], x[1500]
+    wave, flux = decimate(x, y, 1000, x_range=[high, low])
+
+    # Every sample of the window is kept, plus one on either side
+    np.testing.assert_array_equal(wave, x[999:1502])
+    np.testing.assert_array_equal(flux, y[999:1502])
+
+
+def test_x_range_at_the_edges():
+    x, y = _spectrum()
+    wave, _ = decimate(x, y, 10_000, x_range=[0, x[10]])
+    np.testing.assert_array_equal(wave, x[:12])
+
+    wave, _ = decimate(x, y, 10_000, x_range=[x[-10], 1e6])
+    np.testing.assert_array_equal(wave, x[-11:])
+
+
+def test_lttb_method():
+    x, y = _spectrum()
+    wave, flux = decimate(x, y, 300, method="lttb")
+    assert len(wave) == len(flux) == 300
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from hubbleds import galaxy_catalog
+from hubbleds.galaxy_catalog import GalaxyCatalog, GalaxyCatalogCache
+from hubbleds.state import GalaxyData
+
+
+def _galaxies(*ids):
+    return [
+        GalaxyData(id=i, name=f"galaxy {i}", ra=0, decl=0, z=0.01, type="Sp", element="H-α")
+        for i in ids
+    ]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(galaxy_catalog.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_catalog_index():
+    catalog = GalaxyCatalog(_galaxies(1, 2, 3))
+    assert len(catalog) == 3
+    assert catalog.get(2).name == "galaxy 2"
+    assert catalog.get(4) is None
+
+
+def test_catalog_expires_after_ttl(clock):
+    cache = GalaxyCatalogCache(ttl=60)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return _galaxies(len(loads))
+
+    first = cache.get("Sp", load)
+    clock[0] += 59
+    assert cache.get("Sp", load) is first
+
+    clock[0] += 1
+    second = cache.get("Sp", load)
+    assert second is not first
+    assert second.get(2) is not None
+    assert len(loads) == 2
+
+
+def test_concurrent_gets_load_once():
+    cache = GalaxyCatalogCache(ttl=60)
+    loads = []
+    start = threading.Barrier(8)
+
+    def load():
+        loads.append(1)
+        time.sleep(0.05)
+        return _galaxies(1, 2)
+
+    catalogs = []
+
+    def get():
+        start.wait()
+        catalogs.append(cache.get("Sp", load))
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(2)
+
+    assert len(loads) == 1
+    assert len(catalogs) == 8
+    assert all(catalog is catalogs[0] for catalog in catalogs)
+
+
+def test_failed_refresh_serves_the_stale_copy(clock):
+    cache = GalaxyCatalogCache(ttl=60)
+    catalog = cache.get("Sp", lambda: _galaxies(1))
+
+    def fail():
+        raise ConnectionError("API is down")
+
+    clock[0] += 120
+    assert cache.get("Sp", fail) is catalog
+
+    # Without a cached copy the error is raised
+    with pytest.raises(ConnectionError):
+        cache.get("other", fail)
+
+
+def test_invalidate():
+    cache = GalaxyCatalogCache(ttl=60)
+    catalog = cache.get("Sp", lambda: _galaxies(1))
+    cache.invalidate("Sp")
+    assert cache.get("Sp", lambda: _galaxies(1)) is not catalog
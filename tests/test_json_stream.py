@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from hubbleds.json_stream import iter_json_object
+
+DOCUMENT = {
+    "measurements": [{"id": 1, "unit": "km / s", "value": 12.5}, {"id": 2, "name": "Ω"}],
+    "empty": [],
+    "count": 12345,
+    "nested": {"a": [1, 2]},
+    "studentData": [[1, 2], None],
+}
+
+
+def _chunks(text: str, size: int, encode: bool = True):
+    data = text.encode("utf-8") if encode else text
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 1024])
+@pytest.mark.parametrize("encode", [True, False])
+def test_iter_json_object(size, encode):
+    text = json.dumps(DOCUMENT, ensure_ascii=False, indent=1)
+    keys = set()
+
+    items = list(iter_json_object(_chunks(text, size, encode), keys))
+
+    assert items == [
+        ("measurements", DOCUMENT["measurements"][0]),
+        ("measurements", DOCUMENT["measurements"][1]),
+        ("count", 12345),
+        ("nested", {"a": [1, 2]}),
+        ("studentData", [1, 2]),
+        ("studentData", None),
+    ]
+    # Empty arrays yield nothing but their keys are still seen
+    assert keys == set(DOCUMENT)
+
+
+def test_numbers_split_across_chunks():
+    assert list(iter_json_object(['{"a": 12', '34, "b": [5', '6]}'])) == [
+        ("a", 1234), ("b", 56)
+    ]
+
+
+def test_empty_object():
+    assert list(iter_json_object([b"{ }"])) == []
+
+
+@pytest.mark.parametrize("text", ['[1, 2]', '{"a": [1, 2}', '{"a": 1', ''])
+def test_invalid_documents(text):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_object(_chunks(text, 3)))
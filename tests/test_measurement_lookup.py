@@ -0,0 +1,59 @@
+from hubbleds.state import GalaxyData, LocalState, StudentMeasurement
+
+
+def _measurement(galaxy_id, measurement_number=None, **values):
+    galaxy = GalaxyData(
+        id=galaxy_id, name=f"galaxy {galaxy_id}", ra=0, decl=0, z=0.01, type="Sp", element="H-α"
+    )
+    return StudentMeasurement(
+        student_id=1, galaxy=galaxy, measurement_number=measurement_number, **values
+    )
+
+
+def test_replacing_the_list():
+    state = LocalState(measurements=[_measurement(1), _measurement(2)])
+    assert state.get_measurement_index(2) == 1
+    assert state.get_measurement_index(3) is None
+
+    state = state.model_copy(update={"measurements": [_measurement(3), _measurement(1)]})
+    assert state.get_measurement_index(1) == 1
+    assert state.get_measurement_index(3) == 0
+    assert state.get_measurement_index(2) is None
+    assert state.get_measurement(3).galaxy_id == 3
+
+
+def test_appending():
+    state = LocalState(measurements=[_measurement(1)])
+    assert state.get_measurement_index(2) is None
+
+    state.measurements.append(_measurement(2))
+    assert state.get_measurement_index(2) == 1
+
+
+def test_replacing_an_item_in_place():
+    state = LocalState(measurements=[_measurement(1), _measurement(2), _measurement(3)])
+    assert state.get_measurement_index(2) == 1
+
+    state.measurements[1] = _measurement(9)
+    assert state.get_measurement_index(9) == 1
+    assert state.get_measurement_index(2) is None
+    assert state.get_measurement_index(3) == 2
+
+
+def test_example_measurements_are_keyed_by_number():
+    state = LocalState(example_measurements=[
+        _measurement(1, "first"), _measurement(1, "second"), _measurement(2, "first")
+    ])
+    assert state.get_example_measurement_index(1) == 0
+    assert state.get_example_measurement_index(1, "second") == 1
+    assert state.get_example_measurement_index(2, "second") is None
+    assert state.get_example_measurement(2).galaxy_id == 2
+
+    state.example_measurements[0] = _measurement(1, "second", velocity_value=100.0)
+    assert state.get_example_measurement_index(1, "first") is None
+    assert state.get_example_measurement_index(1, "second") == 0
+
+
+def test_first_position_wins():
+    state = LocalState(measurements=[_measurement(1), _measurement(1, velocity_value=5.0)])
+    assert state.get_measurement(1).velocity_value is None
@@ -0,0 +1,67 @@
+import numpy as np
+import plotly.graph_objects as go
+
+from hubbleds.components.spectrum_viewer.plotly_figure import diff_properties
+
+
+def test_unchanged_properties_are_left_out():
+    old = {"type": "scatter", "x": np.arange(5), "line": {"color": "red", "width": 2}}
+    new = {"type": "scatter", "x": np.arange(5), "line": {"color": "blue", "width": 2}}
+
+    assert diff_properties(new, old) == {"line": {"color": "blue"}}
+    assert diff_properties(old, old) == {}
+
+
+def test_arrays_are_compared_by_value():
+    old = {"x": np.arange(5), "y": [1, 2, 3]}
+    new = {"x": np.arange(6), "y": [1, 2, 3]}
+
+    diff = diff_properties(new, old)
+    assert list(diff) == ["x"]
+    np.testing.assert_array_equal(diff["x"], np.arange(6))
+
+
+def test_missing_leaves_are_cleared():
+    old = {"x": [1], "name": "spectrum", "uid": "abc", "line": {"color": "red", "dash": "dot"}}
+    new = {"x": [1], "line": {"color": "red"}}
+
+    assert diff_properties(new, old, keep={"uid"}) == {
+        "name": None,
+        "line": {"dash": None},
+    }
+    assert diff_properties(new, old, clear_missing=False) == {}
+
+
+def test_missing_subtrees_are_cleared_leaf_by_leaf():
+    old = {"marker": {"color": "red", "line": {"width": 1}}, "showlegend": None}
+    new = {}
+
+    # Never `{"marker": None}`, which would drop the whole subtree
+    assert diff_properties(new, old) == {"marker": {"color": None, "line": {"width": None}}}
+
+
+def test_layout_patch_keeps_the_zoom_range():
+    widget = go.Figure(layout=dict(title="Spectrum", xaxis=dict(range=[4000, 5000], title="Wavelength")))
+    new = go.Figure(layout=dict(title="Galaxy 2", xaxis=dict(title="Wavelength (Å)")))
+
+    changes = diff_properties(
+        new.layout.to_plotly_json(), widget.layout.to_plotly_json(), clear_missing=False
+    )
+    widget.layout.update(changes)
+
+    assert widget.layout.title.text == "Galaxy 2"
+    assert widget.layout.xaxis.title.text == "Wavelength (Å)"
+    assert list(widget.layout.xaxis.range) == [4000, 5000]
+
+
+def test_trace_patch_applies_to_a_figure():
+    widget = go.Figure(go.Scatter(x=[1, 2, 3], y=[1, 2, 3], name="old", line=dict(dash="dot")))
+    new = go.Scatter(x=[1, 2, 3], y=[3, 2, 1], line=dict(color="red"))
+
+    trace = widget.data[0]
+    trace.update(diff_properties(new.to_plotly_json(), trace.to_plotly_json(), keep={"uid"}))
+
+    assert list(trace.y) == [3, 2, 1]
+    assert trace.name is None
+    assert trace.line.dash is None
+    assert trace.line.color == "red"
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import math
+from types import SimpleNamespace
+
+import pytest
+from starlette.requests import Request
+
+from hubbleds import profiling, server
+from hubbleds.profiling import (
+    NO_ROUTE,
+    PROFILER,
+    Histogram,
+    Profiler,
+    profiled,
+    profiled_page,
+)
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_ENABLED", True)
+    PROFILER.reset()
+    yield
+    PROFILER.reset()
+
+
+@pytest.fixture
+def session(monkeypatch):
+    """Switches the current kernel context between fake sessions."""
+    closers = {}
+    current = SimpleNamespace(context=None)
+
+    def _get_current_context():
+        if current.context is None:
+            raise RuntimeError("No kernel context")
+        return current.context
+
+    def _use(context_id):
+        current.context = SimpleNamespace(
+            id=context_id, on_close=closers.setdefault(context_id, []).append
+        )
+
+    monkeypatch.setattr(profiling.kernel_context, "get_current_context", _get_current_context)
+    _use.closers = closers
+    return _use
+
+
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(0.01, 0.1, 1.0, math.inf))
+    assert math.isnan(histogram.quantile(0.5))
+
+    for seconds in [0.005] * 5 + [0.05] * 4 + [0.5]:
+        histogram.observe(seconds)
+
+    assert histogram.quantile(0.5) == 0.01
+    assert histogram.quantile(0.9) == 0.1
+    # The top bucket is capped at the slowest observation
+    assert histogram.quantile(0.99) == 0.5
+
+    summary = histogram.as_dict()
+    assert summary["count"] == 10
+    assert summary["max"] == 0.5
+    assert summary["mean"] == pytest.approx(0.0725)
+    assert summary["buckets"] == {"0.01": 5, "0.1": 4, "1.0": 1, "inf": 0}
+    assert math.isnan(Histogram().as_dict()["mean"])
+
+
+def test_timings_are_filed_under_the_session_route(session):
+    profiler = Profiler()
+    profiler.record("api", "get_measurements", 0.1)
+
+    session("a")
+    profiler.set_route("01-spectra-&-velocity")
+    profiler.record("api", "get_measurements", 0.2)
+
+    session("b")
+    profiler.record("callback", "on_change", 0.3)
+    profiler.set_route("04-explore-data")
+    profiler.record("callback", "on_change", 0.4, route="intro")
+
+    snapshot = profiler.snapshot()
+    assert snapshot[NO_ROUTE]["api"]["get_measurements"]["count"] == 1
+    assert snapshot[NO_ROUTE]["callback"]["on_change"]["count"] == 1
+    assert snapshot["01-spectra-&-velocity"]["api"]["get_measurements"]["max"] == 0.2
+    assert snapshot["intro"]["callback"]["on_change"]["max"] == 0.4
+
+    # A closed session's route is forgotten
+    session.closers["a"][0]()
+    session("a")
+    assert profiler.current_route() == NO_ROUTE
+
+    profiler.reset()
+    assert profiler.snapshot() == {}
+
+
+def test_profiled(enabled):
+    @profiled("api")
+    def add(a, b):
+        return a + b
+
+    @profiled("api", "slow_add")
+    async def slow_add(a, b):
+        await asyncio.sleep(0.01)
+        return a + b
+
+    assert add(1, 2) == 3
+    assert add.__name__ == "add"
+    assert asyncio.run(slow_add(1, 2)) == 3
+
+    timings = PROFILER.snapshot()[NO_ROUTE]["api"]
+    assert timings["test_profiling.test_profiled.add"]["count"] == 1
+    assert timings["slow_add"]["count"] == 1
+    # The coroutine is timed until it finishes, not until it is created
+    assert timings["slow_add"]["max"] >= 0.01
+
+
+def test_profiled_page(enabled, session):
+    def Page():
+        PROFILER.record("glue_setup", "setup", 0.1)
+
+    Page.__module__ = "hubbleds.pages.02-distance-introduction"
+    session("a")
+    profiled_page(Page)()
+
+    snapshot = PROFILER.snapshot()["02-distance-introduction"]
+    assert snapshot["render"]["Page"]["count"] == 1
+    assert snapshot["glue_setup"]["setup"]["count"] == 1
+
+
+def test_profiling_is_opt_in(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_ENABLED", False)
+
+    def func():
+        pass
+
+    assert profiled("api")(func) is func
+    assert profiled_page(func) is func
+
+
+def _get_profile(query: str = ""):
+    request = Request({
+        "type": "http", "method": "GET", "path": "/profile",
+        "query_string": query.encode(), "headers": [],
+    })
+    response = server.profile(request)
+    return response.status_code, json.loads(response.body)
+
+
+def test_profile_endpoint(monkeypatch, enabled):
+    monkeypatch.setattr(server, "PROFILING_ENABLED", False)
+    assert _get_profile()[0] == 404
+
+    monkeypatch.setattr(server, "PROFILING_ENABLED", True)
+    PROFILER.record("api", "get_measurements", 0.1, route="intro")
+    status, snapshot = _get_profile("reset=1")
+    assert status == 200
+    assert snapshot["intro"]["api"]["get_measurements"]["count"] == 1
+
+    # Reset after the snapshot was taken
+    assert _get_profile() == (200, {})
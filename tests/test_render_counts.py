@@ -0,0 +1,173 @@
+from types import SimpleNamespace
+
+import pytest
+import solara
+from solara.toestand import Ref
+
+from hubbleds import render_counts as render_counts_module
+from hubbleds.render_counts import (
+    render_counts,
+    render_counts_to_prometheus,
+    reset_render_counts,
+    use_render_count,
+)
+from hubbleds.state import (
+    LOCAL_STATE,
+    MEASUREMENT_STATE,
+    RESPONSE_STATE,
+    UI_STATE,
+    GalaxyData,
+    LocalState,
+    StudentMeasurement,
+    fr_callback,
+    get_free_response,
+    mc_callback,
+    question_completed,
+)
+
+COMPONENT_STATE = SimpleNamespace(value=SimpleNamespace(stage_id="spectra_&_velocity"))
+
+
+@pytest.fixture(autouse=True)
+def reset(monkeypatch):
+    monkeypatch.setattr(render_counts_module, "PROFILING_ENABLED", True)
+    LOCAL_STATE.set(LocalState())
+    reset_render_counts()
+    yield
+    LOCAL_STATE.set(LocalState())
+    reset_render_counts()
+
+
+def _galaxy(galaxy_id):
+    return GalaxyData(
+        id=galaxy_id, name=f"galaxy {galaxy_id}", ra=0, decl=0, z=0.01, type="Sp", element="H-α"
+    )
+
+
+# Stand-ins for the parts of stage 1, each reading the state the way its
+#  counterpart does: through LOCAL_STATE.value as before the slices, or
+#  through the slice the page now uses
+
+@solara.component
+def WholeState():
+    use_render_count("whole")
+    local_state = LOCAL_STATE.value
+    return solara.Text(f"{len(local_state.measurements)} {local_state.show_snackbar}")
+
+
+@solara.component
+def MeasurementTable():
+    use_render_count("measurements")
+    return solara.Text(str(len(MEASUREMENT_STATE.measurements)))
+
+
+@solara.component
+def Snackbar():
+    use_render_count("snackbar")
+    return solara.Text(UI_STATE.snackbar_message if UI_STATE.show_snackbar else "")
+
+
+@solara.component
+def Piggybank():
+    use_render_count("piggybank")
+    return solara.Text(str(RESPONSE_STATE.piggybank_total))
+
+
+@solara.component
+def Gate():
+    use_render_count("gate")
+    return solara.Text(str(question_completed("fr-1")))
+
+
+@solara.component
+def Stage1():
+    with solara.Column() as main:
+        WholeState()
+        MeasurementTable()
+        Snackbar()
+        Piggybank()
+        Gate()
+    return main
+
+
+def _walk_through_stage_1():
+    # Questions on the page are initialized when they are shown
+    get_free_response(LOCAL_STATE, COMPONENT_STATE, "fr-1")
+    get_free_response(LOCAL_STATE, COMPONENT_STATE, "fr-2")
+
+    measurements = Ref(LOCAL_STATE.fields.measurements)
+    show_snackbar = Ref(LOCAL_STATE.fields.show_snackbar)
+    snackbar_message = Ref(LOCAL_STATE.fields.snackbar_message)
+    for galaxy_id in range(5):
+        measurements.set(measurements.value + [StudentMeasurement(student_id=0, galaxy=_galaxy(galaxy_id))])
+        show_snackbar.set(True)
+        snackbar_message.set(f"Added galaxy {galaxy_id}")
+        show_snackbar.set(False)
+
+    # Typing answers, one update per keystroke
+    for response in ("b", "be", "bec"):
+        fr_callback(("fr-update", {"tag": "fr-2", "response": response}), LOCAL_STATE, COMPONENT_STATE)
+    fr_callback(("fr-update", {"tag": "fr-1", "response": "because"}), LOCAL_STATE, COMPONENT_STATE)
+
+    mc_callback(("mc-initialize-response", "mc-1"), LOCAL_STATE, COMPONENT_STATE)
+    mc_callback(
+        ("mc-score", {"tag": "mc-1", "score": 10, "choice": 2, "tries": 1, "wrong_attempts": 0}),
+        LOCAL_STATE,
+        COMPONENT_STATE,
+    )
+
+
+def test_stage_1_walkthrough():
+    updates = []
+    unsubscribe = LOCAL_STATE.subscribe(updates.append)
+    _, rc = solara.render(Stage1(), handle_error=False)
+    try:
+        assert render_counts() == {
+            "whole": 1, "measurements": 1, "snackbar": 1, "piggybank": 1, "gate": 1
+        }
+        _walk_through_stage_1()
+    finally:
+        rc.close()
+        unsubscribe()
+
+    # 2 new questions, 5 * 4 measurement and snackbar updates, 4 answers,
+    #  and the multiple choice question's creation, score and piggybank
+    assert len(updates) == 29
+    assert render_counts() == {
+        # Re-renders on every update
+        "whole": 1 + len(updates),
+        "measurements": 1 + 5,
+        # The message is only shown while the snackbar is
+        "snackbar": 1 + 5 * 3,
+        "piggybank": 1 + 1,
+        # Every response change until fr-1 exists, then only fr-1's
+        "gate": 1 + 1 + 1,
+    }
+
+
+def test_counting_is_opt_in(monkeypatch):
+    monkeypatch.setattr(render_counts_module, "PROFILING_ENABLED", False)
+    assert use_render_count("page") == 0
+    assert render_counts() == {}
+    assert render_counts_to_prometheus() == ""
+
+
+def test_reset_render_counts():
+    assert use_render_count("page") == 1
+    assert use_render_count("page") == 2
+    reset_render_counts()
+    assert render_counts() == {}
+    assert use_render_count("page") == 1
+
+
+def test_render_counts_to_prometheus():
+    use_render_count("intro")
+    use_render_count("intro")
+    use_render_count('say "hi"')
+
+    lines = render_counts_to_prometheus().splitlines()
+    assert lines[1] == "# TYPE hubbleds_renders_total counter"
+    assert lines[2:] == [
+        'hubbleds_renders_total{component="intro"} 2',
+        'hubbleds_renders_total{component="say \\"hi\\""} 1',
+    ]
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import pytest
+import solara
+
+from hubbleds.state import (
+    LOCAL_STATE,
+    LocalState,
+    fr_callback,
+    get_free_response,
+    mc_callback,
+    question_completed,
+)
+
+COMPONENT_STATE = SimpleNamespace(value=SimpleNamespace(stage_id="stage-1"))
+
+
+@pytest.fixture(autouse=True)
+def local_state():
+    LOCAL_STATE.set(LocalState())
+    yield LOCAL_STATE
+    LOCAL_STATE.set(LocalState())
+
+
+def test_free_responses():
+    response = get_free_response(LOCAL_STATE, COMPONENT_STATE, "fr-1")
+    assert response == {"tag": "fr-1", "response": "", "initialized": True, "stage": "stage-1"}
+    assert not question_completed("fr-1")
+
+    fr_callback(("fr-update", {"tag": "fr-1", "response": "because"}), LOCAL_STATE, COMPONENT_STATE)
+
+    # The stored response is replaced, not modified
+    assert response["response"] == ""
+    assert get_free_response(LOCAL_STATE, COMPONENT_STATE, "fr-1")["response"] == "because"
+    assert question_completed("fr-1")
+
+
+def test_multiple_choice():
+    mc_callback(("mc-initialize-response", "mc-1"), LOCAL_STATE, COMPONENT_STATE)
+    assert not question_completed("mc-1")
+
+    mc_callback(
+        ("mc-score", {"tag": "mc-1", "score": 10, "choice": 2, "tries": 1, "wrong_attempts": 0}),
+        LOCAL_STATE,
+        COMPONENT_STATE,
+    )
+    assert question_completed("mc-1")
+    assert LOCAL_STATE.value.mc_scoring["scores"]["mc-1"]["stage"] == "stage-1"
+    assert LOCAL_STATE.value.piggybank_total == 10
+
+
+def test_unchanged_responses_dont_update_the_state():
+    get_free_response(LOCAL_STATE, COMPONENT_STATE, "fr-1")
+    state = LOCAL_STATE.value
+
+    get_free_response(LOCAL_STATE, COMPONENT_STATE, "fr-1")
+    assert LOCAL_STATE.value is state
+
+
+def test_gates_only_render_for_their_question():
+    renders = []
+
+    @solara.component
+    def Gate():
+        renders.append(question_completed("fr-1"))
+        return solara.Text("gate")
+
+    _, rc = solara.render(Gate(), handle_error=False)
+    try:
+        assert renders == [False]
+
+        get_free_response(LOCAL_STATE, COMPONENT_STATE, "fr-1")
+        get_free_response(LOCAL_STATE, COMPONENT_STATE, "fr-2")
+        count = len(renders)
+
+        fr_callback(("fr-update", {"tag": "fr-2", "response": "a"}), LOCAL_STATE, COMPONENT_STATE)
+        LOCAL_STATE.set(LOCAL_STATE.value.model_copy(update={"show_snackbar": True}))
+        assert len(renders) == count
+
+        fr_callback(("fr-update", {"tag": "fr-1", "response": "b"}), LOCAL_STATE, COMPONENT_STATE)
+        assert renders[count:] == [True]
+    finally:
+        rc.close()
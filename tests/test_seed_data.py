@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from hubbleds.seed_data import SeedTable, get_seed_table, tutorial_mask
+
+
+def test_tutorial_mask_is_reproducible():
+    velocities = np.linspace(0, 20_000, 1000)
+
+    mask = tutorial_mask(velocities)
+    np.testing.assert_array_equal(mask, tutorial_mask(velocities))
+    assert not np.array_equal(mask, tutorial_mask(velocities, seed=7))
+
+    # Drawing doesn't touch the global random state
+    np.random.seed(0)
+    expected = np.random.random()
+    np.random.seed(0)
+    tutorial_mask(velocities)
+    assert np.random.random() == expected
+
+
+def test_tutorial_mask_thins_correct_velocities():
+    size = 20_000
+    incorrect = tutorial_mask(np.full(size, 5_000.0))
+    correct = tutorial_mask(np.full(size, 11_150.0))
+
+    assert incorrect.mean() == pytest.approx(0.7, abs=0.02)
+    assert correct.mean() == pytest.approx(0.7 * 0.75, abs=0.02)
+    # Thinning only ever removes rows
+    assert not (correct & ~incorrect).any()
+
+    assert tutorial_mask(np.array([])).shape == (0,)
+
+
+def test_seed_table_partitions():
+    table = SeedTable({
+        "measurement_number": np.array(["first", "second", "first"]),
+        "velocity_value": np.array([5_000.0, 11_150.0, 12_000.0]),
+    })
+
+    assert len(table) == 3
+    assert table.columns("first")["velocity_value"].tolist() == [5_000.0, 12_000.0]
+    assert table.columns("second")["velocity_value"].tolist() == [11_150.0]
+    assert table.records("second") == [
+        {"measurement_number": "second", "velocity_value": 11_150.0}
+    ]
+
+    expected = tutorial_mask(table.columns()["velocity_value"])
+    assert len(table.columns("tutorial")["velocity_value"]) == expected.sum()
+
+    with pytest.raises(ValueError):
+        table.columns("third")
+    with pytest.raises(ValueError):
+        table.columns()["velocity_value"][0] = 0
+
+
+def test_seed_table_is_loaded_once():
+    table = get_seed_table()
+    assert get_seed_table() is table
+    assert 209 not in table.columns()["class_id"]
+    assert len(table) == sum(
+        len(table.columns(which)["student_id"]) for which in ("first", "second")
+    )
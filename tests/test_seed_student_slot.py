@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from glue.core import Data, DataCollection
+from glue.core.hub import HubListener
+from glue.core.message import NumericalDataChangedMessage
+
+from hubbleds.data_management import EXAMPLE_GALAXY_SEED_DATA
+from hubbleds.stage_one_and_three_setup import (
+    SEED_STUDENT_SLOT,
+    _update_seed_data_with_examples,
+)
+from hubbleds.state import GLOBAL_STATE, StudentMeasurement
+
+LABEL = EXAMPLE_GALAXY_SEED_DATA + "_first"
+
+
+@pytest.fixture
+def student_id():
+    return GLOBAL_STATE.value.student.id
+
+
+@pytest.fixture
+def gjapp(student_id):
+    data = Data(
+        label=LABEL,
+        student_id=np.array([1, student_id, 2]),
+        velocity_value=np.array([100.0, 200.0, 300.0]),
+    )
+    return SimpleNamespace(data_collection=DataCollection([data]))
+
+
+def _examples(student_id, *velocities):
+    return [
+        StudentMeasurement(student_id=student_id, measurement_number=number, velocity_value=velocity)
+        for number, velocity in zip(("first", "second"), velocities)
+    ]
+
+
+def _values(gjapp, label):
+    return gjapp.data_collection[LABEL][label].tolist()
+
+
+def test_no_row_without_both_examples(gjapp, student_id):
+    for examples in ([], _examples(student_id, 500.0)):
+        _update_seed_data_with_examples(gjapp, examples)
+
+        # Only the student's own seed row is dropped, however often it's updated
+        assert _values(gjapp, "student_id") == [1, 2]
+        assert gjapp.data_collection[LABEL].meta[SEED_STUDENT_SLOT] is None
+
+
+def test_second_example_fills_the_slot(gjapp, student_id, monkeypatch):
+    _update_seed_data_with_examples(gjapp, _examples(student_id, 500.0, 600.0))
+    assert _values(gjapp, "velocity_value") == [100.0, 300.0, 600.0]
+    data = gjapp.data_collection[LABEL]
+    assert data.meta[SEED_STUDENT_SLOT] == 2
+
+    # Changes are patched into the same row, without rebuilding the data
+    messages = []
+    listener = HubListener()
+    gjapp.data_collection.hub.subscribe(
+        listener, NumericalDataChangedMessage, handler=messages.append
+    )
+    rebuilds = []
+    monkeypatch.setattr(data, "update_values_from_data", rebuilds.append)
+
+    _update_seed_data_with_examples(gjapp, _examples(student_id, 500.0, 650.0))
+    assert _values(gjapp, "velocity_value") == [100.0, 300.0, 650.0]
+    assert rebuilds == []
+    assert len(messages) == 1
+    assert [c.label for c in messages[0].components_changed] == ["velocity_value"]
+
+    # Nothing is sent when nothing changed
+    _update_seed_data_with_examples(gjapp, _examples(student_id, 500.0, 650.0))
+    assert len(messages) == 1
+
+
+def test_slot_is_dropped_with_the_examples(gjapp, student_id):
+    _update_seed_data_with_examples(gjapp, _examples(student_id, 500.0, 600.0))
+    _update_seed_data_with_examples(gjapp, _examples(student_id, 500.0))
+    assert _values(gjapp, "student_id") == [1, 2]
+
+    _update_seed_data_with_examples(gjapp, _examples(student_id, 500.0, 700.0))
+    assert _values(gjapp, "velocity_value") == [100.0, 300.0, 700.0]
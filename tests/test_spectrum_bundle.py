@@ -0,0 +1,45 @@
+import numpy as np
+
+from hubbleds.decimation import minmax_decimate
+from hubbleds.spectrum_bundle import SpectrumBundle, build_spectrum_bundle
+from hubbleds.state import GalaxyData
+
+
+def _galaxy(galaxy_id):
+    return GalaxyData(
+        id=galaxy_id, name=f"{galaxy_id}.fits", ra=0, decl=0, z=0.01, type="Sp", element="H-α"
+    )
+
+
+def _spectrum(galaxy):
+    wave = np.linspace(3800, 9200, 4000)
+    flux = np.sin(wave / (100 + galaxy.id))
+    return {"wave": wave, "flux": flux, "ivar": np.ones_like(wave)}
+
+
+def test_bundle_round_trip(tmp_path):
+    galaxies = [_galaxy(1), _galaxy(2), _galaxy(3)]
+
+    def _fetch(galaxy):
+        # Galaxies without a spectrum are left out
+        return None if galaxy.id == 3 else _spectrum(galaxy)
+
+    path = tmp_path / "spectra.bundle"
+    assert build_spectrum_bundle(path, "hubbles_law", galaxies, _fetch, display_points=200) == 2
+
+    bundle = SpectrumBundle(path)
+    assert bundle.story_id == "hubbles_law"
+    assert bundle.display_points == 200
+    assert len(bundle) == 2
+    assert bundle.get("Sp", "3.fits") is None
+
+    expected = _spectrum(galaxies[1])
+    arrays = bundle.get("Sp", "2.fits")
+    for column in ("wave", "flux", "ivar"):
+        np.testing.assert_allclose(arrays[column], expected[column], rtol=1e-6)
+
+    display = bundle.get_display("Sp", "2.fits")
+    expected_wave, expected_flux = minmax_decimate(expected["wave"], expected["flux"], 200)
+    np.testing.assert_allclose(display["wave"], expected_wave, rtol=1e-6)
+    np.testing.assert_allclose(display["flux"], expected_flux, rtol=1e-6, atol=1e-7)
+    assert len(display["wave"]) <= 202
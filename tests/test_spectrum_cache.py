@@ -0,0 +1,94 @@
+import threading
+
+import numpy as np
+
+from hubbleds import spectrum_cache
+from hubbleds.spectrum_cache import SpectrumCache
+
+
+def _fits_like_arrays(size=100):
+    # Big-endian views into one shared record buffer, as decoded from FITS
+    records = np.zeros(size, dtype=[("wave", ">f8"), ("flux", ">f4"), ("ivar", ">f4"), ("extra", ">f8", 8)])
+    records["wave"] = np.linspace(3800, 9200, size)
+    records["flux"] = 1
+    return {name: records[name] for name in ("wave", "flux", "ivar")}
+
+
+def test_memory_tier_holds_native_copies(tmp_path):
+    cache = SpectrumCache(directory=tmp_path)
+    arrays = cache.get_or_load("galaxy", _fits_like_arrays)
+
+    for column in arrays.values():
+        assert column.dtype == np.float64
+        assert column.dtype.isnative
+        assert column.flags.c_contiguous
+        assert column.base is None
+    assert cache._memory_bytes == 3 * 100 * 8
+    assert cache.get("galaxy") is arrays
+
+
+def test_disk_tier_round_trip(tmp_path):
+    cache = SpectrumCache(directory=tmp_path)
+    arrays = cache.get_or_load("galaxy", _fits_like_arrays)
+
+    cache.clear_memory()
+    reloaded = cache.get("galaxy")
+    assert cache.disk_hits == 1
+    for name, column in arrays.items():
+        np.testing.assert_array_equal(reloaded[name], column)
+
+
+def test_lru_evicts_by_bytes():
+    cache = SpectrumCache(directory=None, max_bytes=2 * 3 * 100 * 8)
+    for key in range(3):
+        cache.get_or_load(key, _fits_like_arrays)
+
+    assert cache.get(0) is None
+    assert cache.get(1) is not None and cache.get(2) is not None
+
+
+def test_failed_disk_write_removes_temporary_file(tmp_path, monkeypatch):
+    def _fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(spectrum_cache.np, "save", _fail)
+    cache = SpectrumCache(directory=tmp_path)
+
+    assert cache.get_or_load("galaxy", _fits_like_arrays) is not None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_concurrent_misses_share_one_load():
+    cache = SpectrumCache(directory=None)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def _load():
+        calls.append(1)
+        started.set()
+        release.wait(2)
+        return _fits_like_arrays()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_load("galaxy", _load)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    started.wait(2)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert len(calls) == 1
+    assert len(results) == 4 and all(r is results[0] for r in results)
+    assert cache._loads == {}
+
+
+def test_none_results_are_not_cached():
+    cache = SpectrumCache(directory=None)
+    assert cache.get_or_load("galaxy", lambda: None) is None
+    assert cache.get("galaxy") is None
+    assert cache._loads == {}
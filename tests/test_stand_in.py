@@ -0,0 +1,146 @@
+from types import SimpleNamespace
+
+import pytest
+from requests import HTTPError
+
+from hubbleds import remote
+from hubbleds.remote import LOCAL_API, LocalAPI
+from hubbleds.stand_in import StandInServer
+from hubbleds.state import GalaxyData, StudentMeasurement
+
+STORY_ID = "hubbles_law"
+STUDENT_ID = 7
+
+
+def _measurement(galaxy_id, measurement_number=None, student_id=STUDENT_ID):
+    galaxy = GalaxyData(
+        id=galaxy_id, name=f"galaxy {galaxy_id}", ra=0, decl=0, z=0.01, type="Sp", element="H-α"
+    )
+    return StudentMeasurement(
+        student_id=student_id,
+        galaxy=galaxy,
+        velocity_value=1000.0 * galaxy_id,
+        measurement_number=measurement_number,
+    )
+
+
+@pytest.fixture
+def states(monkeypatch):
+    global_state = SimpleNamespace(
+        value=SimpleNamespace(update_db=True, student=SimpleNamespace(id=STUDENT_ID))
+    )
+    local_state = SimpleNamespace(
+        value=SimpleNamespace(story_id=STORY_ID, measurements=[], example_measurements=[])
+    )
+    monkeypatch.setattr(remote, "GLOBAL_STATE", global_state)
+    monkeypatch.setattr(LocalAPI, "is_educator", False)
+    return global_state, local_state
+
+
+@pytest.fixture
+def use_server():
+    def _use(server):
+        LOCAL_API.use_session(server)
+        return server
+
+    yield _use
+    LOCAL_API.use_session(None)
+
+
+def test_put_measurements_bulk(states, use_server):
+    server = use_server(StandInServer())
+    measurements = [_measurement(galaxy_id) for galaxy_id in range(1, 6)]
+
+    assert LOCAL_API.put_measurements(*states, measurements)
+
+    assert server.requests == [("PUT", f"/{STORY_ID}/submit-measurements/")]
+    stored = server.measurements[(STORY_ID, STUDENT_ID)]
+    assert sorted(key[0] for key in stored) == [1, 2, 3, 4, 5]
+    assert stored[(3, None)]["velocity_value"] == 3000.0
+
+
+@pytest.mark.parametrize("missing_status", [404, 405])
+def test_put_measurements_falls_back_to_single_requests(states, use_server, missing_status):
+    server = use_server(StandInServer(bulk_enabled=False, missing_status=missing_status))
+    measurements = [_measurement(galaxy_id) for galaxy_id in range(1, 4)]
+
+    assert LOCAL_API.put_measurements(*states, measurements)
+    assert server.requests == [
+        ("PUT", f"/{STORY_ID}/submit-measurements/"),
+    ] + [("PUT", f"/{STORY_ID}/submit-measurement/")] * 3
+    assert len(server.measurements[(STORY_ID, STUDENT_ID)]) == 3
+
+    # The missing bulk endpoint isn't tried again
+    server.requests.clear()
+    assert LOCAL_API.put_measurements(*states, measurements[:1])
+    assert server.requests == [("PUT", f"/{STORY_ID}/submit-measurement/")]
+
+
+def test_missing_bulk_endpoint_only_disables_itself(states, use_server):
+    server = use_server(StandInServer(sample_bulk_enabled=False))
+    examples = [_measurement(1, "first"), _measurement(1, "second")]
+
+    assert LOCAL_API.put_sample_measurements(*states, examples)
+    assert server.request_count("PUT") == 3
+    assert len(server.sample_measurements[(STORY_ID, STUDENT_ID)]) == 2
+
+    server.requests.clear()
+    assert LOCAL_API.put_measurements(*states, [_measurement(2), _measurement(3)])
+    assert server.requests == [("PUT", f"/{STORY_ID}/submit-measurements/")]
+
+
+def test_use_session_forgets_missing_bulk_endpoints(states, use_server):
+    use_server(StandInServer(bulk_enabled=False))
+    assert LOCAL_API.put_measurements(*states, [_measurement(1)])
+
+    server = use_server(StandInServer())
+    assert LOCAL_API.put_measurements(*states, [_measurement(1), _measurement(2)])
+    assert server.requests == [("PUT", f"/{STORY_ID}/submit-measurements/")]
+
+
+def test_stand_in_round_trip(states, use_server):
+    server = use_server(StandInServer())
+    LOCAL_API.put_measurements(*states, [_measurement(4)])
+
+    response = server.get(f"https://api/{STORY_ID}/measurements/{STUDENT_ID}")
+    assert response.status_code == 200
+    assert [m["galaxy_id"] for m in response.json()["measurements"]] == [4]
+    assert server.get(f"https://api/{STORY_ID}/unknown").status_code == 404
+
+
+def test_delete_measurement(states, use_server):
+    server = use_server(StandInServer())
+    LOCAL_API.put_measurements(*states, [_measurement(1), _measurement(2)])
+
+    assert LOCAL_API.delete_measurement(*states, 1)
+    assert list(server.measurements[(STORY_ID, STUDENT_ID)]) == [(2, None)]
+    assert not LOCAL_API.delete_measurement(*states, 1)
+
+
+def test_fetch_all_data(use_server):
+    server = use_server(StandInServer())
+    server.all_data[STORY_ID] = {
+        "measurements": [
+            {"student_id": 1, "class_id": 10, "velocity_value": 100.0},
+            {"student_id": 2, "class_id": None, "velocity_value": 200.0},
+        ],
+        "studentData": [{"student_id": 1, "hubble_fit_value": 70.0, "age_value": 14.0}],
+        "classData": [],
+    }
+
+    tables = LOCAL_API.fetch_all_data(STORY_ID)
+
+    # Measurements without a class are left out
+    assert [m.student_id for m in tables.measurements] == [1]
+    assert tables.student_summaries.column("hubble_fit_value").tolist() == [70.0]
+    assert len(tables.class_summaries) == 0
+
+
+def test_fetch_all_data_fails_on_bad_responses(use_server):
+    server = use_server(StandInServer())
+    with pytest.raises(HTTPError):
+        LOCAL_API.fetch_all_data(STORY_ID)
+
+    server.all_data[STORY_ID] = {"error": "Something went wrong"}
+    with pytest.raises(ValueError):
+        LOCAL_API.fetch_all_data(STORY_ID)
@@ -0,0 +1,60 @@
+import numpy as np
+
+from hubbleds.utils import create_single_summary, fit_line, grouped_slopes_through_origin
+
+
+def _slope(x, y):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    return (x * y).sum() / (x * x).sum()
+
+
+def test_grouped_slopes_through_origin():
+    ids = [3, 1, 3, 2, 1, 3]
+    x = [1.0, 2.0, 2.0, 4.0, 3.0, 3.0]
+    y = [70.0, 150.0, 130.0, 300.0, 210.0, 200.0]
+
+    unique_ids, slopes = grouped_slopes_through_origin(ids, x, y)
+
+    np.testing.assert_array_equal(unique_ids, [1, 2, 3])
+    np.testing.assert_allclose(slopes, [
+        _slope([2, 3], [150, 210]),
+        _slope([4], [300]),
+        _slope([1, 2, 3], [70, 130, 200]),
+    ])
+
+
+def test_grouped_slopes_ignore_missing_values():
+    ids = [1, 1, 1, 2, 2]
+    x = [1.0, np.nan, 2.0, None, 3.0]
+    y = [60.0, 100.0, None, 50.0, np.nan]
+
+    unique_ids, slopes = grouped_slopes_through_origin(ids, x, y)
+
+    np.testing.assert_array_equal(unique_ids, [1, 2])
+    assert slopes[0] == 60.0
+    # Nothing left to fit for the second group
+    assert np.isnan(slopes[1])
+
+
+def test_grouped_slopes_with_no_points():
+    unique_ids, slopes = grouped_slopes_through_origin([], [], [])
+    assert unique_ids.size == 0
+    assert slopes.size == 0
+
+
+def test_fit_line_through_origin():
+    line = fit_line([1.0, 2.0, np.nan, 3.0], [70.0, 150.0, 10.0, None])
+
+    assert line.slope.value == _slope([1, 2], [70, 150])
+    assert line.intercept.value == 0
+    np.testing.assert_allclose(line([0, 2]), [0, 2 * line.slope.value])
+    assert fit_line([np.nan, 0.0], [1.0, 0.0]) is None
+
+
+def test_single_summary_with_a_zero_slope():
+    h0, age = create_single_summary([1.0, 2.0], [0.0, 0.0])
+
+    assert h0 == 0
+    assert np.isinf(age)
+    assert np.isnan(create_single_summary([], [])).all()
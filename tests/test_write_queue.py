@@ -0,0 +1,116 @@
+import threading
+import time
+
+from hubbleds.write_queue import WriteBehindQueue
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_writes_are_coalesced():
+    queue = WriteBehindQueue(delay=0.05, max_delay=1)
+    written = []
+
+    for value in range(5):
+        queue.schedule("story", lambda value=value: written.append(value))
+    assert written == []
+
+    _wait_for(lambda: written)
+    time.sleep(0.1)
+    assert written == [4]
+    assert queue.metrics() == {
+        "requested": 5, "written": 1, "failed": 0, "pending": 0, "saved": 4
+    }
+
+
+def test_keys_are_written_separately():
+    queue = WriteBehindQueue(delay=10)
+    written = []
+
+    queue.schedule("a", lambda: written.append("a"))
+    queue.schedule("b", lambda: written.append("b"))
+    queue.schedule("a", lambda: written.append("a2"))
+    queue.flush(wait=True)
+
+    assert sorted(written) == ["a2", "b"]
+    assert queue.pending == 0
+
+
+def test_max_delay_forces_a_write():
+    queue = WriteBehindQueue(delay=0.05, max_delay=0.05)
+    written = []
+
+    queue.schedule("story", lambda: written.append(1))
+    time.sleep(0.08)
+    queue.schedule("story", lambda: written.append(2))
+
+    _wait_for(lambda: 2 in written)
+    assert written == [1, 2]
+
+
+def test_failed_writes_are_counted():
+    queue = WriteBehindQueue(delay=10)
+
+    def _fail():
+        raise RuntimeError("API is down")
+
+    queue.schedule("story", _fail)
+    queue.flush(wait=True)
+    assert queue.metrics()["failed"] == 1
+
+
+def test_writes_for_a_key_do_not_overlap():
+    queue = WriteBehindQueue(delay=10)
+    release = threading.Event()
+    running = []
+    overlaps = []
+    written = []
+
+    def _write(value):
+        def write():
+            if running:
+                overlaps.append(value)
+            running.append(value)
+            if value == 1:
+                release.wait(2)
+            written.append(value)
+            running.remove(value)
+
+        return write
+
+    queue.schedule("story", _write(1))
+    first = queue.flush_in_background()
+    _wait_for(lambda: running == [1])
+
+    # Flushing again while the first write runs doesn't start a second one
+    queue.schedule("story", _write(2))
+    queue.flush()
+    queue.schedule("story", _write(3))
+    queue.flush()
+    assert written == []
+
+    release.set()
+    first.join(2)
+    queue.flush(wait=True)
+
+    assert overlaps == []
+    assert written == [1, 3]
+
+
+def test_flush_waits_for_running_writes():
+    queue = WriteBehindQueue(delay=10)
+    written = []
+
+    def _slow():
+        time.sleep(0.05)
+        written.append(1)
+
+    queue.schedule("story", _slow)
+    queue.flush_in_background()
+    _wait_for(lambda: queue.pending == 0)
+    queue.flush(wait=True)
+    assert written == [1]